@@ -17,13 +17,68 @@ class Config:
     DB_PASSWORD = os.getenv("DB_PASSWORD", "password")
     DB_NAME = os.getenv("DB_NAME", "sentiment_db")
     SQLALCHEMY_DATABASE_URI = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "2"))
+    
+    # Write-behind persistence of analysis results to the analyzed_tweets table
+    PERSIST_RESULTS = os.getenv("PERSIST_RESULTS", "true").lower() == "true"
+    # Number of queued rows inserted at once, and longest time a row waits to be inserted
+    PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", "1000"))
+    PERSIST_FLUSH_INTERVAL_SECONDS = float(os.getenv("PERSIST_FLUSH_INTERVAL_SECONDS", "1"))
+    # Queued rows above which requests wait up to PERSIST_BLOCK_TIMEOUT_MS, then drop their results
+    PERSIST_QUEUE_SIZE = int(os.getenv("PERSIST_QUEUE_SIZE", "100000"))
+    PERSIST_BLOCK_TIMEOUT_MS = float(os.getenv("PERSIST_BLOCK_TIMEOUT_MS", "50"))
     
     # API settings
     API_TITLE = "SocialMetrics AI Sentiment Analysis API"
     API_VERSION = "1.0"
+    # Publish every schema in Swagger, including the alternative analyze response models
+    RESTX_INCLUDE_ALL_MODELS = True
+    
+    # Logging: records go through a bounded queue to a listener thread writing stdout and LOG_DIR/api.log
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    # text or json (one object per line)
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+    # Empty to log to stdout only
+    LOG_DIR = os.getenv("LOG_DIR", "logs")
+    # Records queued above this are dropped and counted in sentiment_log_records_dropped_total
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    # Fraction of the high-volume info lines (one per analysis request) that are kept
+    LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1"))
     
     # Model settings
-    MODEL_PATH = os.path.join(os.getcwd(), "models")
+    # Local model cache, shared by every worker of a host
+    MODEL_PATH = os.getenv("MODEL_PATH", os.path.join(os.getcwd(), "models"))
+    # Seconds between two checks of the model registry manifest in MinIO (0 disables hot reload)
+    MODEL_RELOAD_INTERVAL_SECONDS = float(os.getenv("MODEL_RELOAD_INTERVAL_SECONDS", "60"))
+    # Model versions selected per request (?model= or X-Model-Version) are loaded on demand and kept
+    # within this estimated memory per worker, least recently used evicted first
+    MODELS_MAX_MEMORY_MB = float(os.getenv("MODELS_MAX_MEMORY_MB", "512"))
+    # Seconds after which an unused version other than the default is evicted (0 disables)
+    MODEL_IDLE_SECONDS = float(os.getenv("MODEL_IDLE_SECONDS", "3600"))
+    # Number of model versions kept in the local model cache
+    MODEL_STORE_KEEP = int(os.getenv("MODEL_STORE_KEEP", "10"))
+    
+    # Request coalescing: concurrent analyze requests share one model call
+    COALESCE_REQUESTS = os.getenv("COALESCE_REQUESTS", "false").lower() == "true"
+    COALESCE_MAX_WAIT_MS = float(os.getenv("COALESCE_MAX_WAIT_MS", "5"))
+    COALESCE_MAX_BATCH = int(os.getenv("COALESCE_MAX_BATCH", "512"))
+    
+    # Inference processes scoring large batches in parallel shards (0 scores in the web worker)
+    INFERENCE_POOL_SIZE = int(os.getenv("INFERENCE_POOL_SIZE", "0"))
+    # Minimum number of tweets to be scored (after cache hits) for a batch to go to the pool
+    INFERENCE_SHARD_THRESHOLD = int(os.getenv("INFERENCE_SHARD_THRESHOLD", "2000"))
+    
+    # Number of tweets scored at a time by the NDJSON streaming endpoint
+    STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "1000"))
+    
+    # Directory where each worker publishes its metrics so /metrics merges every worker of the host,
+    # required with several worker processes (e.g. gunicorn), unset for a single process
+    METRICS_DIR = os.getenv("METRICS_DIR", "")
+    METRICS_FLUSH_INTERVAL_SECONDS = float(os.getenv("METRICS_FLUSH_INTERVAL_SECONDS", "5"))
+    
+    # Result cache keyed by normalized tweet text and model version (size 0 disables it)
+    RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "100000"))
+    RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "0")) or None
 
 
 class DevelopmentConfig(Config):
@@ -39,6 +94,8 @@ class TestingConfig(Config):
     ENV = "testing"
     # Use in-memory SQLite for testing
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    PERSIST_RESULTS = False
+    MODEL_RELOAD_INTERVAL_SECONDS = 0
 
 
 class ProductionConfig(Config):
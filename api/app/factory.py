@@ -1,6 +1,9 @@
 from flask import Flask
 from .config import config_by_name
 from .routes.route_registry import register_routes
+from .services import result_writer
+from .utils import metrics
+from .utils.logger import configure_logging
 from .utils.error_handlers import register_error_handlers
 
 
@@ -19,8 +22,12 @@ def create_app(config_name="dev"):
     # Load configuration
     app.config.from_object(config_by_name[config_name])
     
-    # Initialize extensions (DB, etc) here
-    # This will be implemented with DB connection later
+    # Log through a queue drained by a background thread
+    configure_logging(app)
+    
+    # Initialize extensions: background persistence of results, metrics shared across workers
+    result_writer.init_app(app)
+    metrics.init_app(app)
     
     # Register all routes
     register_routes(app)
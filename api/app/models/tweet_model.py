@@ -27,4 +27,37 @@ class Tweet:
             text=data.get("text", ""),
             positive=data.get("positive", 0),
             negative=data.get("negative", 0)
-        ) 
\ No newline at end of file
+        )
+
+
+@dataclass
+class AnalyzedTweet:
+    """Model representing a tweet scored by the API, stored in the analyzed_tweets table"""
+    id: Optional[int] = None
+    text: str = ""
+    score: float = 0.0  # between -1 (very negative) and 1 (very positive)
+    positive: int = 0  # 1 if the model found it positive, 0 if not
+    negative: int = 0  # 1 if the model found it negative, 0 if not
+    model_version: Optional[str] = None
+
+    def to_dict(self):
+        """Convert the model to a dictionary"""
+        return {
+            "id": self.id,
+            "text": self.text,
+            "score": self.score,
+            "positive": self.positive,
+            "negative": self.negative,
+            "model_version": self.model_version
+        }
+
+    @classmethod
+    def from_score(cls, text, score, model_version=None):
+        """Create a model from a tweet and its sentiment score, labelled by the sign of the score"""
+        return cls(
+            text=text,
+            score=score,
+            positive=int(score > 0),
+            negative=int(score < 0),
+            model_version=model_version
+        )
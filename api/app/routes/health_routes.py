@@ -1,3 +1,4 @@
+from flask import current_app
 from flask_restx import Namespace, Resource
 
 # Create namespace
@@ -13,4 +14,29 @@ class HealthCheck(Resource):
     )
     def get(self):
         """Health check endpoint to verify the API is running"""
-        return {"status": "success", "message": "API is running"} 
\ No newline at end of file
+        return {"status": "success", "message": "API is running"}
+
+
+@api.route("/ready")
+class ReadinessCheck(Resource):
+    @api.doc(
+        responses={
+            200: "Ready - the sentiment model is loaded",
+            503: "Not ready - the sentiment model is still loading",
+        }
+    )
+    def get(self):
+        """Readiness probe reporting whether the sentiment model is loaded and its version"""
+        sentiment_service = current_app.extensions["sentiment_service"]
+        if not sentiment_service.is_ready:
+            return {
+                "status": "loading",
+                "model_loaded": False,
+                "model_version": None,
+                "error": sentiment_service.load_error,
+            }, 503
+        return {
+            "status": "ready",
+            "model_loaded": True,
+            "model_version": sentiment_service.model_version,
+        }
\ No newline at end of file
@@ -0,0 +1,21 @@
+from flask import Response
+from flask_restx import Namespace, Resource
+
+from ..utils.metrics import metrics, render
+
+# Create namespace
+api = Namespace("metrics", description="Prometheus metrics endpoint")
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@api.route("")
+class Metrics(Resource):
+    @api.doc(
+        responses={
+            200: "Metrics in the Prometheus text format",
+        }
+    )
+    def get(self):
+        """Stage latency histograms, batch sizes, throughput and model version, merged across the workers"""
+        return Response(render(metrics.collect()), content_type=PROMETHEUS_MEDIA_TYPE)
@@ -3,7 +3,9 @@ from flask_restx import Api
 
 # Import namespaces
 from .health_routes import api as health_ns
+from .metrics_routes import api as metrics_ns
 from .sentiment_routes import api as sentiment_ns
+from .sentiment_routes import init_app as init_sentiment_routes
 
 
 def register_routes(app):
@@ -30,6 +32,8 @@ def register_routes(app):
     
     # Add namespaces to the API
     api.add_namespace(health_ns)
+    api.add_namespace(metrics_ns)
     api.add_namespace(sentiment_ns)
+    init_sentiment_routes(app)
     
     return api 
\ No newline at end of file
@@ -1,9 +1,16 @@
-from flask import request
-from flask_restx import Namespace, Resource
+import json
+from functools import wraps
 
-from ..services.sentiment_service import SentimentService
+import orjson
+from flask import Response, current_app, jsonify, request, stream_with_context
+from flask_restx import Namespace, Resource, marshal
+
+from ..services.batching import RequestCoalescer
+from ..services.inference_pool import InferencePool
+from ..services.sentiment_service import SentimentService, build_results
 from ..schemas.request_schemas import create_tweet_list_model
-from ..schemas.response_schemas import create_sentiment_response_models
+from ..schemas.response_schemas import create_sentiment_response_models, create_sentiment_scores_model
+from ..utils.metrics import REQUEST_SECONDS, STAGE_SECONDS
 
 
 # Create namespace
@@ -12,35 +19,307 @@ api = Namespace("sentiment", description="Sentiment analysis operations")
 # Create request and response models
 tweet_list_model = create_tweet_list_model(api)
 sentiment_result_model, sentiment_response_model = create_sentiment_response_models(api)
+sentiment_scores_model = create_sentiment_scores_model(api)
+
+# Response modes of /analyze, selected with ?mode= or the Accept header
+FAST_MEDIA_TYPE = "application/vnd.sentiment.fast+json"
+SCORES_MEDIA_TYPE = "application/vnd.sentiment.scores+json"
+RESPONSE_MODES = {
+    "application/json": "full",
+    FAST_MEDIA_TYPE: "fast",
+    SCORES_MEDIA_TYPE: "scores",
+}
+
+# Model version or alias of the registry, selected with ?model= or this header, echoed in the response
+MODEL_HEADER = "X-Model-Version"
+MODEL_PARAMS = {
+    "model": {
+        "description": f"Model version or alias (e.g. canary), overrides the {MODEL_HEADER} header",
+        "in": "query",
+        "type": "string",
+    },
+    MODEL_HEADER: {
+        "description": "Model version or alias, the latest version when neither is given",
+        "in": "header",
+        "type": "string",
+    },
+}
+
+
+def init_app(app):
+    """
+    Create the sentiment service, start loading its model in the background
+    and set up the optional inference pool and request coalescer
+    
+    Args:
+        app: Flask application instance
+    """
+    inference_pool = None
+    if app.config["INFERENCE_POOL_SIZE"] > 0:
+        inference_pool = InferencePool(
+            app.config["INFERENCE_POOL_SIZE"],
+            shard_threshold=app.config["INFERENCE_SHARD_THRESHOLD"],
+        )
+    
+    sentiment_service = SentimentService(
+        app.config["MODEL_PATH"],
+        cache_size=app.config["RESULT_CACHE_SIZE"],
+        cache_ttl_seconds=app.config["RESULT_CACHE_TTL_SECONDS"],
+        inference_pool=inference_pool,
+        models_max_memory_mb=app.config["MODELS_MAX_MEMORY_MB"],
+        model_idle_seconds=app.config["MODEL_IDLE_SECONDS"],
+        model_store_keep=app.config["MODEL_STORE_KEEP"],
+    )
+    # Returns immediately: requests get a 503 until the model is loaded
+    sentiment_service.start(reload_interval_seconds=app.config["MODEL_RELOAD_INTERVAL_SECONDS"])
+    app.extensions["sentiment_service"] = sentiment_service
+    
+    if app.config.get("COALESCE_REQUESTS"):
+        app.extensions["sentiment_coalescer"] = RequestCoalescer(
+            sentiment_service.score_tweets,
+            max_wait_ms=app.config["COALESCE_MAX_WAIT_MS"],
+            max_batch=app.config["COALESCE_MAX_BATCH"],
+        )
+
+
+def get_sentiment_service():
+    """Return the sentiment service of the current application"""
+    return current_app.extensions["sentiment_service"]
+
+
+def require_model(f):
+    """Answer 503 straight away until the sentiment model is loaded"""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if not get_sentiment_service().is_ready:
+            # Returned rather than aborted: flask_restx logs a traceback for every 5xx abort
+            response = jsonify({"status": "error", "message": "Sentiment model is not loaded yet"})
+            response.status_code = 503
+            return response
+        return f(*args, **kwargs)
+    return wrapper
+
+
+def get_requested_model():
+    """Return the model selected by the model query flag or the X-Model-Version header, loading it if needed"""
+    selector = request.args.get("model") or request.headers.get(MODEL_HEADER)
+    return get_sentiment_service().get_model(selector)
+
 
-# Create sentiment service
-sentiment_service = SentimentService()
+def score_tweets(tweets, loaded):
+    """Score tweets with the resolved model, through the coalescer when enabled"""
+    coalescer = current_app.extensions.get("sentiment_coalescer")
+    # The resolved model goes along: a default swap meanwhile must not change the model that scores
+    if coalescer is not None:
+        return coalescer.submit(tweets, loaded)
+    return get_sentiment_service().score_tweets(tweets, loaded)
+
+
+def persist_results(tweets, scores, loaded):
+    """Queue the results of a request for write-behind persistence, if enabled"""
+    writer = current_app.extensions.get("result_writer")
+    if writer is not None:
+        writer.submit(tweets, scores, loaded.version)
+
+
+def get_response_mode():
+    """Pick the analyze response mode from the mode query flag, else from the Accept header"""
+    mode = request.args.get("mode")
+    if mode is None:
+        return RESPONSE_MODES[request.accept_mimetypes.best_match(RESPONSE_MODES, default="application/json")]
+    if mode not in RESPONSE_MODES.values():
+        api.abort(400, f"Unknown mode '{mode}', expected one of: {', '.join(RESPONSE_MODES.values())}")
+    return mode
 
 
 @api.route("/analyze")
 class SentimentAnalysis(Resource):
     @api.doc(
+        description=(
+            "Response modes, selected with the mode query flag or the Accept header:\n"
+            "- full (application/json): validated request, SentimentResponse with every tweet echoed back\n"
+            f"- fast ({FAST_MEDIA_TYPE}): same SentimentResponse, skipping schema validation and "
+            "marshalling for large batches\n"
+            f"- scores ({SCORES_MEDIA_TYPE}): fast path returning SentimentScores, "
+            "the scores only in request order"
+        ),
+        params={
+            "mode": {
+                "description": "Response mode, overrides the Accept header",
+                "in": "query",
+                "type": "string",
+                "enum": list(RESPONSE_MODES.values()),
+            },
+            **MODEL_PARAMS,
+        },
         responses={
-            200: "Success",
             400: "Validation Error",
+            404: "Unknown model version or alias",
             500: "Internal Server Error",
+            503: "Model not loaded yet",
         }
     )
-    @api.expect(tweet_list_model, validate=True)
-    @api.marshal_with(sentiment_response_model)
+    @api.response(200, "Success (SentimentScores in scores mode)", sentiment_response_model)
+    @require_model
+    @api.expect(tweet_list_model)
     def post(self):
         """
         Analyze sentiment of a list of tweets
         Returns a sentiment score for each tweet between -1 (very negative) and 1 (very positive)
         """
+        mode = get_response_mode()
+        with REQUEST_SECONDS.time(mode):
+            if mode == "full":
+                return self._analyze_full()
+            return self._analyze_fast(mode)
+    
+    def _analyze_fast(self, mode):
+        """Fast modes: a cheap type check instead of jsonschema over every element"""
+        with STAGE_SECONDS.time("parse"):
+            data = request.get_json(silent=True)
+        with STAGE_SECONDS.time("validate"):
+            tweets = data.get("tweets") if isinstance(data, dict) else None
+            if not isinstance(tweets, list) or not all(type(tweet) is str for tweet in tweets):
+                api.abort(400, "Expected a JSON object with a 'tweets' list of strings")
+        if not tweets:
+            api.abort(400, "No tweets provided for analysis")
+        
+        loaded = get_requested_model()
+        scores = score_tweets(tweets, loaded)
+        persist_results(tweets, scores, loaded)
+        with STAGE_SECONDS.time("serialize"):
+            if mode == "scores":
+                body = orjson.dumps({"scores": scores}, option=orjson.OPT_SERIALIZE_NUMPY)
+            else:
+                body = orjson.dumps({"results": build_results(tweets, scores)})
+        return Response(body, mimetype="application/json", headers={MODEL_HEADER: loaded.version})
+    
+    def _analyze_full(self):
+        """Validated and marshalled analysis, the default mode"""
         # Get tweets from request
-        data = request.json
+        with STAGE_SECONDS.time("parse"):
+            data = request.json
+        with STAGE_SECONDS.time("validate"):
+            tweet_list_model.validate(data)
         tweets = data.get("tweets", [])
         
         if not tweets:
             api.abort(400, "No tweets provided for analysis")
         
         # Use sentiment service to analyze tweets
-        results = sentiment_service.analyze_tweets(tweets)
+        loaded = get_requested_model()
+        scores = score_tweets(tweets, loaded)
+        persist_results(tweets, scores, loaded)
+        with STAGE_SECONDS.time("build"):
+            results = build_results(tweets, scores)
+        
+        with STAGE_SECONDS.time("marshal"):
+            return marshal({"results": results}, sentiment_response_model), 200, {MODEL_HEADER: loaded.version}
+
+
+@api.route("/analyze/stream")
+class SentimentAnalysisStream(Resource):
+    @api.doc(
+        description=(
+            "Request body: newline-delimited JSON (application/x-ndjson), one tweet per line, "
+            'either a JSON string or an object with a "tweet" field. '
+            'Response: one {"tweet", "score"} JSON object per line, in input order. '
+            'Invalid lines produce an {"line", "error"} object instead of a result.'
+        ),
+        params=MODEL_PARAMS,
+        responses={
+            200: "Success (application/x-ndjson)",
+            404: "Unknown model version or alias",
+            503: "Model not loaded yet",
+        },
+    )
+    @require_model
+    def post(self):
+        """
+        Analyze a stream of tweets with constant memory
+        Tweets are read, scored and written back in fixed-size chunks
+        """
+        sentiment_service = get_sentiment_service()
+        chunk_size = current_app.config["STREAM_CHUNK_SIZE"]
+        # Resolved before streaming: the whole stream is scored by the same model
+        loaded = get_requested_model()
+        
+        def generate():
+            for chunk in _read_tweet_chunks(request.stream, chunk_size):
+                tweets = [tweet for tweet in chunk if not isinstance(tweet, dict)]
+                results = iter(())
+                if tweets:
+                    scores = sentiment_service.score_tweets(tweets, loaded)
+                    persist_results(tweets, scores, loaded)
+                    results = iter(build_results(tweets, scores))
+                lines = []
+                for tweet in chunk:
+                    # Errors keep their place in the output so results stay aligned with the input
+                    item = tweet if isinstance(tweet, dict) else next(results)
+                    lines.append(json.dumps(item))
+                lines.append("")
+                yield "\n".join(lines)
         
-        return {"results": results} 
\ No newline at end of file
+        return Response(
+            stream_with_context(generate()),
+            mimetype="application/x-ndjson",
+            headers={MODEL_HEADER: loaded.version},
+        )
+
+
+def _read_tweet_chunks(stream, chunk_size):
+    """
+    Parse an NDJSON request stream into chunks of tweets
+    
+    Args:
+        stream: Binary request stream
+        chunk_size: Maximum number of tweets per chunk
+        
+    Yields:
+        Lists of tweets, with an {"line", "error"} dict in place of each invalid line
+    """
+    chunk = []
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        
+        try:
+            item = json.loads(line)
+            tweet = item.get("tweet") if isinstance(item, dict) else item
+            if not isinstance(tweet, str):
+                raise ValueError("expected a JSON string or an object with a string \"tweet\" field")
+            chunk.append(tweet)
+        except ValueError as e:
+            chunk.append({"line": line_number, "error": str(e)})
+        
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    
+    if chunk:
+        yield chunk
+
+
+@api.route("/cache")
+class SentimentCacheStats(Resource):
+    @api.doc(
+        responses={
+            200: "Success",
+        }
+    )
+    def get(self):
+        """Result cache statistics (size, hits, misses, evictions) for tuning the cache size"""
+        return get_sentiment_service().cache_stats()
+
+
+@api.route("/models")
+class SentimentModels(Resource):
+    @api.doc(
+        responses={
+            200: "Success",
+        }
+    )
+    def get(self):
+        """Model registry of this worker: default version, aliases and loaded versions with their memory"""
+        return get_sentiment_service().registry.stats()
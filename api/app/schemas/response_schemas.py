@@ -30,4 +30,27 @@ def create_sentiment_response_models(api):
         },
     )
     
-    return sentiment_result_model, sentiment_response_model 
\ No newline at end of file
+    return sentiment_result_model, sentiment_response_model
+
+
+def create_sentiment_scores_model(api):
+    """
+    Create the model of the compact analysis response (mode=scores)
+    
+    Args:
+        api: Flask-RestX API instance
+        
+    Returns:
+        Model with the scores only, in the order of the request's tweets
+    """
+    return api.model(
+        "SentimentScores",
+        {
+            "scores": fields.List(
+                fields.Float(
+                    description="Sentiment score from -1 (very negative) to 1 (very positive)"
+                ),
+                description="One score per tweet, in request order",
+            ),
+        },
+    )
@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, List, Sequence
+
+from ..utils.logger import logger
+
+
+class RequestCoalescer:
+    """Coalesce concurrent analysis requests into a single model call per model"""
+
+    def __init__(
+        self,
+        score_fn: Callable[[List[str], Any], Sequence],
+        max_wait_ms: float = 5,
+        max_batch: int = 512,
+    ):
+        """
+        Initialize the coalescer and start its worker thread
+
+        Args:
+            score_fn: Function scoring a list of tweets with a model and returning one result per tweet
+            max_wait_ms: Longest time a request waits for others to join its batch
+            max_batch: Number of tweets that triggers an immediate model call
+        """
+        self.score_fn = score_fn
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch = max_batch
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self._worker = threading.Thread(target=self._run, name="request-coalescer", daemon=True)
+        self._worker.start()
+
+    def submit(self, tweets: List[str], model=None) -> Sequence:
+        """
+        Analyze tweets as part of a shared batch
+
+        Args:
+            tweets: Tweets of a single request
+            model: Model the request resolved, passed on to score_fn: requests are only
+                batched with requests for the same model, so a swap never mixes them
+
+        Returns:
+            Results for exactly these tweets, in order
+        """
+        # A request that fills a batch on its own gains nothing from waiting
+        if len(tweets) >= self.max_batch:
+            return self.score_fn(tweets, model)
+
+        future = Future()
+        with self._condition:
+            self._pending.append((tweets, model, future))
+            self._condition.notify()
+        return future.result()
+
+    def _run(self):
+        """Worker loop: collect a batch, score it once per model, hand out the slices"""
+        while True:
+            batch = self._collect_batch()
+            groups = {}
+            for request in batch:
+                groups.setdefault(id(request[1]), []).append(request)
+            for group in groups.values():
+                self._process_batch(group)
+
+    def _collect_batch(self):
+        """Wait for the first request, then gather more until max_wait or max_batch"""
+        with self._condition:
+            while not self._pending:
+                self._condition.wait()
+
+            deadline = time.monotonic() + self.max_wait
+            batch = []
+            size = 0
+            while True:
+                while self._pending and size < self.max_batch:
+                    request = self._pending.popleft()
+                    batch.append(request)
+                    size += len(request[0])
+
+                remaining = deadline - time.monotonic()
+                if size >= self.max_batch or remaining <= 0:
+                    return batch
+                self._condition.wait(remaining)
+
+    def _process_batch(self, batch):
+        """Run one model call for a batch of requests for the same model and resolve every caller's future"""
+        all_tweets = []
+        for tweets, _, _ in batch:
+            all_tweets.extend(tweets)
+
+        try:
+            results = self.score_fn(all_tweets, batch[0][1])
+        except Exception as e:
+            logger.error(f"Error analyzing coalesced batch of {len(all_tweets)} tweets: {e}")
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        offset = 0
+        for tweets, _, future in batch:
+            future.set_result(results[offset:offset + len(tweets)])
+            offset += len(tweets)
@@ -0,0 +1,116 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+def make_cache_key(model_version: str, cleaned_text: str) -> bytes:
+    """Hash a normalized text together with the model version that scored it"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(model_version.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(cleaned_text.encode("utf-8"))
+    return digest.digest()
+
+
+class ResultCache:
+    """Thread-safe bounded LRU cache of sentiment scores with optional TTL"""
+
+    def __init__(self, max_size: int = 100000, ttl_seconds: Optional[float] = None):
+        """
+        Initialize the cache
+
+        Args:
+            max_size: Maximum number of cached scores, 0 disables the cache
+            ttl_seconds: Lifetime of an entry in seconds, None or 0 for no expiry
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds or None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_many(self, keys: List[bytes]) -> List[Optional[float]]:
+        """
+        Look up several keys at once
+
+        Args:
+            keys: Cache keys built with make_cache_key
+
+        Returns:
+            The cached score for each key, or None on a miss
+        """
+        if self.max_size <= 0:
+            return [None] * len(keys)
+
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and (entry[1] is None or entry[1] > now):
+                    self._entries.move_to_end(key)
+                    values.append(entry[0])
+                    self.hits += 1
+                else:
+                    if entry is not None:
+                        del self._entries[key]
+                    values.append(None)
+                    self.misses += 1
+        return values
+
+    def put_many(self, keys: List[bytes], values: List[float], model_version: Optional[str] = None):
+        """
+        Store several scores, evicting the least recently used entries when full
+
+        Args:
+            keys: Cache keys built with make_cache_key
+            values: Score of each key
+            model_version: Version the keys were built with, for discard_version
+        """
+        if self.max_size <= 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            for key, value in zip(keys, values):
+                self._entries[key] = (value, expires_at, model_version)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard_version(self, model_version: str) -> int:
+        """
+        Drop the entries of a model version, e.g. the default one just swapped out
+
+        Their keys could never be hit by another version, but would keep taking
+        LRU capacity until they expire or are evicted.
+
+        Returns:
+            Number of dropped entries
+        """
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry[2] == model_version]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters and the current size"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,106 @@
+import math
+import multiprocessing
+import signal
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ..utils.logger import logger
+from .model_loader import load_artifacts
+from .model_store import VersionLock
+from shared.scoring import LinearScorer
+
+# Models loaded by a pool worker process with the lock keeping their files in the store,
+# keyed by version, least recently used first
+_worker_models = OrderedDict()
+# Versions a pool worker keeps loaded, for large batches alternating between a few models
+WORKER_MODELS = 2
+
+
+def _init_worker():
+    """
+    Start a pool worker with nothing but its model cache
+
+    The web worker handles shutdown and closes the pool, so a Ctrl-C
+    reaching the whole process group doesn't interrupt shards midway.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_models.clear()
+
+
+def _score_shard(version, directory, texts):
+    """
+    Vectorize and score one shard inside a pool worker
+
+    The worker memory-maps the model from the local model store, so every
+    worker shares the same read-only pages, and keeps it for later shards,
+    holding its version lock so the store doesn't remove its files meanwhile.
+    """
+    loaded = _worker_models.get(version)
+    if loaded is None:
+        while len(_worker_models) >= WORKER_MODELS:
+            _, (_, _, evicted_lock) = _worker_models.popitem(last=False)
+            evicted_lock.release()
+        lock = VersionLock.for_directory(directory)
+        try:
+            model, vectorizer = load_artifacts(directory)
+        except Exception:
+            lock.release()
+            raise
+        loaded = (vectorizer, LinearScorer.from_model(model, vectorizer), lock)
+        _worker_models[version] = loaded
+    _worker_models.move_to_end(version)
+
+    vectorizer, scorer, _ = loaded
+    return scorer.score(vectorizer.transform(texts))
+
+
+class InferencePool:
+    """Process pool scoring large batches in parallel shards, outside the worker's GIL"""
+
+    def __init__(self, size, shard_threshold=2000):
+        """
+        Initialize the pool, its processes are started on first use
+
+        Args:
+            size: Number of inference processes
+            shard_threshold: Minimum number of texts for a batch to be sent to the pool
+        """
+        self.size = size
+        self.shard_threshold = shard_threshold
+        # Never fork the threaded web worker: start clean interpreters instead,
+        # which import the entry script again, so it must only build the app under __main__
+        self._executor = ProcessPoolExecutor(
+            max_workers=size,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+
+    def accepts(self, loaded, n_texts):
+        """Whether a batch of n_texts for this model should go to the pool"""
+        return n_texts >= self.shard_threshold and loaded.path is not None
+
+    def score(self, loaded, texts):
+        """
+        Score normalized texts across the pool
+
+        Args:
+            loaded: LoadedModel to score with, loaded from the local model store
+            texts: Normalized texts
+
+        Returns:
+            NumPy array of scores, in the order of texts
+        """
+        shard_size = math.ceil(len(texts) / self.size)
+        shards = [texts[start:start + shard_size] for start in range(0, len(texts), shard_size)]
+        futures = [
+            self._executor.submit(_score_shard, loaded.version, loaded.path, shard)
+            for shard in shards
+        ]
+        return np.concatenate([future.result() for future in futures])
+
+    def shutdown(self):
+        """Stop the inference processes"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("Inference pool shut down")
@@ -0,0 +1,121 @@
+from dataclasses import dataclass
+from typing import Any, Optional
+from shared.artifacts import download_artifacts
+from shared.bundle import BUNDLE_KEY, load_bundle, unpack_bundle
+from shared.normalization import NORMALIZER_VERSION
+from shared.registry import version_key
+from shared.scoring import LinearScorer
+from ..exceptions.api_exceptions import ModelError
+from ..utils.logger import logger
+import os
+
+MODEL_BUCKET = "ml-models"
+MODEL_KEY = "trained_model.joblib"
+VECTORIZER_KEY = "vectorizer.joblib"
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    """A vectorizer/model pair that is always swapped as a single unit"""
+    model: Any
+    vectorizer: Any
+    scorer: LinearScorer
+    version: str
+    # Directory of the artifacts in the local model store, if loaded from there
+    path: Optional[str] = None
+
+
+def load_model_version(s3_client, store, version, artifact_names) -> LoadedModel:
+    """
+    Load a published model version through the local model store
+
+    The artifacts are only downloaded when the store doesn't hold the version
+    yet, in parallel, and an artifact whose checksum matches a copy held by
+    another version of the store is copied from there. The single-file bundle
+    is preferred, the model/vectorizer pickles are only used for a version
+    published without one; the unpacked bundle and pickled artifacts are
+    memory-mapped so that every worker of a host shares the read-only pages of
+    their arrays.
+
+    Args:
+        s3_client: boto3 S3 client
+        store: LocalModelStore caching the artifacts on disk
+        version: Version id in the model registry
+        artifact_names: Artifacts of the version, as listed in the manifest
+
+    Returns:
+        LoadedModel ready to serve requests
+    """
+    names = [BUNDLE_KEY] if BUNDLE_KEY in artifact_names else [MODEL_KEY, VECTORIZER_KEY]
+
+    def download(directory):
+        # Download files from MinIO
+        keys = {version_key(version, name): name for name in names}
+        statuses = download_artifacts(keys, MODEL_BUCKET, directory, client=s3_client, reuse_from=store.entries())
+        logger.info(f"Model {version} artifacts fetched: {statuses}")
+
+    directory = store.fetch(version, download)
+    model, vectorizer = load_artifacts(directory)
+
+    return build_loaded_model(model, vectorizer, version, path=directory)
+
+
+def load_artifacts(directory):
+    """
+    Load the model and vectorizer of a local model store directory
+
+    Args:
+        directory: Directory holding either the bundle or both pickled artifacts
+
+    Returns:
+        Tuple of (model, vectorizer). From a bundle, the model is a ModelBundle
+        standing in for the fitted classifier; either way, the numpy arrays stay
+        backed by the cached files
+    """
+    bundle_path = os.path.join(directory, BUNDLE_KEY)
+    if os.path.exists(bundle_path):
+        # The compressed bundle is unpacked once per host, the first worker loading it does it
+        bundle = load_bundle(unpack_bundle(bundle_path), mmap_mode='r')
+        return bundle, bundle.vectorizer
+
+    import joblib
+
+    model = joblib.load(os.path.join(directory, MODEL_KEY), mmap_mode='r')
+    vectorizer = joblib.load(os.path.join(directory, VECTORIZER_KEY), mmap_mode='r')
+    return model, vectorizer
+
+
+def build_loaded_model(model, vectorizer, version, path=None) -> LoadedModel:
+    """
+    Validate a model/vectorizer pair, compile its scorer and warm it up
+
+    Args:
+        model: Fitted classifier
+        vectorizer: Fitted vectorizer the classifier was trained on
+        version: Identifier of this model
+        path: Directory the artifacts were loaded from, if any
+
+    Returns:
+        LoadedModel ready to serve requests
+    """
+    check_normalizer_version(model)
+
+    # Compile the linear scoring engine once per loaded model
+    scorer = LinearScorer.from_model(model, vectorizer)
+
+    # Warm-up prediction so the first real request doesn't pay for lazy initialization
+    scorer.score(vectorizer.transform(["warm up prediction"]))
+
+    logger.info(f"Model {version} loaded and warmed up")
+    return LoadedModel(model=model, vectorizer=vectorizer, scorer=scorer, version=version, path=path)
+
+
+def check_normalizer_version(model):
+    """Refuse a model trained with a different text normalizer than the one served"""
+    model_version = getattr(model, "normalizer_version_", None)
+    if model_version != NORMALIZER_VERSION:
+        raise ModelError(
+            f"Model was trained with text normalizer version {model_version}, "
+            f"but the API uses version {NORMALIZER_VERSION}"
+        )
+
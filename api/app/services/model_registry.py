@@ -0,0 +1,257 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Dict
+
+from shared.artifacts import get_s3_client
+from shared.registry import empty_manifest, manifest_etag, read_manifest, resolve_version
+from ..exceptions.api_exceptions import ResourceNotFoundError
+from ..utils.logger import logger
+from ..utils.metrics import MODEL_EVICTIONS, MODEL_LOADS, MODEL_VERSION, MODELS_LOADED_BYTES
+from .model_loader import MODEL_BUCKET, LoadedModel, load_model_version
+
+
+@dataclass
+class _Resident:
+    """A model held in memory with its estimated size and last use"""
+    loaded: LoadedModel
+    nbytes: int
+    last_used: float
+
+
+class ModelRegistry:
+    """
+    Model versions of the registry manifest, loaded on demand into a memory-bounded LRU
+
+    The version of the default alias is always kept in memory. Any other
+    version is loaded the first time a request selects it, once per worker
+    however many requests ask for it meanwhile, and evicted once it has been
+    idle for idle_seconds or when the loaded models exceed the memory budget,
+    least recently used first.
+    """
+
+    def __init__(self, store, max_memory_mb=512, idle_seconds=3600, on_default_swap=None):
+        """
+        Initialize the registry, the manifest is read by refresh
+
+        Args:
+            store: LocalModelStore caching the artifacts on disk
+            max_memory_mb: Estimated memory the loaded models may hold
+            idle_seconds: Unused time after which a model is evicted, 0 to only evict above the budget
+            on_default_swap: Called with the previous and the new default LoadedModel after a swap
+        """
+        self.store = store
+        self.max_bytes = int(max_memory_mb * 2 ** 20)
+        self.idle_seconds = idle_seconds
+        self.on_default_swap = on_default_swap
+        self.manifest = empty_manifest()
+        self.manifest_etag = None
+        # Served when a request selects no model: swapped as a single reference
+        self.default = None
+        # Loaded models by version, least recently used first
+        self._models = OrderedDict()
+        # Future of each version being loaded, shared by the requests waiting for it
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def refresh(self, s3_client=None) -> bool:
+        """
+        Read the manifest if it changed, then load and serve the version of the default alias
+
+        The new default is loaded before it replaces the previous one, which
+        stays in memory until it is evicted like any other version.
+
+        Args:
+            s3_client: boto3 S3 client
+
+        Returns:
+            True if the manifest changed
+        """
+        s3_client = get_s3_client(s3_client)
+        etag = manifest_etag(MODEL_BUCKET, s3_client)
+        if etag is None or etag == self.manifest_etag:
+            return False
+
+        manifest, etag = read_manifest(MODEL_BUCKET, s3_client)
+        self.manifest = manifest
+        version = resolve_version(manifest)
+        if version is not None and (self.default is None or self.default.version != version):
+            logger.info(f"Default model is now version {version}")
+            self.set_default(self.get(version, s3_client))
+        # Only once the default is served: a failed load is retried on the next poll
+        self.manifest_etag = etag
+        return True
+
+    def resolve(self, selector) -> str:
+        """
+        Resolve the model selected by a request
+
+        Args:
+            selector: Alias or version id, None for the default alias
+
+        Returns:
+            Version id
+
+        Raises:
+            ResourceNotFoundError if the manifest has no such alias or version
+        """
+        version = resolve_version(self.manifest, selector)
+        if version is None:
+            raise ResourceNotFoundError(f"Unknown model version or alias '{selector}'")
+        return version
+
+    def get(self, version, s3_client=None) -> LoadedModel:
+        """
+        Return a loaded model version, loading it on a miss
+
+        Concurrent requests for a version being loaded wait for that load
+        instead of starting their own, requests for other versions don't wait.
+
+        Args:
+            version: Version id listed in the manifest
+            s3_client: boto3 S3 client
+
+        Returns:
+            LoadedModel of the version
+        """
+        with self._lock:
+            resident = self._models.get(version)
+            if resident is not None:
+                self._models.move_to_end(version)
+                resident.last_used = time.monotonic()
+                return resident.loaded
+            loading = self._loading.get(version)
+            if loading is None:
+                loading = self._loading[version] = Future()
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            return loading.result()
+
+        try:
+            entry = self.manifest["versions"].get(version)
+            if entry is None:
+                raise ResourceNotFoundError(f"Unknown model version '{version}'")
+            logger.info(f"Loading model version {version}")
+            loaded = load_model_version(get_s3_client(s3_client), self.store, version, entry["artifacts"])
+        except Exception as e:
+            self.store.release(version)
+            with self._lock:
+                del self._loading[version]
+            loading.set_exception(e)
+            raise
+
+        self._add(loaded)
+        with self._lock:
+            del self._loading[version]
+        MODEL_LOADS.inc()
+        loading.set_result(loaded)
+        return loaded
+
+    def set_default(self, loaded):
+        """
+        Serve a loaded model to the requests that select no version
+
+        Args:
+            loaded: LoadedModel to serve by default from now on
+        """
+        if loaded.version not in self._models:
+            self._add(loaded)
+        previous = self.default
+        self.default = loaded
+        MODEL_VERSION.set_only(1, loaded.version)
+        if previous is not None and previous.version != loaded.version:
+            logger.info(f"Swapped default model {previous.version} for {loaded.version}")
+            if self.on_default_swap is not None:
+                self.on_default_swap(previous, loaded)
+        self.evict()
+
+    def evict(self):
+        """
+        Evict the idle models, then the least recently used ones above the memory budget
+
+        The default model and the most recently used one are never evicted, so a
+        single model larger than the budget can still be served. Requests using
+        an evicted model keep their reference until they finish.
+
+        Returns:
+            Evicted version ids
+        """
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            keep = {self.default.version if self.default else None, next(reversed(self._models), None)}
+            total = sum(resident.nbytes for resident in self._models.values())
+            for version, resident in list(self._models.items()):
+                if version in keep:
+                    continue
+                idle = self.idle_seconds and now - resident.last_used > self.idle_seconds
+                if idle or total > self.max_bytes:
+                    del self._models[version]
+                    total -= resident.nbytes
+                    evicted.append(version)
+            self._publish_loaded()
+
+        for version in evicted:
+            # Its files may now be pruned from the local store, the mapped pages stay valid
+            self.store.release(version)
+        if evicted:
+            MODEL_EVICTIONS.inc(len(evicted))
+            logger.info(f"Evicted model versions {', '.join(evicted)}, {total / 2 ** 20:.1f} MB loaded")
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the default version, the aliases and the loaded models with their estimated size"""
+        now = time.monotonic()
+        with self._lock:
+            loaded = [
+                {
+                    "version": version,
+                    "memory_mb": round(resident.nbytes / 2 ** 20, 3),
+                    "idle_seconds": round(now - resident.last_used, 1),
+                }
+                for version, resident in reversed(self._models.items())
+            ]
+        return {
+            "default": self.default.version if self.default else None,
+            "aliases": dict(self.manifest["aliases"]),
+            "versions": len(self.manifest["versions"]),
+            "loaded": loaded,
+            "max_memory_mb": self.max_bytes / 2 ** 20,
+        }
+
+    def _add(self, loaded):
+        """Hold a newly loaded model, evicting others if needed"""
+        nbytes = estimate_model_bytes(loaded)
+        with self._lock:
+            self._models[loaded.version] = _Resident(loaded, nbytes, time.monotonic())
+            self._models.move_to_end(loaded.version)
+        logger.info(f"Model {loaded.version} holds about {nbytes / 2 ** 20:.1f} MB")
+        self.evict()
+
+    def _publish_loaded(self):
+        MODELS_LOADED_BYTES.replace({(version,): resident.nbytes for version, resident in self._models.items()})
+
+
+def estimate_model_bytes(loaded: LoadedModel) -> int:
+    """
+    Estimate the memory held by a loaded model
+
+    Counts the scorer's weights, the idf of a TF-IDF vectorizer and its
+    vocabulary dict with its term strings, which dominate for large vocabularies.
+    """
+    nbytes = loaded.scorer.coef.nbytes
+    vectorizer = loaded.vectorizer
+    idf = getattr(vectorizer, "idf_", None)
+    if idf is not None:
+        nbytes += idf.nbytes
+    vocabulary = getattr(vectorizer, "vocabulary_", None)
+    if vocabulary:
+        # The dict, its keys and one int object per value
+        nbytes += sys.getsizeof(vocabulary) + sum(sys.getsizeof(term) for term in vocabulary) + 32 * len(vocabulary)
+    return nbytes
@@ -0,0 +1,173 @@
+import fcntl
+import os
+import shutil
+import tempfile
+import threading
+
+from ..utils.logger import logger
+
+# Model versions kept on disk by default, older ones are pruned unless a process holds them
+DEFAULT_KEEP = 10
+
+LOCKS_DIR = ".locks"
+
+
+class VersionLock:
+    """
+    Shared lock a process holds on a cached version while it may open its files
+
+    Any number of processes hold a version at once; the store only removes a
+    version whose exclusive lock it gets, so never one that a worker or an
+    inference process has loaded or is about to open.
+    """
+
+    def __init__(self, root, key):
+        """
+        Take the shared lock, waiting while the version is being removed
+
+        Args:
+            root: Directory of the local model store
+            key: Version of the model
+        """
+        directory = os.path.join(root, LOCKS_DIR)
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{key}.lock")
+        self._fd = _lock_file(self.path, fcntl.LOCK_SH)
+
+    @classmethod
+    def for_directory(cls, directory):
+        """Take the lock of the version cached in a store directory"""
+        root, key = os.path.split(os.path.normpath(directory))
+        return cls(root, key)
+
+    def release(self):
+        """Release the lock, the store may remove the version afterwards"""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class LocalModelStore:
+    """On-disk cache of model artifacts by version, shared by every worker on a host"""
+
+    def __init__(self, root, keep=DEFAULT_KEEP):
+        """
+        Initialize the store
+
+        Args:
+            root: Directory holding one sub-directory per cached model
+            keep: Number of most recent models kept on disk, held ones are never removed
+        """
+        self.root = root
+        self.keep = keep
+        # Version locks held by this process, by version
+        self._held = {}
+        self._held_lock = threading.Lock()
+
+    def fetch(self, key, download):
+        """
+        Return the directory holding the artifacts of a model, downloading them on a miss
+
+        The version stays locked against pruning by other processes until release.
+
+        Args:
+            key: Version of the model, whose artifacts never change
+            download: Callable writing the artifacts into the directory it receives
+
+        Returns:
+            Path of the model directory
+        """
+        os.makedirs(self.root, exist_ok=True)
+        with self._held_lock:
+            if key not in self._held:
+                self._held[key] = VersionLock(self.root, key)
+
+        path = os.path.join(self.root, key)
+        if os.path.isdir(path):
+            logger.info(f"Model {key} found in local cache {self.root}")
+            os.utime(path)
+            return path
+
+        staging = tempfile.mkdtemp(prefix=".download-", dir=self.root)
+        try:
+            download(staging)
+            # Publishing with a rename keeps concurrent workers from ever seeing a partial model
+            os.rename(staging, path)
+            logger.info(f"Model {key} downloaded to local cache {self.root}")
+        except OSError:
+            if not os.path.isdir(path):
+                self.release(key)
+                raise
+            # Another worker published the same model first
+            shutil.rmtree(staging, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            self.release(key)
+            raise
+
+        self._prune()
+        return path
+
+    def release(self, key):
+        """Let the store remove a version this process no longer uses"""
+        with self._held_lock:
+            lock = self._held.pop(key, None)
+        if lock is not None:
+            lock.release()
+
+    def entries(self):
+        """
+        List the cached model directories
+
+        Returns:
+            Paths of the cached models, most recently used first
+        """
+        if not os.path.isdir(self.root):
+            return []
+        entries = [
+            os.path.join(self.root, name)
+            for name in os.listdir(self.root)
+            if not name.startswith(".")
+        ]
+        entries.sort(key=os.path.getmtime, reverse=True)
+        return entries
+
+    def _prune(self):
+        """Remove all but the most recently used models, skipping the ones any process holds"""
+        for stale in self.entries()[self.keep:]:
+            key = os.path.basename(stale)
+            lock_path = os.path.join(self.root, LOCKS_DIR, f"{key}.lock")
+            try:
+                fd = _lock_file(lock_path, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue
+            try:
+                shutil.rmtree(stale, ignore_errors=True)
+                # Still locked: a process opening the lock file meanwhile retries on the new one
+                os.unlink(lock_path)
+            finally:
+                os.close(fd)
+            logger.info(f"Model {key} removed from local cache {self.root}")
+
+
+def _lock_file(path, operation):
+    """
+    Open and flock a lock file, retrying if it was removed while waiting for the lock
+
+    Returns:
+        File descriptor holding the lock
+    """
+    while True:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, operation)
+            # Locked the file that is still at path, not one the store unlinked meanwhile
+            try:
+                if os.stat(path).st_ino == os.fstat(fd).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+        except BaseException:
+            os.close(fd)
+            raise
+        os.close(fd)
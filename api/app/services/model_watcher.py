@@ -0,0 +1,55 @@
+import threading
+
+from shared.artifacts import get_s3_client
+from ..utils.logger import logger
+
+
+class ModelWatcher:
+    """Background thread that follows the registry manifest and evicts idle models"""
+
+    def __init__(self, registry, interval_seconds=60):
+        """
+        Initialize the watcher
+
+        Args:
+            registry: ModelRegistry refreshed from the manifest on change
+            interval_seconds: Delay between two polls of the manifest's ETag
+        """
+        self.registry = registry
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+
+    def start(self):
+        """Start polling in the background"""
+        self._thread.start()
+        logger.info(f"Model watcher started, polling every {self.interval_seconds} seconds")
+
+    def stop(self):
+        """Stop polling"""
+        self._stop.set()
+
+    def _run(self):
+        s3_client = get_s3_client()
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.check_for_update(s3_client)
+            except Exception as e:
+                # Keep serving the current models, try again on the next poll
+                logger.error(f"Error checking for a new model: {e}")
+            self.registry.evict()
+
+    def check_for_update(self, s3_client):
+        """
+        Read the manifest if it changed, loading the new default version if the latest alias moved
+
+        Versions are immutable and the manifest is written once all their
+        artifacts are uploaded, so a version listed in it is always complete.
+
+        Returns:
+            True if the manifest changed
+        """
+        changed = self.registry.refresh(s3_client)
+        if changed:
+            logger.info("Model manifest changed in MinIO")
+        return changed
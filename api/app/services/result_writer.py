@@ -0,0 +1,226 @@
+import atexit
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Sequence
+
+from ..models.tweet_model import AnalyzedTweet
+from ..utils.logger import logger
+
+INSERT_ANALYZED_TWEETS = (
+    "INSERT INTO analyzed_tweets (text, score, positive, negative, model_version) "
+    "VALUES (:text, :score, :positive, :negative, :model_version)"
+)
+
+
+class ResultWriter:
+    """Write-behind persistence of analysis results, off the request path"""
+
+    def __init__(
+        self,
+        insert_fn: Callable[[List[dict]], None],
+        batch_size: int = 1000,
+        flush_interval_seconds: float = 1.0,
+        max_queue_size: int = 100000,
+        block_timeout_seconds: float = 0.05,
+    ):
+        """
+        Initialize the writer and start its background thread
+
+        Args:
+            insert_fn: Function inserting a list of analyzed_tweets rows in one statement
+            batch_size: Number of queued rows that triggers an immediate insert
+            flush_interval_seconds: Longest time a row waits in the queue before being inserted
+            max_queue_size: Number of queued rows above which requests are pushed back
+            block_timeout_seconds: Longest time a request waits for room in a full queue
+                before its results are dropped
+        """
+        self.insert_fn = insert_fn
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_seconds
+        self.max_queue_size = max_queue_size
+        self.block_timeout = block_timeout_seconds
+        # Results are queued per request as (tweets, scores, model_version) and
+        # only turned into rows on the writer thread
+        self._pending = deque()
+        self._queued_rows = 0
+        self._closed = False
+        self._dropping = False
+        self._counters = {"written": 0, "dropped": 0, "failed": 0}
+        self._condition = threading.Condition()
+        self._worker = threading.Thread(target=self._run, name="result-writer", daemon=True)
+        self._worker.start()
+
+    def submit(self, tweets: Sequence[str], scores: Sequence[float], model_version=None) -> bool:
+        """
+        Queue the results of a request for insertion
+
+        Waits up to block_timeout_seconds when the queue is full, so a database
+        that can't keep up slows requests down a little before losing results.
+
+        Args:
+            tweets: Analyzed tweets
+            scores: Their sentiment scores, in order
+            model_version: Version of the model that produced the scores
+
+        Returns:
+            True if the results were queued, False if they were dropped
+        """
+        size = len(tweets)
+        if not size:
+            return True
+
+        with self._condition:
+            deadline = time.monotonic() + self.block_timeout
+            # A request larger than the whole queue still goes through when the queue is empty
+            while not self._closed and self._queued_rows and self._queued_rows + size > self.max_queue_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            if self._closed or (self._queued_rows and self._queued_rows + size > self.max_queue_size):
+                self._counters["dropped"] += size
+                if not self._dropping:
+                    # Warn once per overflow episode, not once per request
+                    logger.warning("Result write queue is full, dropping analysis results")
+                    self._dropping = True
+                return False
+
+            self._dropping = False
+            was_empty = not self._pending
+            self._pending.append((tweets, scores, model_version))
+            self._queued_rows += size
+            # Wake the writer to start the flush interval of a first row, or to insert a full batch
+            if was_empty or self._queued_rows >= self.batch_size:
+                self._condition.notify_all()
+            return True
+
+    def close(self, timeout=10):
+        """
+        Insert every queued result, then stop the writer thread
+
+        Args:
+            timeout: Longest time to wait for the queue to drain, in seconds
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._worker.join(timeout)
+        stats = self.stats()
+        if stats["queued"]:
+            logger.warning(f"Result writer stopped with {stats['queued']} rows still queued")
+        logger.info(f"Result writer stopped: {stats}")
+
+    def stats(self):
+        """Return the number of queued, written, dropped and failed rows"""
+        with self._condition:
+            return {"queued": self._queued_rows, **self._counters}
+
+    def _run(self):
+        """Worker loop: collect queued results, insert them, until closed and drained"""
+        while True:
+            items = self._collect()
+            if items is None:
+                return
+            self._write(items)
+
+    def _collect(self):
+        """Wait for a full batch or the flush interval, then take the queued results"""
+        with self._condition:
+            while not self._pending:
+                if self._closed:
+                    return None
+                self._condition.wait()
+
+            deadline = time.monotonic() + self.flush_interval
+            while self._queued_rows < self.batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            items = []
+            size = 0
+            while self._pending and size < self.batch_size:
+                item = self._pending.popleft()
+                items.append(item)
+                size += len(item[0])
+            self._queued_rows -= size
+            # Room was made for requests waiting on a full queue
+            self._condition.notify_all()
+            return items
+
+    def _write(self, items):
+        """Insert collected results in statements of at most batch_size rows"""
+        rows = [
+            AnalyzedTweet.from_score(tweet, score, model_version).to_dict()
+            for tweets, scores, model_version in items
+            for tweet, score in zip(tweets, scores)
+        ]
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            try:
+                self.insert_fn(batch)
+                outcome = "written"
+            except Exception as e:
+                # Results are best effort: never retry forever and grow the queue
+                logger.error(f"Error inserting {len(batch)} analysis results: {e}")
+                outcome = "failed"
+            with self._condition:
+                self._counters[outcome] += len(batch)
+
+
+def create_insert_fn(database_uri, pool_size=2):
+    """
+    Build a function inserting analyzed_tweets rows through a pooled connection
+
+    Args:
+        database_uri: SQLAlchemy database URI
+        pool_size: Number of connections kept open
+
+    Returns:
+        Function inserting a list of row dicts in a single transaction
+    """
+    # Only needed when persistence is enabled
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(
+        database_uri,
+        pool_size=pool_size,
+        # Connections idle past MySQL's wait_timeout are replaced instead of failing a batch
+        pool_pre_ping=True,
+        pool_recycle=3600,
+    )
+    statement = text(INSERT_ANALYZED_TWEETS)
+
+    def insert(rows):
+        # A list of parameter sets runs as executemany, which pymysql sends as multi-row INSERTs
+        with engine.begin() as connection:
+            connection.execute(statement, rows)
+
+    return insert
+
+
+def init_app(app):
+    """
+    Start the result writer of the application if persistence is enabled
+
+    Args:
+        app: Flask application instance
+    """
+    if not app.config["PERSIST_RESULTS"]:
+        return
+
+    writer = ResultWriter(
+        create_insert_fn(app.config["SQLALCHEMY_DATABASE_URI"], pool_size=app.config["DB_POOL_SIZE"]),
+        batch_size=app.config["PERSIST_BATCH_SIZE"],
+        flush_interval_seconds=app.config["PERSIST_FLUSH_INTERVAL_SECONDS"],
+        max_queue_size=app.config["PERSIST_QUEUE_SIZE"],
+        block_timeout_seconds=app.config["PERSIST_BLOCK_TIMEOUT_MS"] / 1000.0,
+    )
+    # Flush what is still queued when the worker exits
+    atexit.register(writer.close)
+    app.extensions["result_writer"] = writer
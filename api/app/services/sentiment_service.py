@@ -1,109 +1,240 @@
 from typing import Dict, List, Any
-from ..utils.logger import logger
-import boto3
-from botocore.config import Config
-import os
-import joblib
-import re
-import tempfile
+from shared.artifacts import get_s3_client
+from shared.normalization import normalize_batch
+from ..utils.logger import SAMPLED, logger
+from ..utils.metrics import STAGE_SECONDS, record_batch
+from .cache import ResultCache, make_cache_key
+from .model_registry import ModelRegistry
+from .model_store import DEFAULT_KEEP, LocalModelStore
+from .model_watcher import ModelWatcher
+import numpy as np
+import threading
 import time
-from botocore.exceptions import ClientError
 
 
 class SentimentService:
     """Service for analyzing sentiment in tweets"""
-    
-    def __init__(self):
-        """Initialize the sentiment service"""
-        self.model = None
-        self.vectorizer = None
-        self._load_models_from_minio_with_retry()
+
+    def __init__(
+        self,
+        model_path,
+        cache_size=100000,
+        cache_ttl_seconds=None,
+        inference_pool=None,
+        models_max_memory_mb=512,
+        model_idle_seconds=3600,
+        model_store_keep=DEFAULT_KEEP,
+    ):
+        """
+        Initialize the sentiment service without loading the model (see start)
+
+        Args:
+            model_path: Directory of the local model cache shared by the workers of a host
+            cache_size: Maximum number of cached scores, 0 disables caching
+            cache_ttl_seconds: Lifetime of a cached score in seconds, None for no expiry
+            inference_pool: Optional InferencePool scoring large batches in other processes
+            models_max_memory_mb: Estimated memory the loaded model versions may hold
+            model_idle_seconds: Unused time after which a model version other than the default is evicted
+            model_store_keep: Number of model versions kept in the local model cache
+        """
+        self.load_error = None
+        self.watcher = None
+        self.store = LocalModelStore(model_path, keep=model_store_keep)
+        # Every (vectorizer, model, scorer) triple lives behind a single reference so
+        # that a reload swaps it atomically and requests never see a mixed pair
+        self.cache = ResultCache(max_size=cache_size, ttl_seconds=cache_ttl_seconds)
+        self.registry = ModelRegistry(
+            self.store,
+            max_memory_mb=models_max_memory_mb,
+            idle_seconds=model_idle_seconds,
+            on_default_swap=self._on_default_swap,
+        )
+        self.inference_pool = inference_pool
         logger.info("Sentiment service initialized")
-        
+
+    def start(self, reload_interval_seconds=0):
+        """
+        Load the default model in the background, then keep watching the registry manifest
+
+        Args:
+            reload_interval_seconds: Delay between checks for new artifacts, 0 disables hot reload
+        """
+        thread = threading.Thread(
+            target=self._initial_load,
+            args=(reload_interval_seconds,),
+            name="model-loader",
+            daemon=True,
+        )
+        thread.start()
+
+    def _initial_load(self, reload_interval_seconds):
+        """Background entry point: first load with retries, then hand over to the watcher"""
+        try:
+            self._load_models_from_minio_with_retry()
+        except Exception as e:
+            self.load_error = str(e)
+            logger.error(f"Initial model load failed: {e}")
+
+        # The watcher also picks up a model that only appears after the retries gave up
+        if reload_interval_seconds > 0:
+            self.watcher = ModelWatcher(self.registry, reload_interval_seconds)
+            self.watcher.start()
+
+    @property
+    def is_ready(self):
+        """Whether the default model is loaded and requests can be served"""
+        return self.registry.default is not None
+
+    @property
+    def model(self):
+        default = self.registry.default
+        return default.model if default else None
+
+    @property
+    def vectorizer(self):
+        default = self.registry.default
+        return default.vectorizer if default else None
+
+    @property
+    def model_version(self):
+        default = self.registry.default
+        return default.version if default else None
+
     def _load_models_from_minio_with_retry(self, max_retries=5, delay=10):
-        """Load the trained model and vectorizer from MinIO with retries"""
+        """Load the default model of the registry manifest from MinIO with retries"""
         for attempt in range(max_retries):
             try:
-                self._load_models_from_minio()
-                return
-            except ClientError as e:
-                if e.response['Error']['Code'] == '404':
-                    logger.warning(f"Models not found in MinIO, attempt {attempt + 1}/{max_retries}")
-                    if attempt < max_retries - 1:
-                        logger.info(f"Waiting {delay} seconds before next attempt...")
-                        time.sleep(delay)
-                        continue
-                    raise RuntimeError("Models not found in MinIO after maximum retries")
-                raise
+                self.registry.refresh(get_s3_client())
             except Exception as e:
                 logger.error(f"Unexpected error loading models: {e}")
                 raise
 
-    def _load_models_from_minio(self):
-        """Load the trained model and vectorizer from MinIO"""
-        try:
-            # Initialize MinIO client
-            s3_client = boto3.client(
-                's3',
-                endpoint_url=os.environ.get('MINIO_ENDPOINT_URL', 'http://minio:9000'),
-                aws_access_key_id=os.environ.get('MINIO_ACCESS_KEY', 'minioadmin'),
-                aws_secret_access_key=os.environ.get('MINIO_SECRET_KEY', 'minioadmin'),
-                config=Config(signature_version='s3v4'),
-                region_name=os.environ.get('MINIO_REGION_NAME', 'us-east-1')
-            )
-
-            # Create temporary files to store the downloaded models
-            with tempfile.NamedTemporaryFile() as model_temp, tempfile.NamedTemporaryFile() as vectorizer_temp:
-                # Download files from MinIO
-                s3_client.download_file('ml-models', 'trained_model.joblib', model_temp.name)
-                s3_client.download_file('ml-models', 'vectorizer.joblib', vectorizer_temp.name)
-                
-                # Load the models
-                self.model = joblib.load(model_temp.name)
-                self.vectorizer = joblib.load(vectorizer_temp.name)
-                
-            logger.info("Successfully loaded model and vectorizer from MinIO")
-        except Exception as e:
-            logger.error(f"Error loading models from MinIO: {e}")
-            raise
+            if self.is_ready:
+                self.load_error = None
+                logger.info(f"Successfully loaded model {self.model_version} from MinIO")
+                return
 
-    def _clean_text(self, text: str) -> str:
-        """Clean the text using the same method as training"""
-        text = text.lower()
-        text = re.sub(r'[^a-zA-Z\s]', '', text)
-        text = ' '.join(text.split())
-        return text
+            logger.warning(f"No model version published in MinIO, attempt {attempt + 1}/{max_retries}")
+            if attempt < max_retries - 1:
+                logger.info(f"Waiting {delay} seconds before next attempt...")
+                time.sleep(delay)
+        raise RuntimeError("No model version published in MinIO after maximum retries")
 
-    def analyze_tweets(self, tweets: List[str]) -> List[Dict[str, Any]]:
+    def swap_model(self, loaded):
+        """
+        Atomically replace the model served by default
+
+        Args:
+            loaded: LoadedModel to serve from now on
+        """
+        self.registry.set_default(loaded)
+        self.load_error = None
+
+    def _on_default_swap(self, previous, loaded):
+        """Free the result cache of the version no longer served by default"""
+        dropped = self.cache.discard_version(previous.version)
+        logger.info(f"Dropped {dropped} cached scores of model {previous.version}")
+
+    def get_model(self, selector=None):
+        """
+        Return the model selected by a request, loading it on first use
+
+        Args:
+            selector: Alias or version id of the registry, None for the default model
+
+        Returns:
+            LoadedModel, None if no default model is loaded yet
+
+        Raises:
+            ResourceNotFoundError if the selector names no published version
+        """
+        default = self.registry.default
+        if selector is None:
+            return default
+        version = self.registry.resolve(selector)
+        if default is not None and default.version == version:
+            return default
+        return self.registry.get(version)
+
+    def analyze_tweets(self, tweets: List[str], loaded=None) -> List[Dict[str, Any]]:
         """
         Analyze the sentiment of a list of tweets
-        
+
         Args:
             tweets: List of tweet texts to analyze
-            
+            loaded: LoadedModel to score with, the default model when None
+
         Returns:
             List of dictionaries containing analyzed tweets and their sentiment scores
         """
-        logger.info(f"Analyzing sentiment for {len(tweets)} tweets")
-        
+        scores = self.score_tweets(tweets, loaded)
+        with STAGE_SECONDS.time("build"):
+            return build_results(tweets, scores)
+
+    def score_tweets(self, tweets: List[str], loaded=None) -> np.ndarray:
+        """
+        Compute the sentiment score of each tweet
+
+        Args:
+            tweets: List of tweet texts to analyze
+            loaded: LoadedModel to score with, the default model when None
+
+        Returns:
+            NumPy array with one score between -1 and 1 per tweet, in order
+        """
+        logger.info(f"Analyzing sentiment for {len(tweets)} tweets", extra=SAMPLED)
+        record_batch(len(tweets))
+
+        # Pin the model for the whole request, a concurrent reload or eviction must not affect it
+        active = loaded or self.registry.default
+
         # Clean tweets
-        cleaned_tweets = [self._clean_text(tweet) for tweet in tweets]
-        
-        # Vectorize tweets
-        vectorized_tweets = self.vectorizer.transform(cleaned_tweets)
-        
-        # Get predictions and probabilities
-        predictions = self.model.predict(vectorized_tweets)
-        probabilities = self.model.predict_proba(vectorized_tweets)
-        
-        # Convert predictions to scores using probabilities
-        results = []
-        for tweet, pred, proba in zip(tweets, predictions, probabilities):
-            score = proba[1] if pred == 1 else -proba[0]
-            results.append({
-                "tweet": tweet,
-                "score": float(score),
-
-            })
-            
-        return results 
\ No newline at end of file
+        with STAGE_SECONDS.time("clean"):
+            cleaned_tweets = normalize_batch(tweets)
+
+        with STAGE_SECONDS.time("cache_lookup"):
+            # Collapse duplicates within the request: positions maps each tweet to its unique text
+            unique_positions = {}
+            positions = [unique_positions.setdefault(text, len(unique_positions)) for text in cleaned_tweets]
+            unique_texts = list(unique_positions)
+
+            # Split unique texts into cache hits and misses
+            keys = [make_cache_key(active.version, text) for text in unique_texts]
+            cached_scores = self.cache.get_many(keys)
+            misses = [i for i, score in enumerate(cached_scores) if score is None]
+
+        unique_scores = np.array([np.nan if score is None else score for score in cached_scores])
+        if misses:
+            # Vectorize and score only the misses
+            miss_scores = self._score_texts(active, [unique_texts[i] for i in misses])
+            unique_scores[misses] = miss_scores
+            self.cache.put_many([keys[i] for i in misses], miss_scores.tolist(), active.version)
+
+        return unique_scores[positions]
+
+    def _score_texts(self, active, texts):
+        """Score normalized texts, on the inference pool for large batches, in a single linear pass otherwise"""
+        if self.inference_pool is not None and self.inference_pool.accepts(active, len(texts)):
+            try:
+                # Vectorized and scored in the pool processes: timed as a single stage
+                with STAGE_SECONDS.time("pool_score"):
+                    return self.inference_pool.score(active, texts)
+            except Exception as e:
+                logger.error(f"Inference pool failed, scoring {len(texts)} tweets in process: {e}")
+
+        with STAGE_SECONDS.time("vectorize"):
+            features = active.vectorizer.transform(texts)
+        with STAGE_SECONDS.time("score"):
+            return active.scorer.score(features)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Return the result cache counters along with the model version they apply to"""
+        return {"model_version": self.model_version, **self.cache.stats()}
+
+
+def build_results(tweets: List[str], scores: np.ndarray) -> List[Dict[str, Any]]:
+    """Pair each tweet with its score in the shape of the analyze response"""
+    return [
+        {"tweet": tweet, "score": score}
+        for tweet, score in zip(tweets, scores.tolist())
+    ]
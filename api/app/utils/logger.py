@@ -1,34 +1,175 @@
+import atexit
+import json
 import logging
-import sys
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-# Create logs directory if it doesn't exist
-if not os.path.exists("logs"):
-    os.makedirs("logs")
+from .metrics import metrics
 
-# Configure logger
+# Configure logger: handlers are attached by configure_logging
 logger = logging.getLogger("sentiment_api")
 logger.setLevel(logging.INFO)
 
-# Create console handler
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setLevel(logging.INFO)
-console_format = logging.Formatter(
-    "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
-console_handler.setFormatter(console_format)
-
-# Create file handler
-file_handler = RotatingFileHandler(
-    "logs/api.log", maxBytes=10485760, backupCount=10
-)  # 10MB per file, max 10 files
-file_handler.setLevel(logging.INFO)
-file_format = logging.Formatter(
-    "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Pass as extra to mark a high-volume info line, e.g. one per request, subject to LOG_SAMPLE_RATE
+SAMPLED = {"sampled": True}
+
+LOG_RECORDS_DROPPED = metrics.counter(
+    "sentiment_log_records_dropped_total",
+    "Log records dropped because the log queue was full",
 )
-file_handler.setFormatter(file_format)
 
-# Add handlers to logger
-logger.addHandler(console_handler)
-logger.addHandler(file_handler) 
\ No newline at end of file
+# Attributes of every LogRecord, the others were passed as extra
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener = None
+_queue_handler = None
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking the caller when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._reported = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record):
+        """Resolve the message and traceback now, leave the formatting to the listener thread"""
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            LOG_RECORDS_DROPPED.inc()
+            return
+
+        # Once there is room again, say how many records were lost in between
+        if self.dropped != self._reported:
+            with self._lock:
+                lost = self.dropped - self._reported
+                self._reported = self.dropped
+            if lost:
+                warning = logging.makeLogRecord({
+                    "name": record.name,
+                    "levelno": logging.WARNING,
+                    "levelname": "WARNING",
+                    "msg": f"Log queue was full, dropped {lost} log records",
+                })
+                try:
+                    self.queue.put_nowait(warning)
+                except queue.Full:
+                    pass
+
+
+class _BlockingStopListener(QueueListener):
+    """QueueListener whose stop waits for room in a full queue instead of failing"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a random fraction of the records marked with SAMPLED, every other record passes"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return not getattr(record, "sampled", False) or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the extra fields passed to the logging call"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        entry.update(
+            (key, value) for key, value in vars(record).items()
+            if key not in _RECORD_ATTRIBUTES and key != "sampled"
+        )
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(app):
+    """
+    Attach the log handlers of the application behind a queue
+
+    Log calls only put the record on a bounded queue; a listener thread formats
+    it and writes it to stdout and the rotating log file. When the queue is full,
+    records are dropped and counted rather than making requests wait on the disk.
+
+    Args:
+        app: Flask application instance
+    """
+    global _listener, _queue_handler
+
+    level = getattr(logging, app.config["LOG_LEVEL"].upper())
+    formatter = JsonFormatter() if app.config["LOG_FORMAT"] == "json" else logging.Formatter(TEXT_FORMAT)
+
+    # Create console handler
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(formatter)
+    handlers = [console_handler]
+
+    # Create file handler
+    if app.config["LOG_DIR"]:
+        os.makedirs(app.config["LOG_DIR"], exist_ok=True)
+        file_handler = RotatingFileHandler(
+            os.path.join(app.config["LOG_DIR"], "api.log"), maxBytes=10485760, backupCount=10
+        )  # 10MB per file, max 10 files
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+    # Replace the handlers of a previous application of this process
+    stop_logging()
+    if _queue_handler is not None:
+        logger.removeHandler(_queue_handler)
+
+    log_queue = queue.Queue(maxsize=app.config["LOG_QUEUE_SIZE"])
+    _queue_handler = DroppingQueueHandler(log_queue)
+    if app.config["LOG_SAMPLE_RATE"] < 1:
+        _queue_handler.addFilter(SamplingFilter(app.config["LOG_SAMPLE_RATE"]))
+    logger.setLevel(level)
+    logger.addHandler(_queue_handler)
+
+    _listener = _BlockingStopListener(log_queue, *handlers)
+    _listener.start()
+
+
+def stop_logging():
+    """Write the queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
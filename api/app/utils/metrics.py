@@ -0,0 +1,471 @@
+import atexit
+import bisect
+import fcntl
+import glob
+import json
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+# Latency buckets in seconds, from sub-millisecond stages to multi-second batches
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+# Tweets per request
+BATCH_SIZE_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+
+# Window over which the throughput gauge averages analyzed tweets
+THROUGHPUT_WINDOW_SECONDS = 60
+
+SNAPSHOT_PATTERN = "metrics_*.json"
+ARCHIVE_FILE = "archive.json"
+LOCK_FILE = ".lock"
+
+
+class _Metric:
+    """Base of the metric types: a name, a help text and one series per label values"""
+
+    type = None
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _check_labels(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+
+    def snapshot(self) -> Dict[str, object]:
+        """Plain-data copy of the metric, as written to a worker's snapshot file"""
+        with self._lock:
+            series = [[list(labels), self._copy_value(value)] for labels, value in self._series.items()]
+        return {
+            "type": self.type,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "series": series,
+        }
+
+    @staticmethod
+    def _copy_value(value):
+        return value
+
+
+class Counter(_Metric):
+    """Monotonic count, summed across workers"""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, *labels):
+        """Add amount to the series of the given label values"""
+        self._check_labels(labels)
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """Current value, summed across the live workers only"""
+
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), function: Optional[Callable[[], float]] = None):
+        """
+        Args:
+            function: Computes the value of an unlabelled gauge when a snapshot is taken
+        """
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def set(self, value: float, *labels):
+        """Set the series of the given label values"""
+        self._check_labels(labels)
+        with self._lock:
+            self._series[labels] = value
+
+    def set_only(self, value: float, *labels):
+        """Set one series and drop every other, e.g. to publish the model version as a label"""
+        self._check_labels(labels)
+        with self._lock:
+            self._series = {labels: value}
+
+    def replace(self, values: Dict[tuple, float]):
+        """Replace every series at once, values maps each tuple of label values to its value"""
+        for labels in values:
+            self._check_labels(labels)
+        with self._lock:
+            self._series = dict(values)
+
+    def snapshot(self):
+        if self.function is not None:
+            self.set(self.function())
+        return super().snapshot()
+
+
+class Histogram(_Metric):
+    """Distribution over fixed buckets, summed across workers"""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, buckets: Sequence[float], labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        """Record a value: a bisect and two additions under the lock, cheap enough for the request path"""
+        self._check_labels(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # One count per bucket plus the +Inf bucket, then the sum of the values
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, *labels):
+        """Context manager observing the seconds spent in its block"""
+        return _Timer(self, labels)
+
+    def snapshot(self):
+        result = super().snapshot()
+        result["buckets"] = list(self.buckets)
+        return result
+
+    @staticmethod
+    def _copy_value(value):
+        return list(value)
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class RateWindow:
+    """Events per second over a sliding window, kept in one slot per second"""
+
+    def __init__(self, window_seconds: int = THROUGHPUT_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self._seconds = [0] * window_seconds
+        self._counts = [0] * window_seconds
+        self._lock = threading.Lock()
+
+    def add(self, amount: int):
+        """Count amount events now"""
+        now = int(time.monotonic())
+        slot = now % self.window_seconds
+        with self._lock:
+            if self._seconds[slot] != now:
+                self._seconds[slot] = now
+                self._counts[slot] = 0
+            self._counts[slot] += amount
+
+    def rate(self) -> float:
+        """Average events per second over the window"""
+        oldest = int(time.monotonic()) - self.window_seconds
+        with self._lock:
+            total = sum(count for second, count in zip(self._seconds, self._counts) if second > oldest)
+        return total / self.window_seconds
+
+
+class MetricsRegistry:
+    """Metrics of a worker, optionally shared with the other workers of the host through a directory"""
+
+    def __init__(self):
+        self._metrics = {}
+        self.directory = None
+        self._flusher = None
+
+    def register(self, metric):
+        """Add a metric to the registry and return it"""
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        """Create and register a counter"""
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), function=None) -> Gauge:
+        """Create and register a gauge"""
+        return self.register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name, documentation, buckets, labelnames=()) -> Histogram:
+        """Create and register a histogram"""
+        return self.register(Histogram(name, documentation, buckets, labelnames))
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        """Plain-data copy of every metric of this worker"""
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def start_sharing(self, directory: str, flush_interval_seconds: float = 5):
+        """
+        Publish this worker's metrics to a directory shared by the workers of the host
+
+        Each worker rewrites its own snapshot file every flush interval and at exit,
+        and the worker answering a scrape merges all of them.
+
+        Args:
+            directory: Directory shared by the workers
+            flush_interval_seconds: Delay between two writes of the snapshot file
+        """
+        if self.directory is not None:
+            return
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._flusher = threading.Thread(
+            target=self._flush_loop,
+            args=(flush_interval_seconds,),
+            name="metrics-flusher",
+            daemon=True,
+        )
+        self._flusher.start()
+        atexit.register(self.write_snapshot)
+
+    def _flush_loop(self, flush_interval_seconds):
+        """Background loop rewriting the snapshot file until the process exits"""
+        while True:
+            time.sleep(flush_interval_seconds)
+            try:
+                self.write_snapshot()
+            except OSError:
+                # The next flush or scrape tries again
+                pass
+
+    def write_snapshot(self):
+        """Atomically replace this worker's snapshot file"""
+        if self.directory is None:
+            return
+        path = os.path.join(self.directory, f"metrics_{os.getpid()}.json")
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(temporary, path)
+
+    def collect(self) -> Dict[str, Dict[str, object]]:
+        """
+        Merge the metrics of every worker of the host
+
+        Counters and histograms are summed over every worker that ever wrote a
+        snapshot, so they never go backwards when a worker is replaced: the
+        snapshots of dead workers are folded into an archive file. Gauges only
+        describe the present and are summed over the live workers.
+
+        Returns:
+            Merged metrics in the snapshot format
+        """
+        if self.directory is None:
+            return self.snapshot()
+
+        self.write_snapshot()
+        with open(os.path.join(self.directory, LOCK_FILE), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            archive_path = os.path.join(self.directory, ARCHIVE_FILE)
+            archive = _read_json(archive_path) or {}
+            live = []
+            dead_paths = []
+            for path in glob.glob(os.path.join(self.directory, SNAPSHOT_PATTERN)):
+                snapshot = _read_json(path)
+                if snapshot is None:
+                    continue
+                pid = int(os.path.basename(path)[len("metrics_"):-len(".json")])
+                if _is_alive(pid):
+                    live.append(snapshot)
+                else:
+                    archive = merge_snapshots([archive, snapshot], include_gauges=False)
+                    dead_paths.append(path)
+
+            if dead_paths:
+                temporary = f"{archive_path}.tmp"
+                with open(temporary, "w") as f:
+                    json.dump(archive, f)
+                os.replace(temporary, archive_path)
+                for path in dead_paths:
+                    os.remove(path)
+
+        return merge_snapshots(live + [archive], include_gauges=True)
+
+
+def merge_snapshots(snapshots: List[Dict], include_gauges: bool = True) -> Dict[str, Dict[str, object]]:
+    """
+    Sum several snapshots series by series
+
+    Args:
+        snapshots: Snapshots in the format of MetricsRegistry.snapshot
+        include_gauges: False to leave gauges out, e.g. for dead workers
+
+    Returns:
+        Merged snapshot
+    """
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            if metric["type"] == "gauge" and not include_gauges:
+                continue
+            target = merged.setdefault(name, {**metric, "series": {}})
+            for labels, value in metric["series"]:
+                key = tuple(labels)
+                current = target["series"].get(key)
+                if current is None:
+                    target["series"][key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    target["series"][key] = [a + b for a, b in zip(current, value)]
+                else:
+                    target["series"][key] = current + value
+
+    for metric in merged.values():
+        metric["series"] = [[list(labels), value] for labels, value in metric["series"].items()]
+    return merged
+
+
+def render(snapshot: Dict[str, Dict[str, object]]) -> str:
+    """
+    Format a snapshot in the Prometheus text exposition format
+
+    Args:
+        snapshot: Snapshot in the format of MetricsRegistry.snapshot
+
+    Returns:
+        Exposition text, one sample per line
+    """
+    lines = []
+    for name, metric in sorted(snapshot.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        labelnames = metric["labelnames"]
+        for labels, value in sorted(metric["series"], key=lambda series: series[0]):
+            pairs = list(zip(labelnames, labels))
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(pairs)} {_format_value(value)}")
+                continue
+
+            cumulative = 0
+            for bound, count in zip(metric["buckets"] + [math.inf], value[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(pairs + [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(pairs)} {_format_value(value[-1])}")
+            lines.append(f"{name}_count{_format_labels(pairs)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _read_json(path):
+    """Read a snapshot or archive file, None if it vanished or is being replaced"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# Metrics of the API, shared by the modules that record them
+metrics = MetricsRegistry()
+
+STAGE_SECONDS = metrics.histogram(
+    "sentiment_stage_seconds",
+    "Seconds spent in each stage of an analysis request",
+    LATENCY_BUCKETS,
+    ("stage",),
+)
+REQUEST_SECONDS = metrics.histogram(
+    "sentiment_request_seconds",
+    "Seconds to answer an analysis request, by response mode",
+    LATENCY_BUCKETS,
+    ("mode",),
+)
+BATCH_SIZE = metrics.histogram(
+    "sentiment_batch_size",
+    "Tweets per scored batch",
+    BATCH_SIZE_BUCKETS,
+)
+TWEETS_TOTAL = metrics.counter(
+    "sentiment_tweets_total",
+    "Tweets scored",
+)
+_throughput = RateWindow()
+THROUGHPUT = metrics.gauge(
+    "sentiment_throughput_tweets_per_second",
+    f"Tweets scored per second over the last {THROUGHPUT_WINDOW_SECONDS} seconds",
+    function=_throughput.rate,
+)
+MODEL_VERSION = metrics.gauge(
+    "sentiment_model_version_workers",
+    "Workers serving each model version by default",
+    ("version",),
+)
+MODELS_LOADED_BYTES = metrics.gauge(
+    "sentiment_models_loaded_bytes",
+    "Estimated memory of each model version held by the workers",
+    ("version",),
+)
+MODEL_LOADS = metrics.counter(
+    "sentiment_model_loads_total",
+    "Model versions loaded into a worker",
+)
+MODEL_EVICTIONS = metrics.counter(
+    "sentiment_model_evictions_total",
+    "Model versions evicted from a worker, idle or to stay within its memory budget",
+)
+
+
+def record_batch(size):
+    """Count a scored batch in the batch size, tweet count and throughput metrics"""
+    BATCH_SIZE.observe(size)
+    TWEETS_TOTAL.inc(size)
+    _throughput.add(size)
+
+
+def init_app(app):
+    """
+    Share the metrics across the workers of the host if METRICS_DIR is set
+
+    Args:
+        app: Flask application instance
+    """
+    if app.config["METRICS_DIR"]:
+        metrics.start_sharing(app.config["METRICS_DIR"], app.config["METRICS_FLUSH_INTERVAL_SECONDS"])
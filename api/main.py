@@ -1,6 +1,7 @@
 from app.factory import create_app
 
-app = create_app()
-
+# Only when run as a script: the spawned inference pool processes import this
+# module again as __mp_main__ and must not build an app of their own
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000) 
\ No newline at end of file
+    app = create_app()
+    app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,4 @@
+from app.factory import create_app
+
+# Entry point of WSGI servers, e.g. gunicorn wsgi:app
+app = create_app()
@@ -11,4 +11,16 @@ SOURCE /docker-entrypoint-initdb.d/migrations/001_create_tweets_table.sql;
 SOURCE /docker-entrypoint-initdb.d/migrations/002_add_indexes.sql;
 
 -- Run migration 3: Add timestamps
-SOURCE /docker-entrypoint-initdb.d/migrations/003_add_timestamps.sql;
\ No newline at end of file
+SOURCE /docker-entrypoint-initdb.d/migrations/003_add_timestamps.sql;
+
+-- Run migration 4: Add updated_at index
+SOURCE /docker-entrypoint-initdb.d/migrations/004_add_updated_at_index.sql;
+
+-- Run migration 5: Create analyzed_tweets table
+SOURCE /docker-entrypoint-initdb.d/migrations/005_create_analyzed_tweets_table.sql;
+
+-- Run migration 6: Add unique text hash
+SOURCE /docker-entrypoint-initdb.d/migrations/006_add_text_hash_unique_index.sql;
+
+-- Run migration 7: Create tweet_scores table
+SOURCE /docker-entrypoint-initdb.d/migrations/007_create_tweet_scores_table.sql;
@@ -0,0 +1,7 @@
+-- Migration: Add index on updated_at for incremental training snapshots
+
+-- Use the sentiment_analysis database
+USE sentiment_db;
+
+-- Create index so rows changed since the last snapshot are found without a full scan
+CREATE INDEX idx_updated_at ON tweets(updated_at);
\ No newline at end of file
@@ -0,0 +1,22 @@
+-- Migration: Create the analyzed_tweets table
+
+-- Use the sentiment_analysis database
+USE sentiment_db;
+
+-- Tweets scored by the API, kept apart from the annotated tweets the model is trained on
+CREATE TABLE IF NOT EXISTS analyzed_tweets (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    text TEXT NOT NULL,
+    score FLOAT NOT NULL,
+    positive TINYINT(1) NOT NULL DEFAULT 0,
+    negative TINYINT(1) NOT NULL DEFAULT 0,
+    model_version VARCHAR(64) NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create indexes for time-based and per-model queries
+CREATE INDEX idx_analyzed_created_at ON analyzed_tweets(created_at);
+CREATE INDEX idx_analyzed_model_version ON analyzed_tweets(model_version);
+
+-- Add comment to the table
+ALTER TABLE analyzed_tweets COMMENT = 'Stores tweets analyzed by the API and their predicted sentiment';
@@ -0,0 +1,21 @@
+-- Migration: Add a unique text hash to tweets so bulk loads skip already known tweets
+
+-- Use the sentiment_analysis database
+USE sentiment_db;
+
+-- Hash of the exact text: unlike an index on text itself, it ignores the collation's case and accent folding
+ALTER TABLE tweets
+ADD COLUMN text_hash BINARY(32) AS (UNHEX(SHA2(text, 256))) STORED;
+
+-- Remove the duplicates an existing table may hold, keeping the first copy (smallest id) of each text
+DELETE t
+FROM tweets t
+JOIN (
+    SELECT text_hash, MIN(id) AS keep_id
+    FROM tweets
+    GROUP BY text_hash
+    HAVING COUNT(*) > 1
+) duplicates ON t.text_hash = duplicates.text_hash AND t.id > duplicates.keep_id;
+
+-- Create unique index so duplicate tweets are rejected by the database
+CREATE UNIQUE INDEX uq_tweets_text_hash ON tweets(text_hash);
@@ -0,0 +1,20 @@
+-- Migration: Create the tweet_scores table
+
+-- Use the sentiment_analysis database
+USE sentiment_db;
+
+-- Scores of the annotated tweets by the offline scoring job, one row per tweet.
+-- Kept out of the tweets table so rescoring never bumps tweets.updated_at, which drives incremental training,
+-- and without a foreign key so deleting a tweet during a scoring run can't fail its bulk write.
+CREATE TABLE IF NOT EXISTS tweet_scores (
+    tweet_id INT PRIMARY KEY,
+    score FLOAT NOT NULL,
+    model_version VARCHAR(64) NOT NULL,
+    scored_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create index for per-model queries
+CREATE INDEX idx_tweet_scores_model_version ON tweet_scores(model_version);
+
+-- Add comment to the table
+ALTER TABLE tweet_scores COMMENT = 'Stores the latest offline score of each annotated tweet and the model that produced it';
@@ -0,0 +1,100 @@
+import argparse
+import json
+import math
+import os
+import tempfile
+import time
+
+import train
+from utils.synthetic import InMemoryDatabase, generate_tweets
+
+
+def run_benchmark(sizes, mode="batch"):
+    """
+    Run the training pipeline on synthetic tables of increasing size
+
+    Every run starts from empty snapshot and feature cache directories and never
+    touches MinIO, so the numbers are those of a cold weekly run.
+
+    Args:
+        sizes: Numbers of rows to benchmark
+        mode: Training mode, batch or online
+
+    Returns:
+        List of per-size profiling reports
+    """
+    runs = []
+    for n_rows in sizes:
+        print(f"\n=== {mode} training on {n_rows} synthetic rows ===")
+        start = time.perf_counter()
+        db = InMemoryDatabase(generate_tweets(n_rows))
+        generate_seconds = time.perf_counter() - start
+
+        with tempfile.TemporaryDirectory() as directory:
+            os.environ['SNAPSHOT_DIR'] = os.path.join(directory, 'snapshot')
+            os.environ['FEATURE_CACHE_DIR'] = os.path.join(directory, 'features')
+            if mode == "online":
+                profiler = train.train_online(db, use_minio=False)
+            else:
+                profiler = train.train_batch(db, use_minio=False)
+
+        runs.append(profiler.to_dict(mode=mode, rows=n_rows, generate_seconds=generate_seconds))
+    return runs
+
+
+def print_scaling(runs):
+    """
+    Print the time of each stage per size and its empirical scaling exponent
+
+    The exponent k between two sizes is such that time grows as rows ** k: 1 is
+    linear, above 1 is superlinear and will dominate as the table grows.
+    """
+    stages = list(dict.fromkeys(stage["name"] for run in runs for stage in run["stages"]))
+    header = f"{'stage':<12}" + "".join(f"{run['rows']:>12}" for run in runs)
+    if len(runs) > 1:
+        header += f"{'exponent':>10}"
+    print("\nSeconds per stage:")
+    print(header)
+
+    for name in stages + ["total"]:
+        if name == "total":
+            seconds = [run["total_seconds"] for run in runs]
+        else:
+            seconds = [
+                next((stage["seconds"] for stage in run["stages"] if stage["name"] == name), 0.0)
+                for run in runs
+            ]
+        line = f"{name:<12}" + "".join(f"{value:12.2f}" for value in seconds)
+        if len(runs) > 1 and seconds[0] > 0 and seconds[-1] > 0:
+            exponent = math.log(seconds[-1] / seconds[0]) / math.log(runs[-1]["rows"] / runs[0]["rows"])
+            line += f"{exponent:10.2f}"
+        print(line)
+
+    print("\nPeak RSS (MB):")
+    print("".join(f"{run['rows']:>12}" for run in runs))
+    print("".join(f"{run['peak_rss_mb']:12.0f}" for run in runs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the training pipeline on synthetic data")
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=[10000, 100000, 1000000],
+        help="Table sizes to benchmark",
+    )
+    parser.add_argument("--mode", choices=("batch", "online"), default="batch", help="Training mode")
+    parser.add_argument("--output", default="benchmark_report.json", help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    runs = run_benchmark(sorted(args.rows), mode=args.mode)
+    print_scaling(runs)
+
+    with open(args.output, "w") as f:
+        json.dump(runs, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
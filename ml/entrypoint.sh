@@ -10,12 +10,13 @@ cron
 # Create log file
 touch /var/log/cron.log
 
-# Run the training script once at startup (optional)
+# Run an online update once at startup (optional): on an empty registry it trains from the
+# whole table and, as the first version, is served by default, then followed by the hourly updates
 # Comment out the next line if you don't want to run training immediately
-python train.py >> /var/log/cron.log 2>&1
+python train.py --mode online --promote following >> /var/log/cron.log 2>&1
 
 # Output message
-echo "ML container started. Training will run weekly on Sunday at 1:00 AM." >> /var/log/cron.log
+echo "ML container started. Online updates run hourly, batch refits weekly on Sunday at 1:30 AM." >> /var/log/cron.log
 
 # Tail the log file to keep the container running
 tail -f /var/log/cron.log
\ No newline at end of file
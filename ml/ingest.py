@@ -0,0 +1,147 @@
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+from mysql.connector import Error
+
+from utils.db import DatabaseOperations
+
+# Longest text the tweets table holds
+MAX_TEXT_LENGTH = 280
+
+FILE_FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+
+def read_labelled_tweets(path, file_format=None, chunk_size=50000):
+    """
+    Read a file of labelled tweets in chunks
+
+    Args:
+        path: CSV file with a header, or NDJSON file with one object per line
+        file_format: csv or ndjson, inferred from the extension when None
+        chunk_size: Number of rows per chunk
+
+    Yields:
+        DataFrames of at most chunk_size rows with the columns of the file
+    """
+    if file_format is None:
+        file_format = FILE_FORMATS.get(os.path.splitext(path)[1].lower())
+        if file_format is None:
+            raise ValueError(f"Cannot infer the format of {path}, pass --format")
+
+    if file_format == "csv":
+        # Keep texts such as "NA" or "null" as they are
+        reader = pd.read_csv(path, chunksize=chunk_size, dtype={"text": str}, keep_default_na=False)
+    else:
+        reader = pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False)
+
+    with reader:
+        for chunk in reader:
+            yield chunk
+
+
+def prepare_chunk(chunk):
+    """
+    Validate a chunk of labelled tweets and shape it for insertion
+
+    A row needs a non-empty text of at most MAX_TEXT_LENGTH characters and a 0/1
+    positive label; negative defaults to the opposite of positive.
+
+    Args:
+        chunk: DataFrame with text, positive and optionally negative columns
+
+    Returns:
+        (DataFrame of valid rows with unique texts, number of invalid rows)
+    """
+    missing = {"text", "positive"} - set(chunk.columns)
+    if missing:
+        raise ValueError(f"Missing columns: {sorted(missing)}")
+
+    text = chunk["text"].where(chunk["text"].map(type) == str).str.strip()
+    positive = pd.to_numeric(chunk["positive"], errors="coerce")
+    if "negative" in chunk.columns:
+        negative = pd.to_numeric(chunk["negative"], errors="coerce")
+    else:
+        negative = 1 - positive
+
+    valid = (
+        text.str.len().between(1, MAX_TEXT_LENGTH)
+        & positive.isin((0, 1))
+        & negative.isin((0, 1))
+    )
+    frame = pd.DataFrame({
+        "text": text[valid],
+        "positive": positive[valid].astype(int),
+        "negative": negative[valid].astype(int),
+    })
+    # The database skips duplicates too, dropping them here only saves their round trip
+    frame = frame.drop_duplicates("text")
+    return frame, int((~valid).sum())
+
+
+def ingest(db, path, file_format=None, chunk_size=50000, batch_size=5000):
+    """
+    Load a file of labelled tweets into the tweets table
+
+    Tweets already in the table, or earlier in the file, are skipped, so an
+    interrupted load can simply be run again.
+
+    Args:
+        db: DatabaseOperations of the target database
+        path: CSV or NDJSON file of labelled tweets
+        file_format: csv or ndjson, inferred from the extension when None
+        chunk_size: Number of rows read and validated at a time
+        batch_size: Number of rows per INSERT statement and transaction
+
+    Returns:
+        Dict with the number of rows read, inserted, duplicate and invalid
+    """
+    counts = {"read": 0, "inserted": 0, "duplicates": 0, "invalid": 0}
+    start = time.perf_counter()
+
+    for chunk in read_labelled_tweets(path, file_format, chunk_size):
+        frame, invalid = prepare_chunk(chunk)
+        inserted = db.insert_tweets(frame, batch_size=batch_size)
+
+        counts["read"] += len(chunk)
+        counts["inserted"] += inserted
+        counts["duplicates"] += len(chunk) - invalid - inserted
+        counts["invalid"] += invalid
+
+        elapsed = time.perf_counter() - start
+        print(
+            f"{counts['read']} rows read, {counts['inserted']} inserted, "
+            f"{counts['duplicates']} duplicates, {counts['invalid']} invalid "
+            f"({counts['read'] / elapsed:.0f} rows/s)"
+        )
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk load labelled tweets from a CSV or NDJSON file")
+    parser.add_argument("path", help="File with text, positive and optionally negative columns")
+    parser.add_argument("--format", choices=("csv", "ndjson"), help="File format, inferred from the extension by default")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Rows read and validated at a time")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows per INSERT statement and transaction")
+    args = parser.parse_args()
+
+    try:
+        counts = ingest(
+            DatabaseOperations(),
+            args.path,
+            file_format=args.format,
+            chunk_size=args.chunk_size,
+            batch_size=args.batch_size,
+        )
+    except (Error, ValueError) as e:
+        # Batches committed so far stay in the table, running again skips them
+        print(f"Ingest failed: {e}")
+        sys.exit(1)
+
+    print(f"Done: {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import os
+import sys
+
+from shared.registry import DEFAULT_ALIAS, prune_versions, read_manifest, remove_alias, set_alias
+
+MODEL_BUCKET = "ml-models"
+
+
+def list_versions(manifest):
+    """Print the published versions, newest first, with the aliases pointing at each"""
+    aliases = {}
+    for alias, version in sorted(manifest["aliases"].items()):
+        aliases.setdefault(version, []).append(alias)
+
+    versions = sorted(manifest["versions"].items(), key=lambda item: item[1]["created_at"], reverse=True)
+    if not versions:
+        print("No model version published yet")
+    for version, entry in versions:
+        labels = f" [{', '.join(aliases[version])}]" if version in aliases else ""
+        print(f"{version}  {entry.get('mode', '-'):<6}  {entry['created_at']}{labels}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and manage the versions of the model registry")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List the published versions and their aliases")
+    promote_parser = commands.add_parser(
+        "promote",
+        help=f"Serve a version by default, moving the {DEFAULT_ALIAS} alias to it, e.g. 'promote online'",
+    )
+    promote_parser.add_argument("version", help="Version id, or an alias whose version is taken")
+    alias_parser = commands.add_parser(
+        "alias",
+        help="Point an alias at a version, e.g. 'alias latest <version>' to roll back",
+    )
+    alias_parser.add_argument("alias", help="Alias name, e.g. latest, canary or a customer name")
+    alias_parser.add_argument("version", help="Version id, or another alias whose version is taken")
+    unalias_parser = commands.add_parser("unalias", help="Remove an alias")
+    unalias_parser.add_argument("alias", help="Alias name")
+    prune_parser = commands.add_parser("prune", help="Delete old versions that no alias points at")
+    prune_parser.add_argument(
+        "--keep",
+        type=int,
+        default=int(os.environ.get('MODEL_VERSIONS_KEEP', '50')),
+        help="Number of most recent versions kept",
+    )
+    args = parser.parse_args()
+
+    try:
+        if args.command == "list":
+            list_versions(read_manifest(MODEL_BUCKET)[0])
+        elif args.command == "promote":
+            version = set_alias(DEFAULT_ALIAS, args.version, MODEL_BUCKET)
+            print(f"{DEFAULT_ALIAS} -> {version}")
+        elif args.command == "alias":
+            version = set_alias(args.alias, args.version, MODEL_BUCKET)
+            print(f"{args.alias} -> {version}")
+        elif args.command == "unalias":
+            remove_alias(args.alias, MODEL_BUCKET)
+            print(f"Removed alias {args.alias}")
+        else:
+            removed = prune_versions(args.keep, MODEL_BUCKET)
+            print(f"Removed {len(removed)} versions: {', '.join(removed) or '-'}")
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from botocore.exceptions import BotoCoreError, ClientError
+from mysql.connector import Error
+
+from shared.artifacts import download_artifacts
+from shared.bundle import BUNDLE_KEY, load_bundle
+from shared.normalization import NORMALIZER_VERSION, normalize_batch
+from shared.registry import DEFAULT_ALIAS, read_manifest, resolve_version, version_key
+from shared.scoring import LinearScorer
+from utils.db import DatabaseOperations
+
+MODEL_BUCKET = "ml-models"
+
+# Vectorizer and scorer of a worker process, loaded once by its initializer
+_worker_model = None
+
+
+def fetch_published_bundle(directory, selector=None, client=None):
+    """
+    Download the bundle of a published model version
+
+    Args:
+        directory: Directory to download the bundle into
+        selector: Alias or version id in the model registry, None for the latest version
+        client: S3 client to use instead of the process-wide one
+
+    Returns:
+        Tuple of (path of the bundle, version id)
+    """
+    manifest, _ = read_manifest(MODEL_BUCKET, client)
+    version = resolve_version(manifest, selector)
+    if version is None:
+        raise ValueError(f"No model version {selector or DEFAULT_ALIAS} published in {MODEL_BUCKET}")
+    if BUNDLE_KEY not in manifest["versions"][version]["artifacts"]:
+        raise ValueError(f"Model version {version} has no bundle")
+
+    download_artifacts({version_key(version, BUNDLE_KEY): BUNDLE_KEY}, MODEL_BUCKET, directory, client=client)
+    return os.path.join(directory, BUNDLE_KEY), version
+
+
+def load_model(bundle_path):
+    """
+    Load a bundle into a vectorizer and a compiled scorer
+
+    Args:
+        bundle_path: Bundle file written by the trainer
+
+    Returns:
+        Tuple of (vectorizer, LinearScorer)
+    """
+    bundle = load_bundle(bundle_path)
+    if bundle.normalizer_version_ != NORMALIZER_VERSION:
+        raise ValueError(
+            f"Model was trained with text normalizer version {bundle.normalizer_version_}, "
+            f"but this job uses version {NORMALIZER_VERSION}"
+        )
+    return bundle.vectorizer, LinearScorer.from_model(bundle, bundle.vectorizer)
+
+
+def _init_worker(bundle_path):
+    global _worker_model
+    _worker_model = load_model(bundle_path)
+
+
+def score_texts(texts, model=None):
+    """
+    Score raw texts the way the API does
+
+    Args:
+        texts: List of raw tweet texts
+        model: (vectorizer, scorer) pair, defaults to the one of this worker process
+
+    Returns:
+        float32 array of scores between -1 and 1
+    """
+    vectorizer, scorer = model or _worker_model
+    return scorer.score(vectorizer.transform(normalize_batch(texts))).astype(np.float32)
+
+
+def read_checkpoint(path, model_version):
+    """Return the last id written by an interrupted run of the same model, 0 if there is none"""
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    if checkpoint.get("model_version") != model_version:
+        return 0
+    return int(checkpoint["last_id"])
+
+
+def write_checkpoint(path, model_version, last_id):
+    """Record the last id whose score is written, replacing the checkpoint atomically"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        json.dump({"model_version": model_version, "last_id": last_id}, f)
+    os.replace(temporary, path)
+
+
+def score_table(db, bundle_path, model_version, checkpoint_path=None, chunk_size=20000, batch_size=5000, workers=None):
+    """
+    Score every tweet whose score is missing or stale
+
+    Pages of chunk_size rows are read in id order and scored across worker
+    processes while the main process writes the scores of finished pages, in
+    page order. After each page is written its last id goes to the checkpoint,
+    so an interrupted run of the same model resumes after it; pages already
+    scored by this model are skipped by the query anyway, the checkpoint only
+    saves scanning them. The checkpoint is removed once the table is done.
+
+    Args:
+        db: DatabaseOperations of the tweets database
+        bundle_path: Bundle file of the model
+        model_version: Version written with the scores
+        checkpoint_path: JSON checkpoint file, None to always start from the first id
+        chunk_size: Number of rows read and scored at a time
+        batch_size: Number of rows per write statement and transaction
+        workers: Number of scoring processes, defaults to the number of CPUs
+
+    Returns:
+        Dict with the number of rows scored and the last id
+    """
+    workers = workers or os.cpu_count() or 1
+    after_id = read_checkpoint(checkpoint_path, model_version) if checkpoint_path else 0
+    if after_id:
+        print(f"Resuming model {model_version} after id {after_id}")
+
+    counts = {"scored": 0, "last_id": after_id}
+    start = time.perf_counter()
+    # (ids, future of their scores) per page, oldest first
+    pending = deque()
+
+    # Spawned, not forked: workers must not inherit the pooled MySQL connections of this process
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(bundle_path,),
+    ) as executor:
+        done = False
+        while not done:
+            page = db.fetch_unscored_page(model_version, after_id, chunk_size)
+            done = len(page) < chunk_size
+            if len(page):
+                after_id = int(page["id"].iloc[-1])
+                pending.append((page["id"].to_numpy(), executor.submit(score_texts, page["text"].tolist())))
+
+            # Keep one page queued per worker, write the oldest ones beyond that
+            while pending and (done or len(pending) > workers):
+                ids, future = pending.popleft()
+                counts["scored"] += db.upsert_scores(ids, future.result(), model_version, batch_size)
+                counts["last_id"] = int(ids[-1])
+                if checkpoint_path:
+                    write_checkpoint(checkpoint_path, model_version, counts["last_id"])
+
+                elapsed = time.perf_counter() - start
+                print(
+                    f"{counts['scored']} rows scored up to id {counts['last_id']} "
+                    f"({counts['scored'] / elapsed:.0f} rows/s)"
+                )
+
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score the tweets table with a published model")
+    parser.add_argument("--model", help="Alias or version id in the model registry, defaults to the latest version")
+    parser.add_argument("--chunk-size", type=int, default=20000, help="Rows read and scored at a time")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows per write statement and transaction")
+    parser.add_argument("--workers", type=int, help="Scoring processes, defaults to the number of CPUs")
+    parser.add_argument(
+        "--checkpoint",
+        default=os.environ.get('SCORING_CHECKPOINT', os.path.join('data', 'scoring_checkpoint.json')),
+        help="Checkpoint file an interrupted run resumes from",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            bundle_path, model_version = fetch_published_bundle(directory, args.model)
+            print(f"Scoring with model {model_version}")
+            counts = score_table(
+                DatabaseOperations(),
+                bundle_path,
+                model_version,
+                checkpoint_path=args.checkpoint,
+                chunk_size=args.chunk_size,
+                batch_size=args.batch_size,
+                workers=args.workers,
+            )
+        except (Error, ValueError, BotoCoreError, ClientError) as e:
+            # Pages written so far stay in the table, running again resumes after them
+            print(f"Scoring failed: {e}")
+            sys.exit(1)
+
+    print(f"Done: {counts}")
+
+
+if __name__ == "__main__":
+    main()
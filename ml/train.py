@@ -1,117 +1,71 @@
-import re
+import argparse
+import json
+import os
+import tempfile
+from datetime import datetime
+
 import numpy as np
 import pandas as pd
 import joblib
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
+import sklearn
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.metrics import classification_report, confusion_matrix
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.model_selection import HalvingGridSearchCV, train_test_split
+from sklearn.pipeline import Pipeline
 from utils.db import DatabaseOperations
-from utils.s3 import upload_to_minio
-
-db = DatabaseOperations()
-
-# Get ALL data
-last_data = db.fetch_last_7_days_data()
-print(f"Total data retrieved: {len(last_data)}")
+from utils.feature_cache import FeatureCache, PreparedFeatures
+from utils.features import PrunedTfidf, normalize_parallel
+from utils.s3 import download_from_minio, upload_to_minio
+from utils.snapshot import TrainingSnapshot
+from utils.stages import StageProfiler
+from shared.bundle import BUNDLE_KEY, export_bundle
+from shared.normalization import NORMALIZER_VERSION, normalize_batch
+from shared.registry import DEFAULT_ALIAS, prune_versions, publish_version, read_manifest, resolve_version, version_key
 
-# Prepare data
-data = {
-    "text": [],
-    "label": []
-}
-
-for element in last_data:
-    data["text"].append(element["text"])
-    # Use positive flag for binary classification
-    data["label"].append(element["positive"])
+MODEL_BUCKET = 'ml-models'
+MODEL_FILE = 'trained_model.joblib'
+VECTORIZER_FILE = 'vectorizer.joblib'
+REPORT_FILE = 'training_report.json'
 
-df = pd.DataFrame(data)
-
-def clean_text(text: str) -> str:
-    """Enhanced text cleaning"""
-    text = text.lower()
-    # Keep some punctuation that might be important for sentiment
-    text = re.sub(r'[^a-z\s!?.,]', '', text)
-    # Replace multiple punctuation with single
-    text = re.sub(r'([!?])\1+', r'\1', text)
-    text = ' '.join(text.split())
-    return text
-
-df["text_clean"] = df["text"].apply(clean_text)
+# Most recent versions kept in the registry after each publish, aliased ones are always kept
+KEEP_VERSIONS = int(os.environ.get('MODEL_VERSIONS_KEEP', '50'))
 
 # Enhanced stopwords - keep sentiment-related words
-english_stopwords = [
+ENGLISH_STOPWORDS = [
     "the", "and", "is", "in", "to", "of", "that", "was", "for",
     "on", "it", "this", "have", "has", "had", "with", "you", "they",
     "at", "be", "use", "your", "we", "can", "will", "or", "my", "than",
     "then", "else", "what", "when", "who", "which", "there", "from"
 ]
 
-# Use TF-IDF with optimized parameters
-vectorizer = TfidfVectorizer(
-    stop_words=english_stopwords,
-    max_features=300,  # Increased features
-    ngram_range=(1, 3),  # Add trigrams
-    min_df=2,
-    max_df=0.95
-)
-
-X = vectorizer.fit_transform(df["text_clean"])
-y = df["label"]
-
-# Split data
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-# Define parameter grid for GridSearchCV
-param_grid = {
-    'C': [0.1, 1.0, 10.0],  # Regularization parameter
-    'class_weight': ['balanced', None],
-    'solver': ['lbfgs', 'liblinear'],
-    'max_iter': [1000]
+# TF-IDF with optimized parameters: n-gram extraction, then vocabulary pruning learned from the data
+NGRAM_PARAMS = {
+    "stop_words": ENGLISH_STOPWORDS,
+    "ngram_range": (1, 3),  # Add trigrams
+}
+SPLIT_PARAMS = {
+    "test_size": 0.2,
+    "random_state": 42,
+}
+PRUNING_PARAMS = {
+    "max_features": 300,  # Increased features
+    "min_df": 2,
+    "max_df": 0.95,
+}
+
+# Stateless feature extraction of the online mode: changing it starts a new model
+ONLINE_VECTORIZER_PARAMS = {
+    "n_features": 2 ** 18,
+    "ngram_range": (1, 3),
+    "alternate_sign": False,
+    "norm": "l2",
 }
+ONLINE_CLASSES = np.array([0, 1])
 
-# Perform grid search with cross-validation
-print("Performing grid search...")
-grid_search = GridSearchCV(
-    LogisticRegression(),
-    param_grid,
-    cv=5,
-    scoring='f1',
-    n_jobs=-1
-)
-grid_search.fit(X_train, y_train)
-
-# Print best parameters
-print("\nBest parameters found:")
-print(grid_search.best_params_)
-
-# Use best model
-model = grid_search.best_estimator_
-
-# Evaluate on test set
-y_pred = model.predict(X_test)
-y_pred_proba = model.predict_proba(X_test)
-
-print("\nClassification Report:")
-print(classification_report(y_test, y_pred))
-
-print("\nConfusion Matrix:")
-print(confusion_matrix(y_test, y_pred))
-
-# Feature importance analysis
-feature_names = vectorizer.get_feature_names_out()
-coefficients = model.coef_[0]
-feature_importance = pd.DataFrame({
-    'feature': feature_names,
-    'importance': abs(coefficients)
-})
-feature_importance = feature_importance.sort_values('importance', ascending=False)
-print("\nTop 20 most important features:")
-print(feature_importance.head(20))
-
-# Test on example sentences
-test_sentences = [
+# Example sentences printed after training
+TEST_SENTENCES = [
     "dirty son of a bitch",
     "you are pretty",
     "I don't know",
@@ -122,30 +76,417 @@ test_sentences = [
     "Nothing works as advertised."
 ]
 
-print("\nTesting example sentences:")
-test_clean = [clean_text(text) for text in test_sentences]
-test_vectorized = vectorizer.transform(test_clean)
-test_pred = model.predict(test_vectorized)
-test_proba = model.predict_proba(test_vectorized)
-
-for sentence, pred, proba in zip(test_sentences, test_pred, test_proba):
-    sentiment = "Positive" if pred == 1 else "Negative"
-    confidence = proba.max()
-    print(f"\nText: {sentence}")
-    print(f"Prediction: {sentiment} (confidence: {confidence:.2f})")
-    print(f"Probabilities: Negative: {proba[0]:.2f}, Positive: {proba[1]:.2f}")
-
-# Save models
-file_model_name = 'trained_model.joblib'
-joblib.dump(model, file_model_name)
-print(f"\nModel saved to {file_model_name}")
-
-file_vectorizer_name = 'vectorizer.joblib'
-joblib.dump(vectorizer, file_vectorizer_name)
-print(f"Vectorizer saved to {file_vectorizer_name}")
-
-# Upload to MinIO
-if upload_to_minio(file_model_name, 'ml-models', file_model_name):
-    print("Model uploaded to MinIO successfully")
-if upload_to_minio(file_vectorizer_name, 'ml-models', file_vectorizer_name):
-    print("Vectorizer uploaded to MinIO successfully")
\ No newline at end of file
+
+def train_batch(db, use_minio=True, promote=None):
+    """
+    Refit the TF-IDF vectorizer and LogisticRegression on the last 7 days
+
+    The TF-IDF pruning and classifier are searched as a single Pipeline, so the
+    vocabulary is only ever learned from training folds, with successive halving
+    over the vocabulary size and pruning, C and class_weight.
+
+    Args:
+        db: DatabaseOperations (or a stand-in) to read the training data from
+        use_minio: Publish the model and its profiling report to MinIO
+        promote: Promotion of the published model to the latest alias, see publish
+
+    Returns:
+        StageProfiler of the run, or None if it was skipped
+    """
+    profiler = StageProfiler()
+    snapshot = TrainingSnapshot()
+
+    with profiler.stage("fetch"):
+        # Skip the whole run when nothing changed since the last published model
+        fingerprint = db.fetch_fingerprint()
+        if fingerprint is None:
+            raise SystemExit("Could not connect to the database")
+        if fingerprint == snapshot.trained_fingerprint:
+            print(f"Tweets table unchanged since the last training run ({fingerprint}), skipping")
+            return None
+
+        # Update the local snapshot with new or changed rows only, then take the last 7 days from it
+        table = snapshot.refresh(db, fingerprint)
+        df = snapshot.window(table, days=7)[["text", "positive"]].reset_index(drop=True)
+        print(f"Total data retrieved: {len(df)}")
+
+    # Use positive flag for binary classification
+    df = df.rename(columns={"positive": "label"})
+
+    features = prepare_features(df, profiler)
+
+    with profiler.stage("search"):
+        search = build_batch_search()
+        print("Performing successive halving search...")
+        search.fit(features.counts_train, features.y_train)
+
+    # Print best parameters
+    model = search.best_estimator_.named_steps["clf"]
+    print("\nBest parameters found:")
+    print(search.best_params_)
+
+    # The served vectorizer: the refit's vocabulary and idf, applied to raw text
+    vectorizer = search.best_estimator_.named_steps["tfidf"].to_vectorizer(features.counter)
+
+    with profiler.stage("evaluate"):
+        X_test = vectorizer.transform(features.text_test)
+        y_pred = model.predict(X_test)
+
+        print("\nClassification Report:")
+        print(classification_report(features.y_test, y_pred))
+
+        print("\nConfusion Matrix:")
+        print(confusion_matrix(features.y_test, y_pred))
+
+        # Feature importance analysis
+        feature_names = vectorizer.get_feature_names_out()
+        coefficients = model.coef_[0]
+        feature_importance = pd.DataFrame({
+            'feature': feature_names,
+            'importance': abs(coefficients)
+        })
+        feature_importance = feature_importance.sort_values('importance', ascending=False)
+        print("\nTop 20 most important features:")
+        print(feature_importance.head(20))
+
+        print_example_predictions(model, vectorizer)
+
+    if not use_minio:
+        profiler.report()
+        return profiler
+
+    with profiler.stage("upload"):
+        published = publish(model, vectorizer, mode="batch", promote=promote)
+    profiler.report()
+    publish_report(profiler.to_dict(
+        mode="batch",
+        rows=len(df),
+        best_params=search.best_params_,
+    ), published)
+
+    # Only a published model lets the next run skip on an unchanged table
+    if published:
+        snapshot.mark_trained(fingerprint)
+    return profiler
+
+
+def prepare_features(df, profiler):
+    """
+    Clean, split and count the n-grams of the training data, or load them from the feature cache
+
+    Args:
+        df: Training data with text and label columns
+        profiler: StageProfiler of the run
+
+    Returns:
+        PreparedFeatures of the data
+    """
+    cache = FeatureCache()
+    with profiler.stage("fingerprint"):
+        key = cache.key(df[["text", "label"]], {
+            "normalizer_version": NORMALIZER_VERSION,
+            "ngram_params": NGRAM_PARAMS,
+            "split": SPLIT_PARAMS,
+            "sklearn": sklearn.__version__,
+        })
+        features = cache.load(key)
+    if features is not None:
+        print(f"Loaded cleaned text and n-gram counts from feature cache {key}")
+        return features
+
+    with profiler.stage("clean"):
+        text_clean = normalize_parallel(df["text"])
+
+    # Split raw text before anything is fit, so test tweets never reach the vocabulary
+    text_train, text_test, y_train, y_test = train_test_split(text_clean, df["label"], **SPLIT_PARAMS)
+
+    with profiler.stage("vectorize"):
+        # Tokenize once: every fold of the search only prunes and weights these counts
+        counter = CountVectorizer(**NGRAM_PARAMS)
+        counts_train = counter.fit_transform(text_train)
+
+    features = PreparedFeatures(text_train, text_test, y_train, y_test, counter, counts_train)
+    with profiler.stage("cache"):
+        cache.save(key, features)
+    return features
+
+
+def build_batch_search():
+    """
+    Build the hyperparameter search of the batch mode
+
+    Returns:
+        Unfitted HalvingGridSearchCV over a PrunedTfidf + classifier Pipeline,
+        to be fit on n-gram counts so the vocabulary is learned per fold
+    """
+    # The solver is not a grid dimension: lbfgs and liblinear minimize the same regularized loss
+    classifier = LogisticRegression(solver='lbfgs', max_iter=1000)
+
+    pipeline = Pipeline([("tfidf", PrunedTfidf(**PRUNING_PARAMS)), ("clf", classifier)])
+
+    param_grid = {
+        'tfidf__max_features': [300, 1000, 3000],
+        'tfidf__min_df': [2, 5],
+        'clf__C': [0.1, 1.0, 10.0],  # Regularization parameter
+        'clf__class_weight': ['balanced', None],
+    }
+
+    # Successive halving: all 36 candidates on 1/27 of the rows, then the best third on three
+    # times more at each step, the last ones on every row: about 6 full-data fits per fold
+    # instead of 36 for the exhaustive grid
+    return HalvingGridSearchCV(
+        pipeline,
+        param_grid,
+        cv=5,
+        factor=3,
+        min_resources='exhaust',
+        scoring='f1',
+        random_state=42,
+        n_jobs=-1
+    )
+
+
+def train_online(db, use_minio=True, promote=None):
+    """
+    Update the published online model with the rows labelled since its last update
+
+    Features come from a stateless HashingVectorizer, so the model can keep
+    learning with SGDClassifier.partial_fit without ever refitting a vocabulary.
+    When no compatible online model is published yet, it is trained from the
+    whole table in a single pass.
+
+    Args:
+        db: DatabaseOperations (or a stand-in) to read the new rows from
+        use_minio: Update the published model and publish the result and its profiling
+            report to MinIO, otherwise train a new model and keep it local
+        promote: Promotion of the published model to the latest alias, see publish
+
+    Returns:
+        StageProfiler of the run, or None if there was nothing to train on
+    """
+    profiler = StageProfiler()
+    vectorizer = build_online_vectorizer()
+    with profiler.stage("load"):
+        model = load_online_model() if use_minio else None
+    if model is None:
+        print("No online model published yet, training one from the whole table")
+        model = SGDClassifier(loss="log_loss", alpha=1e-5, random_state=42)
+        watermark, boundary_ids = None, set()
+    else:
+        watermark = datetime.fromisoformat(model.trained_until_)
+        boundary_ids = set(model.trained_boundary_ids_)
+        print(f"Updating the online model with rows changed since {model.trained_until_}")
+
+    with profiler.stage("train"):
+        n_rows = 0
+        y_true, y_pred = [], []
+        latest, latest_ids = watermark, boundary_ids
+        for chunk in db.iter_changed_since(watermark, columns=("id", "text", "positive", "updated_at")):
+            # The watermark is inclusive: drop the rows the model already learned from
+            if boundary_ids:
+                chunk = chunk[~(chunk["updated_at"].eq(watermark) & chunk["id"].isin(boundary_ids))]
+                if chunk.empty:
+                    continue
+
+            X = vectorizer.transform(normalize_batch(chunk["text"]))
+            y = chunk["positive"].to_numpy()
+
+            # Progressive validation: predict every chunk before learning from it
+            if hasattr(model, "coef_"):
+                y_true.append(y)
+                y_pred.append(model.predict(X))
+            model.partial_fit(X, y, classes=ONLINE_CLASSES)
+            n_rows += len(chunk)
+
+            # Rows come ordered by updated_at, so the last chunk holds the new watermark
+            chunk_latest = chunk["updated_at"].iloc[-1].to_pydatetime()
+            at_latest = set(chunk.loc[chunk["updated_at"].eq(chunk_latest), "id"].tolist())
+            latest_ids = latest_ids | at_latest if chunk_latest == latest else at_latest
+            latest = chunk_latest
+
+    if n_rows == 0:
+        print("No new labelled rows since the last update, nothing to publish")
+        return None
+    print(f"Trained on {n_rows} new rows")
+
+    if y_true:
+        print("\nProgressive validation on the new rows:")
+        print(classification_report(np.concatenate(y_true), np.concatenate(y_pred), zero_division=0))
+
+    print_example_predictions(model, vectorizer)
+
+    # Everything needed to resume from this model travels with it
+    model.trained_until_ = latest.isoformat()
+    model.trained_boundary_ids_ = sorted(latest_ids)
+    model.online_vectorizer_ = ONLINE_VECTORIZER_PARAMS
+    if not use_minio:
+        profiler.report()
+        return profiler
+
+    with profiler.stage("upload"):
+        published = publish(model, vectorizer, mode="online", promote=promote)
+    profiler.report()
+    publish_report(profiler.to_dict(mode="online", rows=n_rows, trained_until=model.trained_until_), published)
+    return profiler
+
+
+def build_online_vectorizer():
+    """Create the stateless vectorizer of the online mode"""
+    return HashingVectorizer(stop_words=ENGLISH_STOPWORDS, **ONLINE_VECTORIZER_PARAMS)
+
+
+def load_online_model():
+    """
+    Download the last published online model if the online mode can keep training it
+
+    Returns:
+        The SGDClassifier the online alias points at, or None if there is none or
+        it uses another normalizer or other hashing parameters
+    """
+    try:
+        manifest, _ = read_manifest(MODEL_BUCKET)
+    except Exception as e:
+        print(f"Could not read the model manifest: {e}")
+        return None
+    version = resolve_version(manifest, "online")
+    if version is None:
+        return None
+
+    with tempfile.TemporaryDirectory() as directory:
+        model_path = os.path.join(directory, MODEL_FILE)
+        if not download_from_minio(MODEL_BUCKET, version_key(version, MODEL_FILE), model_path):
+            return None
+        model = joblib.load(model_path)
+
+    if not isinstance(model, SGDClassifier):
+        print(f"Published model is a {type(model).__name__}, not an online model")
+        return None
+    if getattr(model, "normalizer_version_", None) != NORMALIZER_VERSION:
+        print("Published online model uses another text normalizer")
+        return None
+    if getattr(model, "online_vectorizer_", None) != ONLINE_VECTORIZER_PARAMS:
+        print("Published online model uses other hashing parameters")
+        return None
+    return model
+
+
+def print_example_predictions(model, vectorizer):
+    """Print the predictions of the model on the example sentences"""
+    print("\nTesting example sentences:")
+    test_clean = normalize_batch(TEST_SENTENCES)
+    test_vectorized = vectorizer.transform(test_clean)
+    test_pred = model.predict(test_vectorized)
+    test_proba = model.predict_proba(test_vectorized)
+
+    for sentence, pred, proba in zip(TEST_SENTENCES, test_pred, test_proba):
+        sentiment = "Positive" if pred == 1 else "Negative"
+        confidence = proba.max()
+        print(f"\nText: {sentence}")
+        print(f"Prediction: {sentiment} (confidence: {confidence:.2f})")
+        print(f"Probabilities: Negative: {proba[0]:.2f}, Positive: {proba[1]:.2f}")
+
+
+def publish(model, vectorizer, mode, promote=None):
+    """
+    Save the model and vectorizer and publish them as a new version of the model registry
+
+    Both are uploaded as pickles, which the online mode resumes training from,
+    and as a single bundle, which the API serves, under the prefix of a new
+    version. The alias of the mode is moved to it in the manifest once every
+    artifact is uploaded. The latest alias, served by default, moves with it
+    when promoting always, or when following and latest still points at the
+    previous version of the mode, so a rollback or a version promoted by hand
+    is never overwritten by the scheduled runs.
+    Versions beyond the KEEP_VERSIONS most recent that no alias points at are
+    then deleted.
+
+    Args:
+        model: Fitted classifier
+        vectorizer: Vectorizer it was trained on
+        mode: batch or online
+        promote: None to leave the latest alias, "always" to move it to the new
+            version, "following" to move it only if it follows the alias of the mode
+
+    Returns:
+        Version id, or None if the upload failed
+    """
+    # Record the text normalizer the model was trained with so the API can refuse a mismatch
+    model.normalizer_version_ = NORMALIZER_VERSION
+
+    # Save models
+    joblib.dump(model, MODEL_FILE)
+    print(f"\nModel saved to {MODEL_FILE}")
+
+    joblib.dump(vectorizer, VECTORIZER_FILE)
+    print(f"Vectorizer saved to {VECTORIZER_FILE}")
+
+    manifest = export_bundle(model, vectorizer, BUNDLE_KEY)
+    print(
+        f"Bundle saved to {BUNDLE_KEY} ({manifest['n_stored']} of {manifest['n_features']} features, "
+        f"{os.path.getsize(BUNDLE_KEY)} bytes)"
+    )
+
+    # Upload to MinIO
+    try:
+        version = publish_version(
+            {MODEL_FILE: MODEL_FILE, VECTORIZER_FILE: VECTORIZER_FILE, BUNDLE_KEY: BUNDLE_KEY},
+            MODEL_BUCKET,
+            info={"mode": mode, "normalizer_version": NORMALIZER_VERSION},
+            aliases=(mode, DEFAULT_ALIAS) if promote == "always" else (mode,),
+            followers=(DEFAULT_ALIAS,) if promote == "following" else (),
+        )
+    except Exception as e:
+        print(f"Error publishing the model to MinIO: {e}")
+        return None
+    print(f"Model, vectorizer and bundle published to MinIO as version {version}")
+    if promote == "always":
+        print(f"Version {version} is now served by default")
+
+    try:
+        removed = prune_versions(KEEP_VERSIONS, MODEL_BUCKET)
+    except Exception as e:
+        # The next publish tries again
+        print(f"Error pruning old model versions: {e}")
+    else:
+        if removed:
+            print(f"Pruned {len(removed)} old model versions")
+    return version
+
+
+def publish_report(report, version):
+    """Save the profiling report of a run and upload it next to the model version it published"""
+    with open(REPORT_FILE, 'w') as f:
+        json.dump(report, f, indent=2)
+    if version is None:
+        return
+    if upload_to_minio(REPORT_FILE, MODEL_BUCKET, version_key(version, REPORT_FILE)):
+        print("Training report uploaded to MinIO successfully")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the sentiment model and publish it to MinIO")
+    parser.add_argument(
+        "--mode",
+        choices=("batch", "online"),
+        default="batch",
+        help="batch: weekly TF-IDF + LogisticRegression refit, "
+             "online: incremental HashingVectorizer + SGDClassifier update",
+    )
+    parser.add_argument(
+        "--promote",
+        choices=("always", "following"),
+        help="Also serve the new version by default, moving the latest alias to it: always, "
+             "or following when latest points at the previous version of this mode "
+             "(it stops following once it is promoted or rolled back by hand)",
+    )
+    args = parser.parse_args()
+
+    db = DatabaseOperations()
+    if args.mode == "online":
+        train_online(db, promote=args.promote)
+    else:
+        train_batch(db, promote=args.promote)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,75 @@
-import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, pooling
+import numpy as np
 import pandas as pd
 import os
+import threading
+import zlib
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Optional, Dict, List
+from typing import Iterator, Optional, Dict, List, Sequence
+
+# Columns of the tweets table that can be projected, with their in-memory dtype
+TWEET_COLUMN_DTYPES = {
+    "id": np.int64,
+    "text": object,
+    "positive": np.int8,
+    "negative": np.int8,
+    "created_at": "datetime64[ns]",
+    "updated_at": "datetime64[ns]",
+}
+
+# Columns the trainer actually needs
+TRAINING_COLUMNS = ("text", "positive")
+
+# Columns written by bulk inserts
+INSERT_COLUMNS = ("text", "positive", "negative")
+
+# Connections kept open per database, shared by every DatabaseOperations of the process
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '4'))
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def id_checksum(ids) -> int:
+    """
+    XOR of the CRC32 of every id, the BIT_XOR(CRC32(id)) of the table fingerprint
+
+    Args:
+        ids: Iterable of integer ids
+
+    Returns:
+        Unsigned 32-bit checksum, 0 for no ids
+    """
+    checksum = 0
+    for id_ in ids:
+        # MySQL's CRC32 hashes the decimal string of an integer
+        checksum ^= zlib.crc32(str(int(id_)).encode())
+    return checksum
+
+def get_pool(**connection_params):
+    """
+    Return the process-wide connection pool of a database, creating it on first use
+
+    Args:
+        connection_params: host, user, password and database
+
+    Returns:
+        MySQLConnectionPool
+    """
+    key = tuple(sorted(connection_params.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = pooling.MySQLConnectionPool(
+                pool_name=f"tweets_{len(_pools)}",
+                pool_size=POOL_SIZE,
+                # A cursor closed before reading all its rows must not poison the connection
+                consume_results=True,
+                **connection_params
+            )
+            _pools[key] = pool
+        return pool
 
 class DatabaseOperations:
     def __init__(self, host=None, user=None, password=None, database=None):
@@ -14,42 +80,62 @@ class DatabaseOperations:
         self.database = database or os.environ.get('DB_NAME', 'sentiment_db')
         self.connection = None
     
+    def _pool(self):
+        """Connection pool of this database"""
+        return get_pool(host=self.host, user=self.user, password=self.password, database=self.database)
+
     def connect(self):
-        """Create a database connection"""
+        """Take a connection from the pool, given back by disconnect"""
+        self.connection = self._borrow_connection()
+        return self.connection
+
+    def _borrow_connection(self):
+        """Take a connection from the pool for the caller to close, None if it failed"""
         try:
-            self.connection = mysql.connector.connect(
-                host=self.host,
-                user=self.user,
-                password=self.password,
-                database=self.database
-            )
-            return self.connection
+            return self._pool().get_connection()
         except Error as e:
             print(f"Error connecting to MySQL: {e}")
             return None
     
     def disconnect(self):
-        """Close the database connection"""
-        if self.connection and self.connection.is_connected():
+        """Give the connection back to the pool"""
+        if self.connection is not None:
             self.connection.close()
+            self.connection = None
+
+    @contextmanager
+    def _cursor(self, **cursor_options):
+        """
+        Borrow a pooled connection and open a cursor on it, both given back on exit
+
+        Each call gets its own connection, so a query can run while a generator
+        of this instance is still streaming another one.
+
+        Raises:
+            mysql.connector.Error if no connection could be made
+        """
+        connection = self._pool().get_connection()
+        try:
+            cursor = connection.cursor(**cursor_options)
+            try:
+                yield connection, cursor
+            finally:
+                cursor.close()
+        finally:
+            connection.close()
 
     def fetch_last_7_days_data(self):
         """Fetch data from the last 7 days"""
         try:
-            connection = self.connect()
-            if not connection:
-                return None
-                
-            cursor = connection.cursor(dictionary=True)
-            
-            # Query to get data from the last 7 days
-            query = """
-                SELECT id, text, positive, negative, created_at 
-                FROM tweets 
-                WHERE created_at >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)
-            """
-            cursor.execute(query)
-            results = cursor.fetchall()
+            with self._cursor(dictionary=True) as (_, cursor):
+                # Query to get data from the last 7 days
+                query = """
+                    SELECT id, text, positive, negative, created_at 
+                    FROM tweets 
+                    WHERE created_at >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)
+                """
+                cursor.execute(query)
+                results = cursor.fetchall()
             
             if not results:
                 print("No data found in the last 7 days")
@@ -60,24 +146,15 @@ class DatabaseOperations:
         except Error as e:
             print(f"Error fetching data: {e}")
             return []
-        finally:
-            if cursor:
-                cursor.close()
-            self.disconnect()
 
     def fetch_all_training_data(self):
         """Fetch all training data from the database"""
         try:
-            connection = self.connect()
-            if not connection:
-                return None
-                
-            cursor = connection.cursor(dictionary=True)
-            
-            # Query to get all tweets
-            query = "SELECT id, text, positive, negative, created_at FROM tweets"
-            cursor.execute(query)
-            results = cursor.fetchall()
+            with self._cursor(dictionary=True) as (_, cursor):
+                # Query to get all tweets
+                query = "SELECT id, text, positive, negative, created_at FROM tweets"
+                cursor.execute(query)
+                results = cursor.fetchall()
             
             if not results:
                 print("No data found in the database")
@@ -88,11 +165,305 @@ class DatabaseOperations:
         except Error as e:
             print(f"Error fetching data: {e}")
             return []
+
+    def insert_tweets(self, frame: pd.DataFrame, batch_size: int = 5000) -> int:
+        """
+        Insert labelled tweets, skipping those whose text is already in the table
+
+        Rows are sent as multi-row INSERT statements of batch_size rows, each
+        committed in its own transaction. Duplicates are detected by the unique
+        index on the text hash, so they are skipped within the frame as well.
+        Rows must be valid (text of at most 280 characters, 0/1 labels), since
+        out-of-range values would be adjusted rather than rejected.
+
+        Args:
+            frame: DataFrame with text, positive and negative columns
+            batch_size: Number of rows per statement and transaction
+
+        Returns:
+            Number of rows actually inserted
+
+        Raises:
+            mysql.connector.Error if a batch failed, batches before it stay committed
+        """
+        if frame.empty:
+            return 0
+
+        inserted = 0
+        columns = ", ".join(INSERT_COLUMNS)
+        with self._cursor() as (connection, cursor):
+            for start in range(0, len(frame), batch_size):
+                batch = frame.iloc[start:start + batch_size]
+                placeholders = ", ".join(["(%s, %s, %s)"] * len(batch))
+                params = [
+                    value
+                    for row in zip(*(batch[column].tolist() for column in INSERT_COLUMNS))
+                    for value in row
+                ]
+                # IGNORE also turns invalid values into warnings: callers validate rows first
+                cursor.execute(f"INSERT IGNORE INTO tweets ({columns}) VALUES {placeholders}", params)
+                connection.commit()
+                # Skipped duplicates are not counted as affected rows
+                inserted += cursor.rowcount
+        return inserted
+
+    def fetch_unscored_page(self, model_version: str, after_id: int = 0, limit: int = 20000) -> pd.DataFrame:
+        """
+        Fetch the next page of tweets whose score is missing or stale
+
+        A score is stale when it was produced by another model version, or
+        before the tweet was last updated. Pages are keyset-paginated on id, so
+        every page is a short indexed range scan however deep into the table it is.
+
+        Args:
+            model_version: Version of the model scoring the table
+            after_id: Only rows with a larger id, the last id of the previous page
+            limit: Maximum number of rows
+
+        Returns:
+            DataFrame with id and text columns, ordered by id
+
+        Raises:
+            mysql.connector.Error if the query failed
+        """
+        columns = ("id", "text")
+        query = """
+            SELECT t.id, t.text
+            FROM tweets t
+            LEFT JOIN tweet_scores s ON s.tweet_id = t.id
+            WHERE t.id > %s
+              AND (s.tweet_id IS NULL OR s.model_version <> %s OR s.scored_at <= t.updated_at)
+            ORDER BY t.id
+            LIMIT %s
+        """
+        with self._cursor() as (_, cursor):
+            cursor.execute(query, (after_id, model_version, limit))
+            rows = cursor.fetchall()
+
+        if not rows:
+            return pd.DataFrame({column: np.empty(0, dtype=TWEET_COLUMN_DTYPES[column]) for column in columns})
+        return self._rows_to_frame(rows, columns)
+
+    def upsert_scores(self, ids: Sequence[int], scores: Sequence[float], model_version: str, batch_size: int = 5000) -> int:
+        """
+        Write the scores of tweets, replacing the ones they already have
+
+        Rows are sent as multi-row INSERT ... ON DUPLICATE KEY UPDATE statements
+        of batch_size rows, each committed in its own transaction, so writing a
+        page again after an interruption only overwrites it with the same values.
+
+        Args:
+            ids: Tweet ids
+            scores: Score of each tweet
+            model_version: Version of the model that produced the scores
+            batch_size: Number of rows per statement and transaction
+
+        Returns:
+            Number of rows written
+
+        Raises:
+            mysql.connector.Error if a batch failed, batches before it stay committed
+        """
+        ids = [int(tweet_id) for tweet_id in ids]
+        scores = [float(score) for score in scores]
+        with self._cursor() as (connection, cursor):
+            for start in range(0, len(ids), batch_size):
+                batch = zip(ids[start:start + batch_size], scores[start:start + batch_size])
+                params = [value for tweet_id, score in batch for value in (tweet_id, score, model_version)]
+                placeholders = ", ".join(["(%s, %s, %s)"] * (len(params) // 3))
+                cursor.execute(
+                    f"INSERT INTO tweet_scores (tweet_id, score, model_version) VALUES {placeholders} AS new "
+                    "ON DUPLICATE KEY UPDATE score = new.score, model_version = new.model_version, "
+                    "scored_at = CURRENT_TIMESTAMP",
+                    params,
+                )
+                connection.commit()
+        return len(ids)
+
+    @staticmethod
+    def _check_columns(columns):
+        """Only whitelisted column names are ever interpolated into queries"""
+        unknown = set(columns) - set(TWEET_COLUMN_DTYPES)
+        if unknown:
+            raise ValueError(f"Unknown tweets columns: {sorted(unknown)}")
+
+    def _training_query(self, columns, days, select="columns"):
+        """Build the projection/count query of the training window"""
+        self._check_columns(columns)
+        projection = ", ".join(columns) if select == "columns" else "COUNT(*)"
+        query = f"SELECT {projection} FROM tweets"
+        params = ()
+        if days is not None:
+            query += " WHERE created_at >= DATE_SUB(CURDATE(), INTERVAL %s DAY)"
+            params = (days,)
+        return query, params
+
+    def iter_training_chunks(
+        self,
+        days: Optional[int] = 7,
+        columns: Sequence[str] = TRAINING_COLUMNS,
+        chunk_size: int = 50000,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Stream training data as DataFrame chunks
+
+        Rows are read through an unbuffered cursor with fetchmany, so only one
+        chunk of rows is held in Python objects at a time.
+
+        Args:
+            days: Size of the window in days, None for the whole table
+            columns: Columns to project
+            chunk_size: Number of rows per chunk
+
+        Yields:
+            DataFrames of at most chunk_size rows with the requested columns
+        """
+        query, params = self._training_query(columns, days)
+        return self._iter_query_chunks(query, params, columns, chunk_size)
+
+    def iter_changed_since(
+        self,
+        updated_at: Optional[datetime] = None,
+        columns: Sequence[str] = tuple(TWEET_COLUMN_DTYPES),
+        chunk_size: int = 50000,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Stream the rows inserted or updated since a watermark
+
+        The comparison is inclusive: rows updated within the same second as the
+        watermark are returned again, callers dedupe on id.
+
+        Args:
+            updated_at: Watermark on updated_at, None for the whole table
+            columns: Columns to project
+            chunk_size: Number of rows per chunk
+
+        Yields:
+            DataFrames of at most chunk_size rows, ordered by updated_at then id
+        """
+        self._check_columns(columns)
+        query = f"SELECT {', '.join(columns)} FROM tweets"
+        params = ()
+        if updated_at is not None:
+            query += " WHERE updated_at >= %s"
+            params = (updated_at,)
+        query += " ORDER BY updated_at, id"
+        return self._iter_query_chunks(query, params, columns, chunk_size)
+
+    def fetch_fingerprint(self) -> Optional[Dict[str, object]]:
+        """
+        Fetch a cheap fingerprint of the whole tweets table
+
+        Returns:
+            Dict with row_count, max_updated_at (ISO string) and id_checksum (see id_checksum),
+            or None if the query failed
+        """
+        try:
+            with self._cursor() as (_, cursor):
+                cursor.execute("SELECT COUNT(*), MAX(updated_at), BIT_XOR(CRC32(id)) FROM tweets")
+                row_count, max_updated_at, checksum = cursor.fetchall()[0]
+            return {
+                "row_count": int(row_count),
+                "max_updated_at": max_updated_at.isoformat() if max_updated_at else None,
+                "id_checksum": int(checksum or 0),
+            }
+        except Error as e:
+            print(f"Error fetching table fingerprint: {e}")
+            return None
+
+    def _iter_query_chunks(self, query, params, columns, chunk_size):
+        """Run a query on an unbuffered cursor and yield its rows as DataFrame chunks"""
+        connection = self._borrow_connection()
+        if not connection:
+            return
+
+        cursor = None
+        try:
+            cursor = connection.cursor(buffered=False)
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield self._rows_to_frame(rows, columns)
+        finally:
+            if cursor:
+                cursor.close()
+            connection.close()
+
+    def fetch_training_frame(
+        self,
+        days: Optional[int] = 7,
+        columns: Sequence[str] = TRAINING_COLUMNS,
+        chunk_size: int = 50000,
+    ) -> Optional[pd.DataFrame]:
+        """
+        Fetch training data into a single preallocated DataFrame
+
+        The row count is read first, within the same consistent snapshot as the
+        data, so every column is allocated once at its final size and filled
+        chunk by chunk instead of going through per-row dicts and lists.
+
+        Args:
+            days: Size of the window in days, None for the whole table
+            columns: Columns to project
+            chunk_size: Number of rows fetched per round trip
+
+        Returns:
+            DataFrame with the requested columns, or None if the connection failed
+        """
+        query, params = self._training_query(columns, days)
+        count_query, _ = self._training_query(columns, days, select="count")
+        connection = self._borrow_connection()
+        if not connection:
+            return None
+
+        cursor = None
+        try:
+            # Count and data must see the same rows
+            connection.start_transaction(consistent_snapshot=True, readonly=True)
+            cursor = connection.cursor(buffered=False)
+            cursor.execute(count_query, params)
+            total = cursor.fetchall()[0][0]
+
+            arrays = {column: np.empty(total, dtype=TWEET_COLUMN_DTYPES[column]) for column in columns}
+            cursor.execute(query, params)
+            filled = 0
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for column, values in zip(columns, zip(*rows)):
+                    arrays[column][filled:filled + len(rows)] = values
+                filled += len(rows)
+            connection.commit()
+
+            if filled < total:
+                arrays = {column: values[:filled] for column, values in arrays.items()}
+
+            if total == 0:
+                print("No data found in the training window")
+            return pd.DataFrame(arrays, copy=False)
+
+        except Error as e:
+            print(f"Error fetching data: {e}")
+            return pd.DataFrame({column: np.empty(0, dtype=TWEET_COLUMN_DTYPES[column]) for column in columns})
         finally:
             if cursor:
                 cursor.close()
-            self.disconnect()
- 
+            connection.close()
+
+    @staticmethod
+    def _rows_to_frame(rows, columns):
+        """Turn a chunk of row tuples into a typed DataFrame"""
+        return pd.DataFrame(
+            {
+                column: np.array(values, dtype=TWEET_COLUMN_DTYPES[column])
+                for column, values in zip(columns, zip(*rows))
+            },
+            copy=False,
+        )
+
 def test_db_operations():
     db_ops = DatabaseOperations()
     df = db_ops.fetch_last_7_days_data()
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import joblib
+import pandas as pd
+import scipy.sparse as sp
+
+
+@dataclass
+class PreparedFeatures:
+    """Cleaned and split training data with its n-gram counts, ready for the search"""
+    text_train: pd.Series
+    text_test: pd.Series
+    y_train: pd.Series
+    y_test: pd.Series
+    counter: Any
+    counts_train: sp.csr_matrix
+
+
+class FeatureCache:
+    """On-disk cache of preprocessed features, keyed by the data and everything that shaped them"""
+
+    def __init__(self, directory=None, keep=3):
+        """
+        Initialize the cache
+
+        Args:
+            directory: Cache directory, defaults to FEATURE_CACHE_DIR or ./data/features
+            keep: Number of most recently used entries kept on disk
+        """
+        self.directory = directory or os.environ.get('FEATURE_CACHE_DIR', os.path.join('data', 'features'))
+        self.keep = keep
+
+    @staticmethod
+    def key(frame, params: Dict[str, Any]) -> str:
+        """
+        Compute the cache key of a training frame
+
+        Args:
+            frame: Raw training data (text and label columns)
+            params: Everything else the features depend on: normalizer version,
+                vectorizer and split parameters, library versions
+
+        Returns:
+            Hex key, identical for identical data and parameters
+        """
+        digest = hashlib.sha256()
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def load(self, key) -> Optional[PreparedFeatures]:
+        """
+        Load the features of a key
+
+        Returns:
+            PreparedFeatures, or None on a miss
+        """
+        path = os.path.join(self.directory, key)
+        if not os.path.isdir(path):
+            return None
+
+        os.utime(path)
+        texts = pd.read_parquet(os.path.join(path, 'texts.parquet'))
+        train = texts[texts['train']]
+        test = texts[~texts['train']]
+        return PreparedFeatures(
+            text_train=train['text_clean'],
+            text_test=test['text_clean'],
+            y_train=train['label'],
+            y_test=test['label'],
+            counter=joblib.load(os.path.join(path, 'counter.joblib')),
+            counts_train=sp.load_npz(os.path.join(path, 'counts_train.npz')),
+        )
+
+    def save(self, key, features: PreparedFeatures):
+        """Store the features of a key, replacing nothing that is already there"""
+        path = os.path.join(self.directory, key)
+        os.makedirs(self.directory, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self.directory)
+        try:
+            texts = pd.concat([
+                pd.DataFrame({'text_clean': features.text_train, 'label': features.y_train, 'train': True}),
+                pd.DataFrame({'text_clean': features.text_test, 'label': features.y_test, 'train': False}),
+            ])
+            texts.to_parquet(os.path.join(staging, 'texts.parquet'))
+            joblib.dump(features.counter, os.path.join(staging, 'counter.joblib'))
+            sp.save_npz(os.path.join(staging, 'counts_train.npz'), features.counts_train)
+            # A complete entry appears at once, or not at all
+            os.rename(staging, path)
+        except OSError as e:
+            shutil.rmtree(staging, ignore_errors=True)
+            print(f"Could not save features to cache: {e}")
+            return
+
+        self._prune()
+
+    def _prune(self):
+        """Remove all but the most recently used entries"""
+        entries = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if not name.startswith(".")
+        ]
+        entries.sort(key=os.path.getmtime, reverse=True)
+        for stale in entries[self.keep:]:
+            shutil.rmtree(stale, ignore_errors=True)
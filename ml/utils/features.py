@@ -0,0 +1,113 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from numbers import Integral
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.feature_extraction.text import TfidfTransformer, TfidfVectorizer
+
+from shared.normalization import normalize_batch
+
+
+def normalize_parallel(texts, n_jobs=None, chunk_size=50000):
+    """
+    Normalize texts in chunks across processes
+
+    Args:
+        texts: pandas Series of raw texts
+        n_jobs: Number of processes, defaults to the number of CPUs
+        chunk_size: Number of texts per chunk sent to a process
+
+    Returns:
+        Series of normalized texts with the same index
+    """
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if n_jobs == 1 or len(texts) <= chunk_size:
+        return normalize_batch(texts)
+
+    values = texts.tolist()
+    chunks = [values[start:start + chunk_size] for start in range(0, len(values), chunk_size)]
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        cleaned = [text for chunk in executor.map(normalize_batch, chunks) for text in chunk]
+    return pd.Series(cleaned, index=texts.index, name=texts.name)
+
+
+class PrunedTfidf(TransformerMixin, BaseEstimator):
+    """
+    TF-IDF weighting of a precomputed n-gram count matrix
+
+    Tokenizing and counting n-grams does not depend on the data it is fit on,
+    only the vocabulary pruning and the idf weights do. Counting every tweet once
+    and fitting this transformer per cross-validation fold gives exactly the
+    features of a TfidfVectorizer with the same pruning parameters fit on that
+    fold, without tokenizing the fold again for every candidate.
+    """
+
+    def __init__(self, min_df=1, max_df=1.0, max_features=None):
+        """
+        Initialize the transformer, parameters mean the same as in TfidfVectorizer
+
+        Args:
+            min_df: Ignore terms in fewer documents (count) or a smaller share of documents (float)
+            max_df: Ignore terms in more documents (count) or a larger share of documents (float)
+            max_features: Keep only the most frequent terms
+        """
+        self.min_df = min_df
+        self.max_df = max_df
+        self.max_features = max_features
+
+    def fit(self, X, y=None):
+        """
+        Select the terms kept on these documents and learn their idf
+
+        Args:
+            X: Count matrix of shape (n_documents, n_terms), terms in sorted order
+            y: Ignored
+
+        Returns:
+            self
+        """
+        X = sp.csr_matrix(X)
+        n_doc = X.shape[0]
+        high = self.max_df if isinstance(self.max_df, Integral) else self.max_df * n_doc
+        low = self.min_df if isinstance(self.min_df, Integral) else self.min_df * n_doc
+
+        # Terms absent from these documents are not part of their vocabulary at all
+        dfs = np.bincount(X.indices, minlength=X.shape[1])
+        mask = (dfs > 0) & (dfs <= high) & (dfs >= low)
+        if self.max_features is not None and mask.sum() > self.max_features:
+            # Same selection and tie-breaking as CountVectorizer._limit_features
+            tfs = np.asarray(X.sum(axis=0)).ravel()
+            mask_inds = (-tfs[mask]).argsort()[:self.max_features]
+            new_mask = np.zeros(len(dfs), dtype=bool)
+            new_mask[np.where(mask)[0][mask_inds]] = True
+            mask = new_mask
+
+        self.columns_ = np.where(mask)[0]
+        if len(self.columns_) == 0:
+            raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+        self.tfidf_ = TfidfTransformer().fit(X[:, self.columns_])
+        return self
+
+    def transform(self, X):
+        """Weight the kept terms of a count matrix with the learned idf"""
+        return self.tfidf_.transform(sp.csr_matrix(X)[:, self.columns_])
+
+    def to_vectorizer(self, count_vectorizer):
+        """
+        Build the TfidfVectorizer producing these features straight from text
+
+        Args:
+            count_vectorizer: CountVectorizer the count matrix was fit with
+
+        Returns:
+            TfidfVectorizer with the kept terms and learned idf, no refit needed
+        """
+        params = count_vectorizer.get_params()
+        params.pop("dtype")
+        params["vocabulary"] = count_vectorizer.get_feature_names_out()[self.columns_].tolist()
+        vectorizer = TfidfVectorizer(**params)
+        vectorizer.idf_ = self.tfidf_.idf_
+        return vectorizer
@@ -1,33 +1,37 @@
-import boto3
-from botocore.config import Config
 import os
-from botocore.exceptions import ClientError
+import tempfile
+import shutil
+
+from shared.artifacts import download_artifacts, upload_artifacts
 
 def upload_to_minio(file_path, bucket_name, object_name):
     """Upload a file to MinIO S3 storage"""
+    return upload_files_to_minio({object_name: file_path}, bucket_name)
+
+def upload_files_to_minio(paths, bucket_name):
+    """Upload files to MinIO in parallel, skipping the ones already there with the same content"""
     try:
-        # Initialize MinIO client
-        s3_client = boto3.client(
-            's3',
-            endpoint_url=os.environ.get('MINIO_ENDPOINT_URL', 'http://minio:9000'),
-            aws_access_key_id=os.environ.get('MINIO_ACCESS_KEY', 'minioadmin'),
-            aws_secret_access_key=os.environ.get('MINIO_SECRET_KEY', 'minioadmin'),
-            config=Config(signature_version='s3v4'),
-            region_name=os.environ.get('MINIO_REGION_NAME', 'us-east-1')
-        )
-        
-        # Create bucket if it doesn't exist
-        try:
-            s3_client.head_bucket(Bucket=bucket_name)
-        except ClientError:
-            s3_client.create_bucket(Bucket=bucket_name)
-        except Exception as e:
-            print(f"Error creating bucket: {e}")
-            
-        # Upload file
-        s3_client.upload_file(file_path, bucket_name, object_name)
-        print(f"Successfully uploaded {file_path} to {bucket_name}/{object_name}")
+        statuses = upload_artifacts(paths, bucket_name)
+        for object_name, status in statuses.items():
+            if status == "unchanged":
+                print(f"{bucket_name}/{object_name} is unchanged, skipped upload")
+            else:
+                print(f"Successfully uploaded {paths[object_name]} to {bucket_name}/{object_name}")
         return True
     except Exception as e:
         print(f"Error uploading to MinIO: {e}")
-        return False
\ No newline at end of file
+        return False
+
+def download_from_minio(bucket_name, object_name, file_path):
+    """Download a file from MinIO S3 storage, returns False if it doesn't exist or failed"""
+    directory = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(file_path)))
+    name = os.path.basename(file_path)
+    try:
+        download_artifacts({object_name: name}, bucket_name, directory)
+        os.replace(os.path.join(directory, name), file_path)
+        return True
+    except Exception as e:
+        print(f"Could not download {bucket_name}/{object_name}: {e}")
+        return False
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
\ No newline at end of file
@@ -0,0 +1,111 @@
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import pandas as pd
+
+from utils.db import TWEET_COLUMN_DTYPES, id_checksum
+
+SNAPSHOT_COLUMNS = tuple(TWEET_COLUMN_DTYPES)
+
+
+class TrainingSnapshot:
+    """Local Parquet copy of the tweets table, kept up to date from an updated_at watermark"""
+
+    def __init__(self, directory=None):
+        """
+        Initialize the snapshot
+
+        Args:
+            directory: Directory of the snapshot files, defaults to SNAPSHOT_DIR or ./data
+        """
+        self.directory = directory or os.environ.get('SNAPSHOT_DIR', 'data')
+        self.data_path = os.path.join(self.directory, 'tweets.parquet')
+        self.meta_path = os.path.join(self.directory, 'snapshot.json')
+        self.meta = self._read_meta()
+
+    @property
+    def trained_fingerprint(self) -> Optional[Dict[str, object]]:
+        """Table fingerprint of the last successful training run"""
+        return self.meta.get('trained_fingerprint')
+
+    def refresh(self, db, fingerprint) -> pd.DataFrame:
+        """
+        Bring the snapshot up to date, fetching only new or changed rows
+
+        Args:
+            db: DatabaseOperations to read from
+            fingerprint: Current table fingerprint from db.fetch_fingerprint()
+
+        Returns:
+            Up-to-date snapshot of the whole table
+        """
+        frame = self._read_frame()
+        watermark = self.meta.get('watermark')
+
+        if frame is None or watermark is None:
+            print("No local snapshot, fetching the whole table")
+            frame = self._fetch(db, None)
+        else:
+            changed = self._fetch(db, datetime.fromisoformat(watermark))
+            print(f"Fetched {len(changed)} new or changed rows since {watermark}")
+            frame = pd.concat([frame[~frame['id'].isin(changed['id'])], changed], ignore_index=True)
+
+            # Deleted rows leave no trace behind the watermark: start over when the ids differ,
+            # the checksum also catches deletes offset by as many inserts
+            if len(frame) != fingerprint['row_count'] or id_checksum(frame['id']) != fingerprint['id_checksum']:
+                print("Rows were deleted since the last snapshot, fetching the whole table")
+                frame = self._fetch(db, None)
+
+        self._write(frame, fingerprint)
+        return frame
+
+    def window(self, frame, days=7) -> pd.DataFrame:
+        """Select the rows created in the last days days, like the SQL training window"""
+        start = pd.Timestamp(datetime.now().date() - timedelta(days=days))
+        return frame[frame['created_at'] >= start]
+
+    def mark_trained(self, fingerprint):
+        """Record the fingerprint a model was successfully trained and published on"""
+        self.meta['trained_fingerprint'] = fingerprint
+        self._write_meta()
+
+    def _fetch(self, db, updated_at):
+        """Read rows changed since updated_at (everything when None) into one frame"""
+        chunks = list(db.iter_changed_since(updated_at, columns=SNAPSHOT_COLUMNS))
+        if not chunks:
+            return pd.DataFrame({
+                column: pd.Series(dtype=dtype) for column, dtype in TWEET_COLUMN_DTYPES.items()
+            })
+        return pd.concat(chunks, ignore_index=True)
+
+    def _write(self, frame, fingerprint):
+        """Atomically replace the snapshot and move the watermark"""
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = self.data_path + '.tmp'
+        frame.to_parquet(temp_path, index=False)
+        os.replace(temp_path, self.data_path)
+
+        max_updated_at = frame['updated_at'].max() if len(frame) else None
+        self.meta['watermark'] = max_updated_at.isoformat() if max_updated_at is not None else None
+        self.meta['fingerprint'] = fingerprint
+        self._write_meta()
+
+    def _read_frame(self):
+        if not os.path.exists(self.data_path):
+            return None
+        return pd.read_parquet(self.data_path)
+
+    def _read_meta(self):
+        if not os.path.exists(self.meta_path):
+            return {}
+        with open(self.meta_path) as f:
+            return json.load(f)
+
+    def _write_meta(self):
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = self.meta_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(temp_path, self.meta_path)
@@ -0,0 +1,109 @@
+import os
+import platform
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        # No procfs: fall back on the lifetime peak (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if platform.system() == "Darwin" else peak / 2 ** 10
+
+
+class _RssSampler:
+    """Background thread tracking the peak RSS while a stage runs"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.peak = current_rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_mb())
+        return self.peak
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss_mb())
+
+
+class StageProfiler:
+    """Record the wall-clock time and peak memory of the named stages of a training run"""
+
+    def __init__(self, sample_interval=0.05):
+        """
+        Initialize an empty profiler
+
+        Args:
+            sample_interval: Seconds between two RSS samples during a stage
+        """
+        self.sample_interval = sample_interval
+        self.started_at = datetime.now(timezone.utc)
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Profile the enclosed block as one stage
+
+        Args:
+            name: Stage name, repeated stages accumulate their time and keep the highest peak
+        """
+        sampler = _RssSampler(self.sample_interval)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = sampler.stop()
+            entry = self.stages.setdefault(name, {"seconds": 0.0, "peak_rss_mb": 0.0})
+            entry["seconds"] += elapsed
+            entry["peak_rss_mb"] = max(entry["peak_rss_mb"], peak)
+            print(f"[{name}] {elapsed:.2f}s, peak RSS {peak:.0f} MB")
+
+    @property
+    def total_seconds(self):
+        return sum(entry["seconds"] for entry in self.stages.values())
+
+    def report(self):
+        """Print the time and peak memory of each stage"""
+        total = self.total_seconds
+        print("\nStage profile:")
+        for name, entry in self.stages.items():
+            share = entry["seconds"] / total * 100 if total else 0.0
+            print(f"  {name:<12} {entry['seconds']:8.2f}s  {share:5.1f}%  {entry['peak_rss_mb']:8.0f} MB")
+        print(f"  {'total':<12} {total:8.2f}s")
+
+    def to_dict(self, **metadata):
+        """
+        Build the JSON report of the run
+
+        Args:
+            **metadata: Extra fields describing the run (mode, rows, parameters...)
+
+        Returns:
+            JSON-serializable dict
+        """
+        return {
+            **metadata,
+            "started_at": self.started_at.isoformat(),
+            "total_seconds": self.total_seconds,
+            "peak_rss_mb": max((entry["peak_rss_mb"] for entry in self.stages.values()), default=0.0),
+            "stages": [{"name": name, **entry} for name, entry in self.stages.items()],
+        }
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utils.db import TWEET_COLUMN_DTYPES, id_checksum
+
+POSITIVE_WORDS = [
+    "love", "great", "awesome", "happy", "amazing", "good", "excellent", "best",
+    "fantastic", "nice", "wonderful", "perfect", "enjoy", "recommend", "fun", "glad",
+]
+NEGATIVE_WORDS = [
+    "hate", "awful", "terrible", "bad", "worst", "poor", "sad", "angry",
+    "broken", "waste", "disappointed", "useless", "horrible", "slow", "refund", "annoying",
+]
+NEUTRAL_WORDS = [
+    "today", "phone", "app", "update", "service", "team", "order", "delivery",
+    "price", "store", "weekend", "morning", "support", "product", "version", "battery",
+    "screen", "camera", "game", "music", "coffee", "train", "work", "friend",
+]
+DECORATIONS = ["", "", "", "!", "!!!", "?", " :)", " :(", " #mood", " @brand", " http://t.co/x"]
+
+
+def generate_tweets(n_rows, days=7, label_noise=0.1, seed=42) -> pd.DataFrame:
+    """
+    Generate a synthetic tweets table
+
+    Each tweet mixes a few sentiment words of its label with neutral words and
+    tweet noise (punctuation, mentions, links), so that cleaning, vectorizing and
+    fitting behave like on real data.
+
+    Args:
+        n_rows: Number of tweets
+        days: Spread of created_at over the last days days
+        label_noise: Share of tweets whose label is flipped
+        seed: Random seed
+
+    Returns:
+        DataFrame with the columns and dtypes of the tweets table
+    """
+    rng = np.random.default_rng(seed)
+    positive = rng.random(n_rows) < 0.5
+
+    lengths = rng.integers(6, 16, n_rows)
+    n_sentiment = rng.integers(1, 4, n_rows)
+    polar = np.where(positive[:, None], rng.choice(POSITIVE_WORDS, (n_rows, 3)), rng.choice(NEGATIVE_WORDS, (n_rows, 3)))
+    neutral = rng.choice(NEUTRAL_WORDS, (n_rows, 15))
+    decorations = rng.choice(DECORATIONS, n_rows)
+
+    texts = [
+        " ".join([*polar[i, :n_sentiment[i]], *neutral[i, :lengths[i] - n_sentiment[i]]]) + decorations[i]
+        for i in range(n_rows)
+    ]
+    shout = rng.random(n_rows) < 0.1
+    texts = [text.upper() if loud else text.capitalize() for text, loud in zip(texts, shout)]
+
+    labels = positive ^ (rng.random(n_rows) < label_noise)
+    now = datetime.now()
+    created_at = pd.to_datetime(now) - pd.to_timedelta(rng.random(n_rows) * days * 86400, unit="s")
+
+    return pd.DataFrame({
+        "id": np.arange(1, n_rows + 1, dtype=TWEET_COLUMN_DTYPES["id"]),
+        "text": texts,
+        "positive": labels.astype(TWEET_COLUMN_DTYPES["positive"]),
+        "negative": (~labels).astype(TWEET_COLUMN_DTYPES["negative"]),
+        "created_at": created_at.astype(TWEET_COLUMN_DTYPES["created_at"]),
+        "updated_at": created_at.astype(TWEET_COLUMN_DTYPES["updated_at"]),
+    })
+
+
+class InMemoryDatabase:
+    """Stand-in for DatabaseOperations serving a tweets table held in a DataFrame"""
+
+    def __init__(self, frame):
+        """
+        Initialize the stand-in
+
+        Args:
+            frame: Tweets table, as returned by generate_tweets
+        """
+        self.frame = frame.sort_values(["updated_at", "id"], ignore_index=True)
+
+    def fetch_fingerprint(self) -> Optional[Dict[str, object]]:
+        """Same fingerprint as DatabaseOperations.fetch_fingerprint"""
+        max_updated_at = self.frame["updated_at"].max() if len(self.frame) else None
+        return {
+            "row_count": len(self.frame),
+            "max_updated_at": max_updated_at.isoformat() if max_updated_at is not None else None,
+            "id_checksum": id_checksum(self.frame["id"]),
+        }
+
+    def iter_changed_since(
+        self,
+        updated_at: Optional[datetime] = None,
+        columns: Sequence[str] = tuple(TWEET_COLUMN_DTYPES),
+        chunk_size: int = 50000,
+    ) -> Iterator[pd.DataFrame]:
+        """Same chunks as DatabaseOperations.iter_changed_since"""
+        frame = self.frame
+        if updated_at is not None:
+            frame = frame[frame["updated_at"] >= updated_at]
+        for start in range(0, len(frame), chunk_size):
+            yield frame.iloc[start:start + chunk_size][list(columns)].reset_index(drop=True)
+
+    def iter_training_chunks(
+        self,
+        days: Optional[int] = 7,
+        columns: Sequence[str] = ("text", "positive"),
+        chunk_size: int = 50000,
+    ) -> Iterator[pd.DataFrame]:
+        """Same chunks as DatabaseOperations.iter_training_chunks"""
+        frame = self.frame
+        if days is not None:
+            frame = frame[frame["created_at"] >= pd.Timestamp(datetime.now().date() - timedelta(days=days))]
+        for start in range(0, len(frame), chunk_size):
+            yield frame.iloc[start:start + chunk_size][list(columns)].reset_index(drop=True)
@@ -0,0 +1,111 @@
+"""
+Benchmark of model loading across API workers
+
+Simulates N workers on one host loading the same model, first the previous way
+(private unpickled copy per worker) and then from the shared local model store
+with memory-mapped arrays. Reports per-worker load time and the host-wide
+resident memory added by the model (sum over workers of the PSS growth, PSS
+splitting shared pages between the processes mapping them).
+
+Usage:
+    python scripts/bench_model_load.py --workers 16 --features 500000
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+
+def build_model(n_features, directory):
+    """Fit a vectorizer/model pair with n_features features and dump them into directory"""
+    rng = np.random.default_rng(42)
+    vocabulary = {f"w{i}": i for i in range(n_features)}
+    vectorizer = TfidfVectorizer(vocabulary=vocabulary)
+    documents = [" ".join(f"w{j}" for j in rng.integers(0, n_features, size=20)) for _ in range(2000)]
+    vectorizer.fit(documents)
+
+    X = sp.random(2000, n_features, density=20 / n_features, format="csr", random_state=42)
+    model = LogisticRegression(max_iter=50).fit(X, rng.integers(0, 2, size=2000))
+
+    joblib.dump(model, os.path.join(directory, "trained_model.joblib"))
+    joblib.dump(vectorizer, os.path.join(directory, "vectorizer.joblib"))
+
+
+def proportional_set_size():
+    """Return the PSS of the current process in bytes (Linux only)"""
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def worker(directory, mmap_mode, barrier, results):
+    """Load the model like an API worker would, then report load time and the PSS it added"""
+    baseline_pss = proportional_set_size()
+    start = time.perf_counter()
+    model = joblib.load(os.path.join(directory, "trained_model.joblib"), mmap_mode=mmap_mode)
+    vectorizer = joblib.load(os.path.join(directory, "vectorizer.joblib"), mmap_mode=mmap_mode)
+    # Touch the arrays like the first request would
+    float(np.sum(model.coef_)) + float(np.sum(vectorizer.idf_))
+    elapsed = time.perf_counter() - start
+
+    # Measure once every worker holds its model, so shared pages are split between all of them
+    barrier.wait()
+    results.put((elapsed, proportional_set_size() - baseline_pss))
+    barrier.wait()
+
+
+def run(directory, workers, mmap_mode):
+    """Start the workers and aggregate their measurements"""
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(directory, mmap_mode, barrier, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    measurements = [results.get() for _ in range(workers)]
+    for process in processes:
+        process.join()
+
+    load_times = [elapsed for elapsed, _ in measurements]
+    total_pss = sum(pss for _, pss in measurements)
+    return max(load_times), total_pss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=16, help="Number of simulated API workers")
+    parser.add_argument("--features", type=int, default=500000, help="Vocabulary size of the model")
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        print("This benchmark needs /proc/self/smaps_rollup (Linux)")
+        return 1
+
+    with tempfile.TemporaryDirectory() as directory:
+        build_model(args.features, directory)
+
+        before_time, before_pss = run(directory, args.workers, mmap_mode=None)
+        after_time, after_pss = run(directory, args.workers, mmap_mode="r")
+
+    print(f"{args.workers} workers, {args.features} features")
+    print(f"{'':24}{'slowest load':>14}{'model PSS':>14}")
+    print(f"{'private copies (before)':24}{before_time * 1000:>11.1f} ms{before_pss / 2**20:>11.1f} MB")
+    print(f"{'mmap from store (after)':24}{after_time * 1000:>11.1f} ms{after_pss / 2**20:>11.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
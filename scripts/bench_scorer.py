@@ -0,0 +1,98 @@
+"""
+Micro-benchmark for the compiled linear scorer
+
+Trains a small TF-IDF + LogisticRegression model on synthetic tweets, checks that
+LinearScorer reproduces the predict/predict_proba scores and times both paths.
+
+Usage:
+    python scripts/bench_scorer.py --tweets 5000 --repeat 20
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from shared.scoring import LinearScorer  # noqa: E402
+
+POSITIVE_WORDS = ["love", "great", "amazing", "excellent", "happy", "fantastic", "perfect"]
+NEGATIVE_WORDS = ["hate", "terrible", "awful", "poor", "waste", "disappointed", "worst"]
+FILLER_WORDS = ["product", "service", "really", "this", "the", "quality", "time", "money"]
+
+
+def generate_tweets(n, rng):
+    """Generate n synthetic tweets with binary labels"""
+    labels = rng.integers(0, 2, size=n)
+    tweets = []
+    for label in labels:
+        words = POSITIVE_WORDS if label == 1 else NEGATIVE_WORDS
+        tokens = list(rng.choice(words, size=2)) + list(rng.choice(FILLER_WORDS, size=6))
+        rng.shuffle(tokens)
+        tweets.append(" ".join(tokens))
+    return tweets, labels
+
+
+def sklearn_scores(model, X):
+    """Reference implementation: the previous predict/predict_proba loop"""
+    predictions = model.predict(X)
+    probabilities = model.predict_proba(X)
+    scores = []
+    for pred, proba in zip(predictions, probabilities):
+        scores.append(float(proba[1] if pred == 1 else -proba[0]))
+    return scores
+
+
+def compiled_scores(scorer, X):
+    """New implementation: single mat-vec and vectorized sigmoid"""
+    return scorer.score(X).tolist()
+
+
+def time_call(fn, repeat):
+    """Return the best wall time of fn over repeat runs"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tweets", type=int, default=5000, help="Batch size to score")
+    parser.add_argument("--repeat", type=int, default=20, help="Timing repetitions")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    train_tweets, train_labels = generate_tweets(2000, rng)
+    vectorizer = TfidfVectorizer(ngram_range=(1, 3), max_features=300)
+    model = LogisticRegression(max_iter=1000).fit(vectorizer.fit_transform(train_tweets), train_labels)
+    scorer = LinearScorer.from_model(model, vectorizer)
+
+    tweets, _ = generate_tweets(args.tweets, rng)
+    X = vectorizer.transform(tweets)
+
+    reference = sklearn_scores(model, X)
+    compiled = compiled_scores(scorer, X)
+    max_diff = float(np.max(np.abs(np.asarray(reference) - np.asarray(compiled))))
+    if max_diff > 1e-9:
+        print(f"FAIL: scores differ from the sklearn path (max abs diff {max_diff:.3e})")
+        return 1
+
+    reference_time = time_call(lambda: sklearn_scores(model, X), args.repeat)
+    compiled_time = time_call(lambda: compiled_scores(scorer, X), args.repeat)
+
+    print(f"Scores match sklearn path (max abs diff {max_diff:.3e})")
+    print(f"sklearn predict + predict_proba + loop: {reference_time * 1000:.2f} ms")
+    print(f"LinearScorer:                          {compiled_time * 1000:.2f} ms")
+    print(f"Speedup: {reference_time / compiled_time:.1f}x for {args.tweets} tweets")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
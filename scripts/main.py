@@ -0,0 +1,363 @@
+"""
+Load test and latency regression benchmark for the sentiment API
+
+Sends analyze requests built from a configurable mix of batch sizes, tweet
+lengths and duplicate ratios, either at a fixed concurrency (closed loop: each
+client sends its next request when the previous one is answered) or at a fixed
+arrival rate (open loop: latency is measured from the scheduled send time, so
+queueing in an overloaded server is counted). Reports throughput, latency
+percentiles and resident memory, and compares them with a baseline.
+
+By default the API runs in this process through create_app, with a model
+trained on synthetic tweets instead of the one in MinIO; the reported RSS then
+includes the benchmark client. Use --url to benchmark a running server instead.
+
+Baseline JSON: reference values and the allowed relative regression, e.g.
+    {"p99_ms": 40.0, "throughput_rps": 500.0, "rss_mb": 400.0, "tolerance": 0.2}
+Any of p50_ms, p95_ms, p99_ms, rss_mb and error_rate (lower is better),
+throughput_rps and tweets_per_second (higher is better) can be given.
+
+Usage:
+    python scripts/main.py --requests 2000 --concurrency 8 --batch-sizes 1 10 100 --mode fast
+    python scripts/main.py --rate 200 --requests 5000 --baseline scripts/baseline.json
+    python scripts/main.py --url http://localhost:5000 --write-baseline baseline.json
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "api"))
+sys.path.insert(0, ROOT)
+
+ANALYZE_PATH = "/sentiment/analyze"
+
+POSITIVE_WORDS = ["love", "great", "amazing", "excellent", "happy", "fantastic", "perfect"]
+NEGATIVE_WORDS = ["hate", "terrible", "awful", "poor", "waste", "disappointed", "worst"]
+FILLER_WORDS = ["product", "service", "really", "this", "the", "quality", "time", "money", "app", "day"]
+
+# Metrics a baseline can bound, and whether a higher value is better
+BASELINE_METRICS = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "rss_mb": False,
+    "error_rate": False,
+    "throughput_rps": True,
+    "tweets_per_second": True,
+}
+
+
+class TweetGenerator:
+    """Synthetic tweets with a share of exact repeats drawn from a small popular set"""
+
+    def __init__(self, min_words, max_words, duplicate_ratio, rng, popular=100):
+        self.min_words = min_words
+        self.max_words = max_words
+        self.duplicate_ratio = duplicate_ratio
+        self.rng = rng
+        self._unique = itertools.count()
+        self.popular = [self._fresh() for _ in range(popular)]
+
+    def _fresh(self):
+        """A tweet never generated before"""
+        n_words = int(self.rng.integers(self.min_words, self.max_words + 1))
+        words = POSITIVE_WORDS if self.rng.random() < 0.5 else NEGATIVE_WORDS
+        tokens = list(self.rng.choice(words, size=max(1, n_words // 4)))
+        tokens += list(self.rng.choice(FILLER_WORDS, size=max(0, n_words - len(tokens) - 1)))
+        self.rng.shuffle(tokens)
+        # A numbered token keeps every fresh tweet distinct, like real traffic
+        return " ".join(tokens + [f"#{next(self._unique)}"])
+
+    def batch(self, size):
+        """A list of size tweets"""
+        return [
+            self.popular[int(self.rng.integers(len(self.popular)))]
+            if self.rng.random() < self.duplicate_ratio else self._fresh()
+            for _ in range(size)
+        ]
+
+
+def build_payloads(args, rng):
+    """Encode the body of every request up front, so generating them is never timed"""
+    generator = TweetGenerator(args.min_words, args.max_words, args.duplicate_ratio, rng)
+    weights = np.asarray(args.batch_weights or [1] * len(args.batch_sizes), dtype=float)
+    if len(weights) != len(args.batch_sizes):
+        raise SystemExit("--batch-weights needs one weight per batch size")
+    sizes = rng.choice(args.batch_sizes, size=args.warmup + args.requests, p=weights / weights.sum())
+    return [
+        (int(size), json.dumps({"tweets": generator.batch(int(size))}).encode("utf-8"))
+        for size in sizes
+    ]
+
+
+def train_stub_model(n_features, rng):
+    """Fit a small TF-IDF + LogisticRegression model on synthetic tweets, like the trainer would"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+
+    from shared.normalization import NORMALIZER_VERSION, normalize_batch
+
+    generator = TweetGenerator(6, 20, 0.0, rng)
+    tweets = generator.batch(5000)
+    labels = [int(any(word in tweet.split() for word in POSITIVE_WORDS)) for tweet in tweets]
+    vectorizer = TfidfVectorizer(ngram_range=(1, 3), max_features=n_features)
+    model = LogisticRegression(max_iter=1000).fit(vectorizer.fit_transform(normalize_batch(tweets)), labels)
+    model.normalizer_version_ = NORMALIZER_VERSION
+    return model, vectorizer
+
+
+def create_local_app(args, rng):
+    """Create the API in this process, serving the stub model instead of loading one from MinIO"""
+    # Keep the benchmark quiet and free of side effects unless asked otherwise
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("LOG_DIR", "")
+    os.environ.setdefault("PERSIST_RESULTS", "false")
+
+    from app.factory import create_app
+    from app.services.model_loader import build_loaded_model
+    from app.services.sentiment_service import SentimentService
+
+    model, vectorizer = train_stub_model(args.features, rng)
+
+    def stub_start(service, reload_interval_seconds=0):
+        service.swap_model(build_loaded_model(model, vectorizer, "benchmark"))
+
+    SentimentService.start = stub_start
+    return create_app(args.config)
+
+
+class LocalClient:
+    """Sends requests to the in-process app, one Flask test client per thread"""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def post(self, path, body):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.post(path, data=body, content_type="application/json")
+        response.get_data()
+        return response.status_code
+
+
+class HttpClient:
+    """Sends requests to a running server, one keep-alive connection per thread"""
+
+    def __init__(self, url):
+        parsed = urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        self.connection_class = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+        self.prefix = parsed.path.rstrip("/")
+        self._local = threading.local()
+
+    def post(self, path, body):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self.connection_class(self.host, self.port, timeout=60)
+        try:
+            connection.request("POST", self.prefix + path, body=body, headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            self._local.connection = None
+            return 0
+
+
+def run_load(client, path, payloads, concurrency, rate):
+    """
+    Send every payload and time it
+
+    Args:
+        client: LocalClient or HttpClient
+        path: Request path with its query string
+        payloads: (batch size, body) of each request
+        concurrency: Number of client threads
+        rate: Requests per second for an open loop, None for a closed loop
+
+    Returns:
+        (latencies in seconds, statuses, elapsed seconds)
+    """
+    latencies = np.zeros(len(payloads))
+    statuses = np.zeros(len(payloads), dtype=int)
+
+    def send(index, started):
+        statuses[index] = client.post(path, payloads[index][1])
+        latencies[index] = time.perf_counter() - started
+
+    start = time.perf_counter()
+    if rate is None:
+        next_index = itertools.count()
+        lock = threading.Lock()
+
+        def closed_loop():
+            while True:
+                with lock:
+                    index = next(next_index)
+                if index >= len(payloads):
+                    return
+                send(index, time.perf_counter())
+
+        threads = [threading.Thread(target=closed_loop) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for index in range(len(payloads)):
+                # Timed from the scheduled time: waiting for a free client counts as latency
+                scheduled = start + index / rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(send, index, scheduled)
+    return latencies, statuses, time.perf_counter() - start
+
+
+def rss_mb(pid=None):
+    """Resident memory of a process in MB, this one by default (Linux only)"""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return None
+
+
+def summarize(payloads, latencies, statuses, elapsed, rss):
+    """Aggregate the timings of a run into the report metrics"""
+    ok = statuses == 200
+    tweets = sum(size for (size, _), success in zip(payloads, ok) if success)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000 if len(latencies) else (0, 0, 0)
+    return {
+        "requests": len(payloads),
+        "errors": int((~ok).sum()),
+        "error_rate": float((~ok).mean()) if len(ok) else 0.0,
+        "elapsed_seconds": elapsed,
+        "throughput_rps": len(payloads) / elapsed,
+        "tweets_per_second": tweets / elapsed,
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(latencies.max() * 1000) if len(latencies) else 0.0,
+        "rss_mb": rss,
+    }
+
+
+def compare_with_baseline(report, baseline):
+    """
+    List the metrics that regressed past the baseline's tolerance
+
+    Returns:
+        One message per regressed metric, empty if none did
+    """
+    tolerance = baseline.get("tolerance", 0.1)
+    regressions = []
+    for metric, higher_is_better in BASELINE_METRICS.items():
+        reference = baseline.get(metric)
+        value = report.get(metric)
+        if reference is None or value is None:
+            continue
+        if higher_is_better:
+            limit = reference * (1 - tolerance)
+            regressed = value < limit
+        else:
+            limit = reference * (1 + tolerance)
+            # An error rate of 0 in the baseline tolerates no error at all
+            regressed = value > limit
+        if regressed:
+            regressions.append(f"{metric}: {value:.2f} vs baseline {reference:.2f} (limit {limit:.2f})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running API, the API runs in process when omitted")
+    parser.add_argument("--config", default="test", help="Configuration of the in-process API")
+    parser.add_argument("--mode", choices=("full", "fast", "scores"), default="full", help="Analyze response mode")
+    parser.add_argument("--requests", type=int, default=2000, help="Number of timed requests")
+    parser.add_argument("--warmup", type=int, default=50, help="Untimed requests sent first")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of client threads")
+    parser.add_argument("--rate", type=float, help="Fixed arrival rate in requests per second (open loop)")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100], help="Tweets per request")
+    parser.add_argument("--batch-weights", type=float, nargs="+", help="Relative frequency of each batch size")
+    parser.add_argument("--min-words", type=int, default=5, help="Shortest tweet, in words")
+    parser.add_argument("--max-words", type=int, default=30, help="Longest tweet, in words")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.2, help="Share of tweets repeated across requests")
+    parser.add_argument("--features", type=int, default=300, help="Vocabulary size of the in-process stub model")
+    parser.add_argument("--server-pid", type=int, help="PID of the server to report the RSS of with --url")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed of the generated traffic")
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    parser.add_argument("--baseline", help="Baseline JSON to compare with, exit code 1 on regression")
+    parser.add_argument("--write-baseline", help="Write the results as a new baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Relative regression allowed by a written baseline")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.url:
+        client = HttpClient(args.url)
+    else:
+        client = LocalClient(create_local_app(args, rng))
+    payloads = build_payloads(args, rng)
+    path = f"{ANALYZE_PATH}?mode={args.mode}"
+
+    run_load(client, path, payloads[:args.warmup], args.concurrency, None)
+    latencies, statuses, elapsed = run_load(client, path, payloads[args.warmup:], args.concurrency, args.rate)
+
+    rss = rss_mb(args.server_pid) if args.url is None or args.server_pid else None
+    report = summarize(payloads[args.warmup:], latencies, statuses, elapsed, rss)
+    report["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if args.url is None else None
+    report["config"] = {
+        key: getattr(args, key)
+        for key in ("url", "mode", "concurrency", "rate", "batch_sizes", "batch_weights",
+                    "min_words", "max_words", "duplicate_ratio", "seed")
+    }
+
+    load = f"{args.rate:g} req/s" if args.rate else f"concurrency {args.concurrency}"
+    print(f"{report['requests']} requests ({args.mode} mode, {load}), {report['errors']} errors")
+    print(f"Throughput: {report['throughput_rps']:.1f} req/s, {report['tweets_per_second']:.0f} tweets/s")
+    print(
+        f"Latency: p50 {report['p50_ms']:.2f} ms, p95 {report['p95_ms']:.2f} ms, "
+        f"p99 {report['p99_ms']:.2f} ms, max {report['max_ms']:.2f} ms"
+    )
+    if report["rss_mb"] is not None:
+        print(f"RSS: {report['rss_mb']:.0f} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.write_baseline:
+        with open(args.write_baseline, "w") as f:
+            baseline = {metric: report[metric] for metric in BASELINE_METRICS if report.get(metric) is not None}
+            json.dump({**baseline, "tolerance": args.tolerance}, f, indent=2)
+        print(f"Baseline written to {args.write_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_with_baseline(report, json.load(f))
+        if regressions:
+            print("REGRESSION:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print("No regression against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
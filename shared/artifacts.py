@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+
+# User metadata holding the SHA-256 of an artifact's content
+CHECKSUM_METADATA_KEY = "sha256"
+# Sidecar file recording the checksums of the artifacts downloaded into a directory
+CHECKSUMS_FILE = "checksums.json"
+
+# Concurrent multipart transfers for artifacts above the threshold
+MULTIPART_THRESHOLD = 8 * 2 ** 20
+MULTIPART_CHUNKSIZE = 8 * 2 ** 20
+MAX_CONCURRENCY = 8
+
+_known_buckets = set()
+_known_buckets_lock = threading.Lock()
+
+
+def get_s3_client(client=None):
+    """
+    Return the process-wide MinIO client configured from the environment
+
+    boto3 clients are thread-safe, so one client (and its connection pool) is
+    shared by every transfer instead of paying for a new one each time.
+
+    Args:
+        client: Client to use instead, e.g. a local S3 stand-in
+
+    Returns:
+        boto3 S3 client
+    """
+    if client is not None:
+        return client
+    return _cached_client(
+        os.environ.get('MINIO_ENDPOINT_URL', 'http://minio:9000'),
+        os.environ.get('MINIO_ACCESS_KEY', 'minioadmin'),
+        os.environ.get('MINIO_SECRET_KEY', 'minioadmin'),
+        os.environ.get('MINIO_REGION_NAME', 'us-east-1'),
+    )
+
+
+@lru_cache(maxsize=None)
+def _cached_client(endpoint_url, access_key, secret_key, region_name):
+    # boto3 is slow to import, keep it off the startup path of its users
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        's3',
+        endpoint_url=endpoint_url,
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        # Enough connections for parallel artifacts each using concurrent multipart parts
+        config=Config(signature_version='s3v4', max_pool_connections=4 * MAX_CONCURRENCY),
+        region_name=region_name
+    )
+
+
+def transfer_config():
+    """Multipart settings shared by every artifact transfer"""
+    from boto3.s3.transfer import TransferConfig
+
+    return TransferConfig(
+        multipart_threshold=MULTIPART_THRESHOLD,
+        multipart_chunksize=MULTIPART_CHUNKSIZE,
+        max_concurrency=MAX_CONCURRENCY,
+        use_threads=True,
+    )
+
+
+def file_sha256(path):
+    """SHA-256 hex digest of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(2 ** 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def remote_checksum(bucket, key, client=None) -> Optional[str]:
+    """
+    Read the checksum an artifact was uploaded with
+
+    Returns:
+        SHA-256 hex digest, or None if the object doesn't exist or was uploaded without one
+    """
+    from botocore.exceptions import ClientError
+
+    try:
+        head = get_s3_client(client).head_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return None
+        raise
+    return head.get('Metadata', {}).get(CHECKSUM_METADATA_KEY)
+
+
+def ensure_bucket(bucket, client=None):
+    """Create the bucket if it doesn't exist, checking each bucket once per process"""
+    from botocore.exceptions import ClientError
+
+    with _known_buckets_lock:
+        if bucket in _known_buckets:
+            return
+    s3_client = get_s3_client(client)
+    try:
+        s3_client.head_bucket(Bucket=bucket)
+    except ClientError:
+        s3_client.create_bucket(Bucket=bucket)
+    with _known_buckets_lock:
+        _known_buckets.add(bucket)
+
+
+def upload_artifacts(paths: Dict[str, str], bucket, client=None) -> Dict[str, str]:
+    """
+    Upload artifacts in parallel, skipping the ones whose content is already in the bucket
+
+    Args:
+        paths: Local file path of each object key
+        bucket: Destination bucket
+        client: S3 client to use instead of the shared one
+
+    Returns:
+        "uploaded" or "unchanged" for each key
+
+    Raises:
+        The first transfer error, once every transfer finished
+    """
+    s3_client = get_s3_client(client)
+    ensure_bucket(bucket, s3_client)
+    config = transfer_config()
+
+    def upload(key, path):
+        checksum = file_sha256(path)
+        if remote_checksum(bucket, key, s3_client) == checksum:
+            return "unchanged"
+        s3_client.upload_file(
+            path, bucket, key,
+            ExtraArgs={"Metadata": {CHECKSUM_METADATA_KEY: checksum}},
+            Config=config,
+        )
+        return "uploaded"
+
+    return _run_parallel(upload, paths.items())
+
+
+def download_artifacts(keys: Iterable[str], bucket, directory, client=None, reuse_from=()) -> Dict[str, str]:
+    """
+    Download artifacts in parallel into a directory, verifying their checksums
+
+    An artifact whose checksum matches a copy already downloaded into one of the
+    reuse_from directories under the same file name is copied from there
+    instead of downloaded again.
+
+    Args:
+        keys: Object keys to download, each saved under its key in directory,
+            or a dict of the file name in directory of each object key
+        bucket: Source bucket
+        directory: Destination directory
+        client: S3 client to use instead of the shared one
+        reuse_from: Directories previously filled by download_artifacts
+
+    Returns:
+        "downloaded" or "reused" for each key
+    """
+    s3_client = get_s3_client(client)
+    config = transfer_config()
+    local_copies = _local_copies(reuse_from)
+    names = keys if isinstance(keys, dict) else {key: key for key in keys}
+
+    def download(key, name):
+        path = os.path.join(directory, name)
+        checksum = remote_checksum(bucket, key, s3_client)
+        local_copy = local_copies.get((name, checksum)) if checksum else None
+        if local_copy is not None:
+            shutil.copyfile(local_copy, path)
+            return "reused", checksum
+
+        s3_client.download_file(bucket, key, path, Config=config)
+        actual = file_sha256(path)
+        if checksum and actual != checksum:
+            raise IOError(f"Checksum mismatch for {bucket}/{key}: expected {checksum}, got {actual}")
+        return "downloaded", actual
+
+    results = _run_parallel(download, names.items())
+    with open(os.path.join(directory, CHECKSUMS_FILE), 'w') as f:
+        json.dump({names[key]: checksum for key, (_, checksum) in results.items()}, f)
+    return {key: status for key, (status, _) in results.items()}
+
+
+def _local_copies(directories):
+    """Index the artifacts recorded in the checksum files of directories by (file name, checksum)"""
+    copies = {}
+    for directory in directories:
+        try:
+            with open(os.path.join(directory, CHECKSUMS_FILE)) as f:
+                checksums = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, checksum in checksums.items():
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                copies.setdefault((name, checksum), path)
+    return copies
+
+
+def _run_parallel(transfer, items):
+    """Run one transfer per (key, value) item on a thread each and collect the results by key"""
+    items = list(items)
+    with ThreadPoolExecutor(max_workers=max(len(items), 1)) as executor:
+        futures = {key: executor.submit(transfer, key, value) for key, value in items}
+    # Leaving the executor waited for every transfer: report the first failure, if any
+    return {key: future.result() for key, future in futures.items()}
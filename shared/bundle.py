@@ -0,0 +1,247 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Bump whenever the layout of the bundle changes: loaders refuse other versions
+BUNDLE_FORMAT_VERSION = 1
+
+BUNDLE_KEY = "model_bundle.npz"
+
+# Directory a bundle is unpacked into, next to it, as memory-mappable arrays
+UNPACKED_DIR = "model_bundle"
+UNPACKED_MANIFEST = "manifest.json"
+
+# Vectorizer parameters stored in the manifest, everything else must keep its default
+_TFIDF_PARAMS = (
+    "lowercase", "strip_accents", "token_pattern", "stop_words", "ngram_range", "analyzer",
+    "binary", "norm", "use_idf", "smooth_idf", "sublinear_tf",
+)
+_HASHING_PARAMS = (
+    "lowercase", "strip_accents", "token_pattern", "stop_words", "ngram_range", "analyzer",
+    "binary", "norm", "alternate_sign", "n_features",
+)
+
+
+class ModelBundle:
+    """
+    A binary linear sentiment model loaded from a bundle
+
+    Exposes the coef_/intercept_/classes_/normalizer_version_ attributes of the
+    fitted estimator it was exported from, so it can stand in for it wherever
+    only the linear model is used.
+    """
+
+    def __init__(self, manifest, vectorizer, coef, intercept):
+        """
+        Initialize the bundle
+
+        Args:
+            manifest: Manifest dict read from the bundle
+            vectorizer: Vectorizer rebuilt from the bundle
+            coef: Dense weight vector, one entry per vectorizer feature
+            intercept: Bias term of the decision function
+        """
+        self.manifest = manifest
+        self.vectorizer = vectorizer
+        self.coef_ = coef.reshape(1, -1)
+        self.intercept_ = np.array([intercept])
+        self.classes_ = np.array(manifest["classes"])
+        self.normalizer_version_ = manifest["normalizer_version"]
+
+
+def export_bundle(model, vectorizer, path):
+    """
+    Write a fitted model and its vectorizer as a single bundle file
+
+    The bundle is a compressed npz holding a JSON manifest, the vocabulary as a
+    sorted string array, and the idf and coefficients as float32. It is meant for
+    transfer: compressed arrays can't be memory-mapped, see unpack_bundle. Features with a
+    zero weight are left out whenever that cannot change a score: always for a
+    HashingVectorizer, and for a TfidfVectorizer only without row normalization,
+    since every term of a row counts towards its norm.
+
+    Args:
+        model: Fitted binary linear classifier (coef_, intercept_, classes_)
+        vectorizer: Fitted TfidfVectorizer or HashingVectorizer
+        path: File to write, conventionally ending in .npz
+
+    Returns:
+        Manifest of the written bundle
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+
+    classes = [int(label) for label in model.classes_]
+    if classes != [0, 1]:
+        raise ValueError(f"Expected a binary model with classes [0, 1], got {classes}")
+    coef = np.asarray(model.coef_[0], dtype=np.float64)
+
+    if isinstance(vectorizer, TfidfVectorizer):
+        kind, param_names = "tfidf", _TFIDF_PARAMS
+    elif isinstance(vectorizer, HashingVectorizer):
+        kind, param_names = "hashing", _HASHING_PARAMS
+    else:
+        raise ValueError(f"Cannot bundle a {type(vectorizer).__name__}")
+    vectorizer_params = _export_params(vectorizer, param_names)
+
+    if kind == "tfidf":
+        terms = vectorizer.get_feature_names_out()
+        keep = coef != 0 if vectorizer.norm is None else np.ones(len(terms), dtype=bool)
+        order = np.argsort(terms[keep])
+        arrays = {
+            "terms": terms[keep][order].astype(str),
+            "idf": vectorizer.idf_[keep][order].astype(np.float32),
+            "coef": coef[keep][order].astype(np.float32),
+        }
+    else:
+        indices = np.flatnonzero(coef)
+        arrays = {
+            "indices": indices.astype(np.int32),
+            "coef": coef[indices].astype(np.float32),
+        }
+
+    manifest = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "kind": kind,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "normalizer_version": getattr(model, "normalizer_version_", None),
+        "classes": classes,
+        "intercept": float(model.intercept_[0]),
+        "n_features": int(len(coef)),
+        "n_stored": int(len(arrays["coef"])),
+        "vectorizer": vectorizer_params,
+    }
+    # A plain string array keeps the bundle loadable without pickle
+    np.savez_compressed(path, manifest=np.array(json.dumps(manifest)), **arrays)
+    return manifest
+
+
+def _read_bundle(path):
+    """Read the manifest and the arrays of a bundle file"""
+    with np.load(path, allow_pickle=False) as data:
+        manifest = json.loads(str(data["manifest"]))
+        if manifest["format_version"] != BUNDLE_FORMAT_VERSION:
+            raise ValueError(
+                f"Bundle format version {manifest['format_version']} is not supported, "
+                f"expected {BUNDLE_FORMAT_VERSION}"
+            )
+        arrays = {name: data[name] for name in data.files if name != "manifest"}
+    return manifest, arrays
+
+
+def _serving_arrays(manifest, arrays):
+    """Expand the stored arrays to the float64 idf and dense coefficients a ModelBundle serves"""
+    if manifest["kind"] == "tfidf":
+        return {
+            "terms": arrays["terms"],
+            "idf": arrays["idf"].astype(np.float64),
+            "coef": arrays["coef"].astype(np.float64),
+        }
+    if manifest["kind"] == "hashing":
+        coef = np.zeros(manifest["n_features"], dtype=np.float64)
+        coef[arrays["indices"]] = arrays["coef"]
+        return {"coef": coef}
+    raise ValueError(f"Unknown bundle kind {manifest['kind']}")
+
+
+def unpack_bundle(path) -> str:
+    """
+    Unpack a bundle file into a directory of uncompressed .npy arrays, once
+
+    The arrays are written already expanded to what a ModelBundle serves, so
+    loading them with mmap_mode='r' copies nothing: every process mapping them
+    shares the same read-only pages. The directory is published with a rename,
+    so concurrent processes unpacking the same bundle never see a partial one.
+
+    Args:
+        path: Bundle file
+
+    Returns:
+        Path of the unpacked directory, next to the bundle file
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    directory = os.path.join(parent, UNPACKED_DIR)
+    if os.path.isdir(directory):
+        return directory
+
+    manifest, arrays = _read_bundle(path)
+    staging = tempfile.mkdtemp(prefix=".unpack-", dir=parent)
+    try:
+        for name, array in _serving_arrays(manifest, arrays).items():
+            np.save(os.path.join(staging, f"{name}.npy"), array, allow_pickle=False)
+        with open(os.path.join(staging, UNPACKED_MANIFEST), "w") as f:
+            json.dump(manifest, f)
+        os.rename(staging, directory)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+        if not os.path.isdir(directory):
+            raise
+        # Another process unpacked it first
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return directory
+
+
+def load_bundle(path, mmap_mode=None) -> ModelBundle:
+    """
+    Load a bundle written by export_bundle, or the directory unpack_bundle made of it
+
+    Args:
+        path: Bundle file, or unpacked bundle directory
+        mmap_mode: np.load memory-mapping mode of the arrays of an unpacked directory,
+            e.g. 'r' to share their pages; a bundle file is always read into memory
+
+    Returns:
+        ModelBundle with its rebuilt vectorizer
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+
+    if os.path.isdir(path):
+        with open(os.path.join(path, UNPACKED_MANIFEST)) as f:
+            manifest = json.load(f)
+        if manifest["format_version"] != BUNDLE_FORMAT_VERSION:
+            raise ValueError(
+                f"Bundle format version {manifest['format_version']} is not supported, "
+                f"expected {BUNDLE_FORMAT_VERSION}"
+            )
+        arrays = {
+            name[:-len(".npy")]: np.load(os.path.join(path, name), mmap_mode=mmap_mode, allow_pickle=False)
+            for name in os.listdir(path)
+            if name.endswith(".npy")
+        }
+    else:
+        manifest, stored = _read_bundle(path)
+        arrays = _serving_arrays(manifest, stored)
+
+    params = dict(manifest["vectorizer"])
+    params["ngram_range"] = tuple(params["ngram_range"])
+
+    if manifest["kind"] == "tfidf":
+        vectorizer = TfidfVectorizer(vocabulary=arrays["terms"].tolist(), **params)
+        vectorizer.idf_ = arrays["idf"]
+    elif manifest["kind"] == "hashing":
+        vectorizer = HashingVectorizer(**params)
+    else:
+        raise ValueError(f"Unknown bundle kind {manifest['kind']}")
+
+    return ModelBundle(manifest, vectorizer, arrays["coef"], manifest["intercept"])
+
+
+def _export_params(vectorizer, param_names):
+    """Read the manifest parameters of a vectorizer, refusing the ones a manifest can't describe"""
+    params = vectorizer.get_params()
+    for name in ("preprocessor", "tokenizer"):
+        if params.get(name) is not None:
+            raise ValueError(f"Cannot bundle a vectorizer with a custom {name}")
+    if callable(params.get("analyzer")):
+        raise ValueError("Cannot bundle a vectorizer with a custom analyzer")
+
+    exported = {name: params[name] for name in param_names}
+    if exported["stop_words"] is not None and not isinstance(exported["stop_words"], str):
+        exported["stop_words"] = sorted(exported["stop_words"])
+    exported["ngram_range"] = list(exported["ngram_range"])
+    return exported
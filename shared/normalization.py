@@ -0,0 +1,53 @@
+import re
+
+# Bump whenever the normalization rules change: models record the version they
+# were trained with and the API refuses to serve a model with a different one.
+NORMALIZER_VERSION = "1"
+
+# Keep letters, whitespace and the punctuation that carries sentiment
+_DISALLOWED_CHARS = re.compile(r"[^a-z\s!?.,]")
+# Collapse repeated exclamation/question marks ("!!!" -> "!")
+_REPEATED_PUNCTUATION = re.compile(r"([!?])\1+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize a single text for vectorization
+
+    Args:
+        text: Raw tweet text
+
+    Returns:
+        Lowercased text with unsupported characters removed, repeated
+        punctuation collapsed and whitespace squeezed
+    """
+    text = _DISALLOWED_CHARS.sub("", text.lower())
+    text = _REPEATED_PUNCTUATION.sub(r"\1", text)
+    return " ".join(text.split())
+
+
+def normalize_batch(texts):
+    """
+    Normalize a batch of texts in one call
+
+    Args:
+        texts: List (or any iterable) of strings, or a pandas Series
+
+    Returns:
+        List of normalized strings, or a Series with the same index when a
+        Series is given
+    """
+    # Bind the hot callables once instead of looking them up per text
+    strip_chars = _DISALLOWED_CHARS.sub
+    collapse_punctuation = _REPEATED_PUNCTUATION.sub
+    lower = str.lower
+    join = " ".join
+
+    cleaned = [
+        join(collapse_punctuation(r"\1", strip_chars("", lower(text))).split())
+        for text in texts
+    ]
+
+    if hasattr(texts, "index") and hasattr(texts, "str"):
+        return type(texts)(cleaned, index=texts.index, name=texts.name)
+    return cleaned
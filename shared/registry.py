@@ -0,0 +1,209 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from shared.artifacts import file_sha256, get_s3_client, upload_artifacts
+
+# Bump whenever the layout of the manifest changes: readers refuse other versions
+MANIFEST_FORMAT_VERSION = 1
+
+# Object listing every published model version and the aliases pointing at them
+MANIFEST_KEY = "manifest.json"
+VERSIONS_PREFIX = "versions/"
+
+# Alias served when a request selects no model, only moved on purpose (promotion or rollback)
+DEFAULT_ALIAS = "latest"
+
+
+def empty_manifest():
+    """Manifest of a bucket where no version was published yet"""
+    return {"format_version": MANIFEST_FORMAT_VERSION, "versions": {}, "aliases": {}}
+
+
+def version_key(version, name):
+    """Object key of the artifact name of a version"""
+    return f"{VERSIONS_PREFIX}{version}/{name}"
+
+
+def resolve_version(manifest, selector=None) -> Optional[str]:
+    """
+    Resolve an alias or a version id to a published version
+
+    Args:
+        manifest: Manifest dict
+        selector: Alias or version id, None for the default alias
+
+    Returns:
+        Version id, or None if the selector names neither an alias nor a version
+    """
+    selector = selector or DEFAULT_ALIAS
+    version = manifest["aliases"].get(selector, selector)
+    return version if version in manifest["versions"] else None
+
+
+def _is_missing(error):
+    return error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound', 'NoSuchBucket')
+
+
+def manifest_etag(bucket, client=None) -> Optional[str]:
+    """ETag of the manifest, None if it doesn't exist: a cheap check whether it changed"""
+    from botocore.exceptions import ClientError
+
+    try:
+        return get_s3_client(client).head_object(Bucket=bucket, Key=MANIFEST_KEY)['ETag']
+    except ClientError as e:
+        if _is_missing(e):
+            return None
+        raise
+
+
+def read_manifest(bucket, client=None) -> Tuple[Dict, Optional[str]]:
+    """
+    Read the manifest of a bucket
+
+    Returns:
+        Tuple of (manifest dict, ETag), an empty manifest and None if none was written yet
+    """
+    from botocore.exceptions import ClientError
+
+    try:
+        response = get_s3_client(client).get_object(Bucket=bucket, Key=MANIFEST_KEY)
+    except ClientError as e:
+        if _is_missing(e):
+            return empty_manifest(), None
+        raise
+    manifest = json.loads(response['Body'].read())
+    if manifest.get("format_version") != MANIFEST_FORMAT_VERSION:
+        raise ValueError(
+            f"Manifest format version {manifest.get('format_version')} is not supported, "
+            f"expected {MANIFEST_FORMAT_VERSION}"
+        )
+    return manifest, response['ETag']
+
+
+def write_manifest(manifest, bucket, client=None):
+    """
+    Replace the manifest of a bucket
+
+    The manifest is a single object written last, so readers only ever see
+    versions whose artifacts are all uploaded. Concurrent writers are not
+    merged: the trainer and the registry commands must not run at the same time.
+    """
+    get_s3_client(client).put_object(
+        Bucket=bucket,
+        Key=MANIFEST_KEY,
+        Body=json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"),
+        ContentType="application/json",
+    )
+
+
+def publish_version(paths: Dict[str, str], bucket, info=None, aliases=(), followers=(), client=None) -> str:
+    """
+    Upload artifacts as a new immutable version and point aliases at it
+
+    The default alias only moves when it is listed in aliases or followers,
+    except for the first version of a bucket, which it is pointed at so there
+    is one to serve.
+
+    Args:
+        paths: Local file path of each artifact name, e.g. model_bundle.npz
+        bucket: Model bucket
+        info: Extra fields recorded for the version in the manifest, e.g. the training mode
+        aliases: Aliases moved to the version
+        followers: Aliases moved to the version only if they pointed at the same
+            version as the first of aliases, e.g. latest while it follows the alias
+            of a training mode: pointing it anywhere else stops it following
+        client: S3 client to use instead of the shared one
+
+    Returns:
+        Version id
+    """
+    digest = hashlib.sha256()
+    for name in sorted(paths):
+        digest.update(f"{name}\0{file_sha256(paths[name])}\0".encode("utf-8"))
+    checksum = digest.hexdigest()
+
+    # Sortable by publication time, unique thanks to the content hash
+    created_at = datetime.now(timezone.utc)
+    version = f"{created_at:%Y%m%dT%H%M%SZ}-{checksum[:8]}"
+    upload_artifacts({version_key(version, name): path for name, path in paths.items()}, bucket, client)
+
+    manifest, _ = read_manifest(bucket, client)
+    manifest["versions"][version] = {
+        **(info or {}),
+        "created_at": created_at.isoformat(),
+        "sha256": checksum,
+        "artifacts": sorted(paths),
+    }
+
+    followed = manifest["aliases"].get(aliases[0]) if aliases else None
+    for alias in followers:
+        if followed is not None and manifest["aliases"].get(alias) == followed:
+            manifest["aliases"][alias] = version
+    for alias in aliases:
+        manifest["aliases"][alias] = version
+    if resolve_version(manifest) is None:
+        manifest["aliases"][DEFAULT_ALIAS] = version
+    write_manifest(manifest, bucket, client)
+    return version
+
+
+def set_alias(alias, selector, bucket, client=None) -> str:
+    """
+    Point an alias at a version, e.g. a canary, a customer model or a rollback of latest
+
+    Args:
+        alias: Alias name
+        selector: Version id, or another alias whose version is taken
+
+    Returns:
+        Version id the alias now points at
+    """
+    manifest, _ = read_manifest(bucket, client)
+    version = resolve_version(manifest, selector)
+    if version is None:
+        raise ValueError(f"Unknown model version {selector}")
+    manifest["aliases"][alias] = version
+    write_manifest(manifest, bucket, client)
+    return version
+
+
+def remove_alias(alias, bucket, client=None):
+    """Remove an alias, requests selecting it are refused afterwards"""
+    if alias == DEFAULT_ALIAS:
+        raise ValueError(f"The {DEFAULT_ALIAS} alias can only be moved, not removed")
+    manifest, _ = read_manifest(bucket, client)
+    if manifest["aliases"].pop(alias, None) is None:
+        raise ValueError(f"Unknown alias {alias}")
+    write_manifest(manifest, bucket, client)
+
+
+def prune_versions(keep, bucket, client=None) -> List[str]:
+    """
+    Delete the oldest versions, keeping the keep most recent and every aliased one
+
+    Returns:
+        Removed version ids
+    """
+    manifest, _ = read_manifest(bucket, client)
+    aliased = set(manifest["aliases"].values())
+    by_age = sorted(manifest["versions"], key=lambda v: manifest["versions"][v]["created_at"], reverse=True)
+    removed = [version for version in by_age[keep:] if version not in aliased]
+    if not removed:
+        return []
+
+    # Drop them from the manifest first: a reader never sees a listed version without its artifacts
+    for version in removed:
+        del manifest["versions"][version]
+    write_manifest(manifest, bucket, client)
+
+    # Everything under the version's prefix goes, including files added next to its artifacts
+    s3_client = get_s3_client(client)
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for version in removed:
+        for page in paginator.paginate(Bucket=bucket, Prefix=version_key(version, "")):
+            objects = [{"Key": item["Key"]} for item in page.get("Contents", [])]
+            if objects:
+                s3_client.delete_objects(Bucket=bucket, Delete={"Objects": objects, "Quiet": True})
+    return removed
@@ -0,0 +1,72 @@
+import numpy as np
+from scipy.special import expit
+
+
+class LinearScorer:
+    """Single-pass scorer for a binary linear sentiment classifier"""
+
+    def __init__(self, coef, intercept, n_features):
+        """
+        Initialize the scorer
+
+        Args:
+            coef: Weight vector of the positive class, one entry per feature
+            intercept: Bias term of the decision function
+            n_features: Number of features produced by the vectorizer
+        """
+        coef = np.ascontiguousarray(coef, dtype=np.float64).ravel()
+        if coef.shape[0] != n_features:
+            raise ValueError(
+                f"Model has {coef.shape[0]} coefficients but vectorizer produces {n_features} features"
+            )
+        self.coef = coef
+        self.intercept = float(intercept)
+        self.n_features = n_features
+
+    @classmethod
+    def from_model(cls, model, vectorizer):
+        """
+        Build a scorer from a fitted binary classifier and its vectorizer
+
+        Args:
+            model: Fitted LogisticRegression, SGDClassifier or any linear model with coef_/intercept_
+            vectorizer: Vectorizer the model was trained on, vocabulary based or hashing
+
+        Returns:
+            LinearScorer instance
+        """
+        classes = list(getattr(model, "classes_", []))
+        if classes != [0, 1]:
+            raise ValueError(f"Expected a binary model with classes [0, 1], got {classes}")
+
+        return cls(model.coef_[0], model.intercept_[0], _n_features(vectorizer))
+
+    def decision_function(self, X):
+        """Compute the decision value of every row of a (sparse) feature matrix"""
+        return np.asarray(X @ self.coef).ravel() + self.intercept
+
+    def score(self, X):
+        """
+        Compute signed sentiment scores for a feature matrix
+
+        Matches the previous predict/predict_proba path: the probability of the
+        positive class when the prediction is positive, minus the probability of
+        the negative class otherwise.
+
+        Args:
+            X: Feature matrix of shape (n_samples, n_features)
+
+        Returns:
+            NumPy array of scores between -1 and 1
+        """
+        decision = self.decision_function(X)
+        positive_proba = expit(decision)
+        return np.where(decision > 0, positive_proba, positive_proba - 1.0)
+
+
+def _n_features(vectorizer):
+    """Return the number of features a fitted vectorizer produces"""
+    vocabulary = getattr(vectorizer, "vocabulary_", None)
+    if vocabulary is not None:
+        return len(vocabulary)
+    return vectorizer.n_features
@@ -0,0 +1,9 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The API imports its code as the app package and both services import shared from the repository root
+for path in (os.path.join(ROOT, "api"), ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
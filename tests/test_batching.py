@@ -0,0 +1,91 @@
+import threading
+
+from app.services.batching import RequestCoalescer
+
+
+class Model:
+    """Stand-in model scoring a tweet as its length plus an offset"""
+
+    def __init__(self, version, offset):
+        self.version = version
+        self.offset = offset
+
+
+def score(tweets, model):
+    return [len(tweet) + model.offset for tweet in tweets]
+
+
+def submit_concurrently(coalescer, requests):
+    results = [None] * len(requests)
+
+    def run(index, tweets, model):
+        results[index] = coalescer.submit(tweets, model)
+
+    threads = [threading.Thread(target=run, args=(i, *request)) for i, request in enumerate(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_each_request_gets_its_own_slice():
+    calls = []
+
+    def recording_score(tweets, model):
+        calls.append(len(tweets))
+        return score(tweets, model)
+
+    model = Model("v1", 0)
+    coalescer = RequestCoalescer(recording_score, max_wait_ms=50, max_batch=100)
+    requests = [(["a" * n for n in range(i, i + 3)], model) for i in range(1, 6)]
+    results = submit_concurrently(coalescer, requests)
+
+    for (tweets, _), result in zip(requests, results):
+        assert list(result) == [len(tweet) for tweet in tweets]
+    # Fewer model calls than requests
+    assert sum(calls) == 15
+    assert len(calls) < len(requests)
+
+
+def test_requests_for_different_models_are_scored_with_their_own_model():
+    seen = []
+
+    def recording_score(tweets, model):
+        seen.append((model.version, len(tweets)))
+        return score(tweets, model)
+
+    old, new = Model("v1", 0), Model("v2", 100)
+    coalescer = RequestCoalescer(recording_score, max_wait_ms=50, max_batch=100)
+    results = submit_concurrently(coalescer, [(["ab"], old), (["abc"], new), (["a"], old)])
+
+    assert list(results[0]) == [2]
+    assert list(results[1]) == [103]
+    assert list(results[2]) == [1]
+    assert {version for version, _ in seen} == {"v1", "v2"}
+
+
+def test_a_full_batch_is_scored_directly():
+    coalescer = RequestCoalescer(score, max_wait_ms=1000, max_batch=2)
+    assert list(coalescer.submit(["a", "bb"], Model("v1", 0))) == [1, 2]
+
+
+def test_errors_reach_every_request_of_the_batch():
+    def failing_score(tweets, model):
+        raise RuntimeError("model failed")
+
+    coalescer = RequestCoalescer(failing_score, max_wait_ms=20, max_batch=100)
+    errors = []
+
+    def run():
+        try:
+            coalescer.submit(["a"], Model("v1", 0))
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert errors == ["model failed"] * 3
@@ -0,0 +1,80 @@
+import time
+
+from app.services.cache import ResultCache, make_cache_key
+
+
+def keys(version, texts):
+    return [make_cache_key(version, text) for text in texts]
+
+
+def test_keys_depend_on_the_model_version():
+    assert make_cache_key("v1", "good day") == make_cache_key("v1", "good day")
+    assert make_cache_key("v1", "good day") != make_cache_key("v2", "good day")
+    # The separator keeps version and text from running into each other
+    assert make_cache_key("v1", "0good") != make_cache_key("v10", "good")
+
+
+def test_hits_and_misses():
+    cache = ResultCache(max_size=10)
+    cache.put_many(keys("v1", ["a", "b"]), [0.5, -0.5], "v1")
+    assert cache.get_many(keys("v1", ["a", "c", "b"])) == [0.5, None, -0.5]
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResultCache(max_size=2)
+    cache.put_many(keys("v1", ["a", "b"]), [0.1, 0.2], "v1")
+    # Touch a so that b is the least recently used
+    cache.get_many(keys("v1", ["a"]))
+    cache.put_many(keys("v1", ["c"]), [0.3], "v1")
+    assert cache.get_many(keys("v1", ["a", "b", "c"])) == [0.1, None, 0.3]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_the_ttl():
+    cache = ResultCache(max_size=10, ttl_seconds=0.05)
+    cache.put_many(keys("v1", ["a"]), [0.1], "v1")
+    assert cache.get_many(keys("v1", ["a"])) == [0.1]
+    time.sleep(0.1)
+    assert cache.get_many(keys("v1", ["a"])) == [None]
+    assert cache.stats()["size"] == 0
+
+
+def test_discard_version_only_drops_that_version():
+    cache = ResultCache(max_size=10)
+    cache.put_many(keys("v1", ["a", "b"]), [0.1, 0.2], "v1")
+    cache.put_many(keys("v2", ["a"]), [0.9], "v2")
+    assert cache.discard_version("v1") == 2
+    assert cache.get_many(keys("v1", ["a", "b"]) + keys("v2", ["a"])) == [None, None, 0.9]
+
+
+def test_zero_size_disables_the_cache():
+    cache = ResultCache(max_size=0)
+    cache.put_many(keys("v1", ["a"]), [0.1], "v1")
+    assert cache.get_many(keys("v1", ["a"])) == [None]
+    assert cache.stats()["size"] == 0
+
+
+def test_default_swap_drops_the_cached_scores_of_the_previous_version(tmp_path):
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.linear_model import SGDClassifier
+
+    from app.services.model_loader import build_loaded_model
+    from app.services.sentiment_service import SentimentService
+    from shared.normalization import NORMALIZER_VERSION
+
+    vectorizer = HashingVectorizer(n_features=2 ** 10)
+    model = SGDClassifier(loss="log_loss", random_state=0)
+    model.fit(vectorizer.transform(["good day", "bad day"] * 5), [1, 0] * 5)
+    model.normalizer_version_ = NORMALIZER_VERSION
+
+    service = SentimentService(str(tmp_path))
+    service.swap_model(build_loaded_model(model, vectorizer, "v1"))
+    service.score_tweets(["good day", "bad day"])
+    assert service.cache.stats()["size"] == 2
+
+    service.swap_model(build_loaded_model(model, vectorizer, "v2"))
+    assert service.cache.stats()["size"] == 0
+    service.score_tweets(["good day"])
+    assert service.cache.stats()["size"] == 1
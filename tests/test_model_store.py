@@ -0,0 +1,67 @@
+import os
+import time
+
+from app.services.model_store import DEFAULT_KEEP, LocalModelStore, VersionLock
+
+
+def write_artifact(directory):
+    with open(os.path.join(directory, "model_bundle.npz"), "w") as f:
+        f.write("artifact")
+
+
+def fetch(store, key):
+    # Distinct modification times: entries are ordered by them
+    time.sleep(0.01)
+    return store.fetch(key, write_artifact)
+
+
+def test_default_keep_is_shared():
+    assert LocalModelStore("unused").keep == DEFAULT_KEEP
+
+
+def test_fetch_downloads_once(tmp_path):
+    store = LocalModelStore(str(tmp_path))
+    calls = []
+
+    def download(directory):
+        calls.append(directory)
+        write_artifact(directory)
+
+    first = store.fetch("v1", download)
+    second = store.fetch("v1", download)
+    assert first == second
+    assert len(calls) == 1
+    assert os.listdir(first) == ["model_bundle.npz"]
+
+
+def test_prune_skips_versions_held_by_another_process(tmp_path):
+    # Two stores stand for two workers: flock locks of separate descriptors conflict like processes
+    worker = LocalModelStore(str(tmp_path), keep=1)
+    other = LocalModelStore(str(tmp_path), keep=1)
+
+    fetch(worker, "v1")
+    fetch(other, "v2")
+    assert os.path.isdir(tmp_path / "v1")
+
+    worker.release("v1")
+    fetch(other, "v3")
+    assert not os.path.isdir(tmp_path / "v1")
+    # Still held by the store that fetched it
+    assert os.path.isdir(tmp_path / "v2")
+
+
+def test_version_lock_of_an_inference_process_blocks_pruning(tmp_path):
+    store = LocalModelStore(str(tmp_path), keep=1)
+    fetch(store, "v1")
+    store.release("v1")
+    lock = VersionLock.for_directory(str(tmp_path / "v1"))
+
+    fetch(store, "v2")
+    assert os.path.isdir(tmp_path / "v1")
+
+    lock.release()
+    store.release("v2")
+    fetch(store, "v3")
+    assert not os.path.isdir(tmp_path / "v1")
+    assert not os.path.isdir(tmp_path / "v2")
+    assert [os.path.basename(path) for path in store.entries()] == ["v3"]
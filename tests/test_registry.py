@@ -0,0 +1,158 @@
+import hashlib
+import io
+
+import pytest
+from botocore.exceptions import ClientError
+
+from shared.registry import (
+    DEFAULT_ALIAS,
+    prune_versions,
+    publish_version,
+    read_manifest,
+    remove_alias,
+    resolve_version,
+    set_alias,
+    version_key,
+)
+
+BUCKET = "ml-models"
+
+
+class FakeS3:
+    """In-memory stand-in for the few S3 client calls the registry makes"""
+
+    def __init__(self):
+        self.objects = {}
+        self.buckets = set()
+
+    def _get(self, bucket, key):
+        if (bucket, key) not in self.objects:
+            raise ClientError({"Error": {"Code": "404"}}, "GetObject")
+        return self.objects[(bucket, key)]
+
+    def head_bucket(self, Bucket):
+        if Bucket not in self.buckets:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadBucket")
+
+    def create_bucket(self, Bucket):
+        self.buckets.add(Bucket)
+
+    def head_object(self, Bucket, Key):
+        body, metadata = self._get(Bucket, Key)
+        return {"ETag": hashlib.md5(body).hexdigest(), "Metadata": dict(metadata)}
+
+    def get_object(self, Bucket, Key):
+        body, _ = self._get(Bucket, Key)
+        return {"Body": io.BytesIO(body), "ETag": hashlib.md5(body).hexdigest()}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self.objects[(Bucket, Key)] = (Body, {})
+
+    def upload_file(self, path, Bucket, Key, ExtraArgs=None, Config=None):
+        with open(path, "rb") as f:
+            self.objects[(Bucket, Key)] = (f.read(), (ExtraArgs or {}).get("Metadata", {}))
+
+    def get_paginator(self, name):
+        objects = self.objects
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                keys = [key for bucket, key in objects if bucket == Bucket and key.startswith(Prefix)]
+                return [{"Contents": [{"Key": key} for key in keys]}]
+
+        return Paginator()
+
+    def delete_objects(self, Bucket, Delete):
+        for item in Delete["Objects"]:
+            self.objects.pop((Bucket, item["Key"]), None)
+
+
+@pytest.fixture
+def client():
+    return FakeS3()
+
+
+@pytest.fixture
+def publish(tmp_path, client):
+    """Publish a version with distinct content, returning its id"""
+    counter = iter(range(1000))
+
+    def publish(**kwargs):
+        path = tmp_path / f"bundle-{next(counter)}.npz"
+        path.write_bytes(path.name.encode())
+        return publish_version({"model_bundle.npz": str(path)}, BUCKET, client=client, **kwargs)
+
+    return publish
+
+
+def aliases(client):
+    return read_manifest(BUCKET, client)[0]["aliases"]
+
+
+def test_first_version_becomes_latest(client, publish):
+    version = publish(aliases=("batch",))
+    manifest, _ = read_manifest(BUCKET, client)
+    assert manifest["aliases"] == {"batch": version, DEFAULT_ALIAS: version}
+    assert manifest["versions"][version]["artifacts"] == ["model_bundle.npz"]
+    assert (BUCKET, version_key(version, "model_bundle.npz")) in client.objects
+
+
+def test_latest_only_moves_when_asked(client, publish):
+    first = publish(aliases=("batch",))
+    second = publish(aliases=("batch",))
+    assert aliases(client) == {"batch": second, DEFAULT_ALIAS: first}
+
+    third = publish(aliases=("batch", DEFAULT_ALIAS))
+    assert aliases(client) == {"batch": third, DEFAULT_ALIAS: third}
+
+
+def test_followers_move_while_they_follow_the_alias(client, publish):
+    first = publish(aliases=("online",))
+    second = publish(aliases=("online",), followers=(DEFAULT_ALIAS,))
+    assert aliases(client) == {"online": second, DEFAULT_ALIAS: second}
+
+    # Pinning latest elsewhere, e.g. a rollback, stops it following
+    set_alias(DEFAULT_ALIAS, first, BUCKET, client)
+    third = publish(aliases=("online",), followers=(DEFAULT_ALIAS,))
+    assert aliases(client) == {"online": third, DEFAULT_ALIAS: first}
+
+
+def test_resolve_version(client, publish):
+    version = publish(aliases=("canary",))
+    manifest, _ = read_manifest(BUCKET, client)
+    assert resolve_version(manifest) == version
+    assert resolve_version(manifest, "canary") == version
+    assert resolve_version(manifest, version) == version
+    assert resolve_version(manifest, "unknown") is None
+
+
+def test_set_alias_follows_aliases_and_rejects_unknown_versions(client, publish):
+    version = publish(aliases=("batch",))
+    assert set_alias("canary", "batch", BUCKET, client) == version
+    assert aliases(client)["canary"] == version
+    with pytest.raises(ValueError):
+        set_alias("canary", "missing", BUCKET, client)
+
+
+def test_remove_alias(client, publish):
+    publish(aliases=("canary",))
+    remove_alias("canary", BUCKET, client)
+    assert "canary" not in aliases(client)
+    with pytest.raises(ValueError):
+        remove_alias("canary", BUCKET, client)
+    with pytest.raises(ValueError):
+        remove_alias(DEFAULT_ALIAS, BUCKET, client)
+
+
+def test_prune_keeps_recent_and_aliased_versions(client, publish):
+    pinned = publish(aliases=("pinned",))
+    old = publish()
+    recent = [publish(), publish()]
+
+    removed = prune_versions(2, BUCKET, client)
+
+    assert removed == [old]
+    manifest, _ = read_manifest(BUCKET, client)
+    assert set(manifest["versions"]) == {pinned, *recent}
+    assert not any(key.startswith(version_key(old, "")) for _, key in client.objects)
+    assert prune_versions(2, BUCKET, client) == []
@@ -0,0 +1,98 @@
+import threading
+import time
+
+from app.services.result_writer import ResultWriter
+
+
+class RecordingInsert:
+    """insert_fn stand-in keeping every inserted batch"""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+        self.written = threading.Event()
+
+    def __call__(self, rows):
+        if self.fail:
+            raise RuntimeError("database is down")
+        self.batches.append(rows)
+        self.written.set()
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_partial_batch_is_written_after_the_flush_interval():
+    insert = RecordingInsert()
+    writer = ResultWriter(insert, batch_size=1000, flush_interval_seconds=0.2)
+    try:
+        start = time.monotonic()
+        assert writer.submit(["great day"], [0.9], "v1")
+        assert insert.written.wait(1.0)
+        assert time.monotonic() - start < 1.0
+        assert writer.stats() == {"queued": 0, "written": 1, "dropped": 0, "failed": 0}
+        row = insert.batches[0][0]
+        assert row["text"] == "great day"
+        assert row["model_version"] == "v1"
+    finally:
+        writer.close()
+
+
+def test_full_batch_is_written_without_waiting_for_the_interval():
+    insert = RecordingInsert()
+    writer = ResultWriter(insert, batch_size=4, flush_interval_seconds=30)
+    try:
+        writer.submit(["a", "b"], [0.1, 0.2])
+        writer.submit(["c", "d"], [0.3, 0.4])
+        assert insert.written.wait(1.0)
+        assert [len(batch) for batch in insert.batches] == [4]
+    finally:
+        writer.close()
+
+
+def test_close_drains_the_queue():
+    insert = RecordingInsert()
+    writer = ResultWriter(insert, batch_size=2, flush_interval_seconds=30)
+    writer.submit(["a", "b", "c"], [0.1, 0.2, 0.3])
+    writer.close()
+    assert sum(len(batch) for batch in insert.batches) == 3
+    assert writer.stats()["queued"] == 0
+    # Nothing is accepted once closed
+    assert not writer.submit(["d"], [0.4])
+
+
+def test_results_are_dropped_when_the_queue_stays_full():
+    insert = RecordingInsert()
+    release = threading.Event()
+
+    def slow_insert(rows):
+        release.wait(2.0)
+        insert(rows)
+
+    writer = ResultWriter(
+        slow_insert, batch_size=2, flush_interval_seconds=0.01, max_queue_size=2, block_timeout_seconds=0.01
+    )
+    try:
+        writer.submit(["a", "b"], [0.1, 0.2])
+        # The writer thread takes the first batch and blocks inserting it
+        assert wait_for(lambda: writer.stats()["queued"] == 0)
+        assert writer.submit(["c", "d"], [0.3, 0.4])
+        assert not writer.submit(["e"], [0.5])
+        assert writer.stats()["dropped"] == 1
+    finally:
+        release.set()
+        writer.close()
+
+
+def test_failed_inserts_are_counted_not_retried():
+    writer = ResultWriter(RecordingInsert(fail=True), batch_size=10, flush_interval_seconds=0.01)
+    writer.submit(["a", "b"], [0.1, 0.2])
+    assert wait_for(lambda: writer.stats()["failed"] == 2)
+    writer.close()
+    assert writer.stats()["written"] == 0
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+
+from shared.bundle import export_bundle, load_bundle, unpack_bundle
+from shared.normalization import NORMALIZER_VERSION
+from shared.scoring import LinearScorer
+
+TEXTS = [
+    "what a great day", "i love this", "so happy today", "best thing ever",
+    "this is awful", "i hate mondays", "so sad today", "worst thing ever",
+]
+LABELS = [1, 1, 1, 1, 0, 0, 0, 0]
+UNSEEN = ["great and happy", "awful and sad", "nothing in the vocabulary", ""]
+
+
+def fit(vectorizer, model):
+    features = vectorizer.fit_transform(TEXTS)
+    model.fit(features, LABELS)
+    model.normalizer_version_ = NORMALIZER_VERSION
+    return model, vectorizer
+
+
+def reference_scores(model, features):
+    """The predict/predict_proba scores the API returned before the linear scorer"""
+    probabilities = model.predict_proba(features)
+    return np.where(model.predict(features) == 1, probabilities[:, 1], -probabilities[:, 0])
+
+
+@pytest.mark.parametrize("vectorizer", [
+    TfidfVectorizer(ngram_range=(1, 2)),
+    HashingVectorizer(n_features=2 ** 10, alternate_sign=False),
+])
+@pytest.mark.parametrize("model", [
+    LogisticRegression(),
+    SGDClassifier(loss="log_loss", random_state=0),
+])
+def test_scores_match_predict_proba(vectorizer, model):
+    model, vectorizer = fit(vectorizer, model)
+    features = vectorizer.transform(TEXTS + UNSEEN)
+
+    scores = LinearScorer.from_model(model, vectorizer).score(features)
+
+    np.testing.assert_allclose(scores, reference_scores(model, features), atol=1e-12)
+    assert np.all((scores >= -1) & (scores <= 1))
+
+
+def test_rejects_a_model_that_is_not_binary():
+    vectorizer = TfidfVectorizer().fit(TEXTS)
+    model = LogisticRegression().fit(vectorizer.transform(TEXTS), [0, 1, 2, 0, 1, 2, 0, 1])
+    with pytest.raises(ValueError):
+        LinearScorer.from_model(model, vectorizer)
+
+
+def test_rejects_a_vectorizer_of_another_size():
+    model, _ = fit(TfidfVectorizer(), LogisticRegression())
+    with pytest.raises(ValueError):
+        LinearScorer.from_model(model, TfidfVectorizer().fit(["other words entirely"]))
+
+
+@pytest.mark.parametrize("vectorizer", [
+    TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True),
+    HashingVectorizer(n_features=2 ** 10, alternate_sign=False),
+])
+def test_bundle_round_trip_keeps_the_scores(tmp_path, vectorizer):
+    model, vectorizer = fit(vectorizer, LogisticRegression())
+    expected = LinearScorer.from_model(model, vectorizer).score(vectorizer.transform(UNSEEN))
+    path = str(tmp_path / "model_bundle.npz")
+    export_bundle(model, vectorizer, path)
+
+    for bundle in (load_bundle(path), load_bundle(unpack_bundle(path), mmap_mode="r")):
+        assert bundle.normalizer_version_ == NORMALIZER_VERSION
+        scorer = LinearScorer.from_model(bundle, bundle.vectorizer)
+        np.testing.assert_allclose(scorer.score(bundle.vectorizer.transform(UNSEEN)), expected, atol=1e-12)